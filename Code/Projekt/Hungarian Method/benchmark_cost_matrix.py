@@ -0,0 +1,86 @@
+#! /usr/bin/env python
+
+import argparse
+import glob
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from data_loader_Hungarian_Method import (preprocess_instance, generate_cost_matrix, get_sub_slot_counts,
+                                          build_cost_tensor, generate_cost_matrix_vectorized)
+
+# The modules shared by all solvers are located in the parent directory (or next to this file in a lab experiment)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instance import load_instance  # noqa: E402
+
+
+def benchmark_file(file_path, num_combinations, languages):
+    """
+    Compare the loop-based and the vectorized cost matrix builder on one benchmark file.
+
+    Both builders are run on the first num_combinations language combinations. The vectorized builder is timed
+    including the one-off construction of the cost tensor, and its matrices are checked against the loop-based ones.
+
+    Parameters:
+    - file_path (str): The path to the benchmark file.
+    - num_combinations (int): The number of language combinations to build matrices for.
+    - languages (list): A list of language identifiers.
+
+    Returns:
+    - tuple: The time of the loop-based builder and the time of the vectorized builder in seconds.
+    """
+    instance = load_instance(file_path)
+    students, timeslots, student_ids, timeslot_ids, expanded_timeslots = preprocess_instance(instance)
+    combinations = list(itertools.islice(itertools.product(languages, repeat=len(timeslots)), num_combinations))
+
+    start_time = time.perf_counter()
+    loop_matrices = [generate_cost_matrix(students, timeslot_ids, combination, expanded_timeslots, timeslots)
+                     for combination in combinations]
+    loop_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    cost_tensor = build_cost_tensor(instance.availability, instance.language_columns(languages))
+    sub_slot_counts = get_sub_slot_counts(len(students), len(timeslots))
+    vectorized_matrices = [generate_cost_matrix_vectorized(cost_tensor, combination, sub_slot_counts, languages)
+                           for combination in combinations]
+    vectorized_time = time.perf_counter() - start_time
+
+    for loop_matrix, vectorized_matrix in zip(loop_matrices, vectorized_matrices):
+        if not np.array_equal(loop_matrix, vectorized_matrix):
+            raise AssertionError(f"The cost matrices of {file_path} differ.")
+
+    return loop_time, vectorized_time
+
+
+def main():
+    """
+    Benchmark the vectorized cost matrix builder against the loop-based builder on a set of benchmark files.
+    """
+    default_pattern = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'n2000-*')
+    parser = argparse.ArgumentParser(description="Benchmark the cost matrix builders of the Hungarian method.")
+    parser.add_argument("pattern", type=str, nargs='?', default=default_pattern,
+                        help="Glob pattern of the benchmark files (default: benchmarks/n2000-*)")
+    parser.add_argument("--combinations", type=int, default=2,
+                        help="Number of language combinations to build per file (default: 2)")
+    args = parser.parse_args()
+
+    languages = ['E', 'G']
+    total_loop_time = 0.0
+    total_vectorized_time = 0.0
+    for file_path in sorted(glob.glob(args.pattern)):
+        loop_time, vectorized_time = benchmark_file(file_path, args.combinations, languages)
+        total_loop_time += loop_time
+        total_vectorized_time += vectorized_time
+        print(f"{os.path.basename(file_path)}: loop {loop_time:.3f}s, vectorized {vectorized_time:.3f}s, "
+              f"speedup {loop_time / vectorized_time:.1f}x")
+
+    if total_vectorized_time > 0:
+        print(f"Total: loop {total_loop_time:.3f}s, vectorized {total_vectorized_time:.3f}s, "
+              f"speedup {total_loop_time / total_vectorized_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,30 @@
 #! /usr/bin/env python
 
-import json
 import numpy as np
 import itertools
 import os
+import sys
+
+# The modules shared by all solvers are located in the parent directory (or next to this file in a lab experiment)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instance import load_instance  # noqa: E402
+
+# Version of the costs of build_cost_tensor; increase it whenever they change, so the results of the result cache (see
+# result_cache.py) computed with the old costs are no longer used
+OBJECTIVE_VERSION = 1
 
 
 def load_and_preprocess_data(file_path):
     """
     Load data from a JSON file and preprocess it for the scheduling problem.
 
-    This function reads a JSON file containing information about students and timeslots,
-    calculates the number of sub-slots per timeslot based on the number of students and timeslots,
+    This function reads a JSON file (or a file in the binary instance format) containing information about
+    students and timeslots, calculates the number of sub-slots per timeslot based on the number of students and timeslots,
     and expands the timeslot list accordingly. It returns the processed data including
     students, timeslots, student IDs, timeslot IDs, and expanded timeslots.
 
     Parameters:
-    - file_path (str): The path to the JSON file containing the input data.
+    - file_path (str): The path to the JSON or binary file containing the input data.
 
     Returns:
     - tuple: A tuple containing:
@@ -26,11 +34,23 @@ def load_and_preprocess_data(file_path):
         - timeslot_ids (list): A list of expanded timeslot IDs.
         - expanded_timeslots (list): A list of expanded timeslots.
     """
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    return preprocess_instance(load_instance(file_path))
+
+
+def preprocess_instance(instance):
+    """
+    Convert an Instance into the data structures of the Hungarian method and expand the timeslots.
 
-    students = data['students']
-    timeslots = data['timeslots']
+    The preferences of students that rejected every timeslot have already been set to 2 by the Instance.
+
+    Parameters:
+    - instance (Instance): The instance returned by instance.load_instance.
+
+    Returns:
+    - tuple: The same tuple as load_and_preprocess_data.
+    """
+    students = instance.student_records()
+    timeslots = instance.timeslot_dict()
 
     num_students = len(students)
     num_slots = len(timeslots)
@@ -51,12 +71,6 @@ def load_and_preprocess_data(file_path):
     student_ids = list(students.keys())
     timeslot_ids = expanded_timeslots
 
-    # Update preferences: Set all preferences to 2 if they are all 0
-    for student_id, details in students.items():
-        preferences = details['slot']
-        if all(pref == 0 for pref in preferences.values()):
-            students[student_id]['slot'] = {slot: 2 for slot in preferences.keys()}
-
     return students, timeslots, student_ids, timeslot_ids, expanded_timeslots
 
 
@@ -117,6 +131,170 @@ def generate_cost_matrix(students, timeslot_ids, language_combination, expanded_
     return cost_matrix
 
 
+def get_sub_slot_counts(num_students, num_slots):
+    """
+    Compute the number of sub-slots every original timeslot is expanded into.
+
+    The counts follow the same rule as the expansion in load_and_preprocess_data: every timeslot gets
+    num_students // num_slots sub-slots and the first num_students % num_slots timeslots get one more.
+
+    Parameters:
+    - num_students (int): The number of students.
+    - num_slots (int): The number of original timeslots.
+
+    Returns:
+    - numpy.ndarray: A 1D integer array with the number of sub-slots per original timeslot.
+    """
+    sub_slot_counts = np.full(num_slots, num_students // num_slots, dtype=np.int64)
+    sub_slot_counts[:num_students % num_slots] += 1
+    return sub_slot_counts
+
+
+def build_cost_tensor(availability, language_preferences):
+    """
+    Precompute the assignment costs for every student, original timeslot and language.
+
+    The tensor is built once per instance. Entry [i, j, l] is the cost of assigning student i to timeslot j if the
+    timeslot is taught in language l, using the same penalties as generate_cost_matrix (100 * num_students for an
+    unmet preference, 1 for a "maybe" and 0 for a "yes").
+
+    Parameters:
+    - availability (numpy.ndarray): The (num_students, num_timeslots) timeslot preferences of an Instance.
+    - language_preferences (numpy.ndarray): The (num_students, num_languages) language preferences, in the order of
+      the languages used for the language combinations (see Instance.language_columns).
+
+    Returns:
+    - numpy.ndarray: An integer array of shape (num_students, num_timeslots, num_languages).
+    """
+    num_students = availability.shape[0]
+    penalties = np.array([100 * num_students, 1, 0], dtype=np.int64)
+    return penalties[availability][:, :, np.newaxis] + penalties[language_preferences][:, np.newaxis, :]
+
+
+def generate_slot_cost_matrix(cost_tensor, language_combination, languages):
+    """
+    Select the cost of every student for every original timeslot under a language combination.
+
+    Parameters:
+    - cost_tensor (numpy.ndarray): The tensor returned by build_cost_tensor.
+    - language_combination (tuple): A tuple representing a specific combination of languages for the original timeslots.
+    - languages (list): A list of language identifiers, in the order used to build the tensor.
+
+    Returns:
+    - numpy.ndarray: An integer array of shape (num_students, num_timeslots).
+    """
+    language_indices = [languages.index(language) for language in language_combination]
+    return cost_tensor[:, np.arange(cost_tensor.shape[1]), language_indices]
+
+
+def generate_cost_matrix_vectorized(cost_tensor, language_combination, sub_slot_counts, languages):
+    """
+    Generate the same cost matrix as generate_cost_matrix from a precomputed cost tensor.
+
+    Instead of looking up the preferences for every (student, sub-slot) cell, the columns of the original timeslots
+    are selected from the tensor and repeated once per sub-slot.
+
+    Parameters:
+    - cost_tensor (numpy.ndarray): The tensor returned by build_cost_tensor.
+    - language_combination (tuple): A tuple representing a specific combination of languages for the original timeslots.
+    - sub_slot_counts (numpy.ndarray): The number of sub-slots per original timeslot (see get_sub_slot_counts).
+    - languages (list): A list of language identifiers, in the order used to build the tensor.
+
+    Returns:
+    - numpy.ndarray: A 2D array representing the cost matrix.
+    """
+    slot_cost_matrix = generate_slot_cost_matrix(cost_tensor, language_combination, languages)
+    return np.repeat(slot_cost_matrix, sub_slot_counts, axis=1).astype(np.float64)
+
+
+def contract_cost_tensor(cost_tensor, labels, num_units):
+    """
+    Sum the costs of the members of every pre-formed group.
+
+    Members of a group have to be assigned to the same timeslot, so a group can be treated as a single row whose cost
+    for a timeslot and language is the summed cost of its members.
+
+    Parameters:
+    - cost_tensor (numpy.ndarray): The tensor returned by build_cost_tensor.
+    - labels (numpy.ndarray): The group index of every student (see Instance.group_units).
+    - num_units (int): The number of groups, including students without a group as groups of one.
+
+    Returns:
+    - numpy.ndarray: An integer array of shape (num_units, num_timeslots, num_languages).
+    """
+    unit_cost_tensor = np.zeros((num_units,) + cost_tensor.shape[1:], dtype=cost_tensor.dtype)
+    np.add.at(unit_cost_tensor, labels, cost_tensor)
+    return unit_cost_tensor
+
+
+def expand_group_assignment(group_assignments, labels):
+    """
+    Expand an assignment of groups to timeslots back to the individual students.
+
+    Parameters:
+    - group_assignments (list): A list of (group_index, column_index) assignments, e.g. from group_assignment.
+    - labels (numpy.ndarray): The group index of every student (see Instance.group_units).
+
+    Returns:
+    - list of tuples: The (student_index, column_index) assignment of every student.
+    """
+    group_columns = np.empty(len(group_assignments), dtype=np.int64)
+    for group, column in group_assignments:
+        group_columns[group] = column
+    return list(zip(range(len(labels)), group_columns[labels].tolist()))
+
+
+class CostMatrixBuffer:
+    """
+    A cost matrix that is allocated once and only updated in the columns of the timeslots whose language changed.
+
+    generate_cost_matrix_vectorized and generate_slot_cost_matrix allocate and fill a new matrix for every language
+    combination. The buffer instead remembers the combination it holds and copies the tensor columns of the changed
+    timeslots into their sub-slot columns (or into the single column of the timeslot). With the Gray code order of
+    combination_search.enumerate_combinations, this is a single timeslot per combination.
+
+    Attributes:
+    - cost_tensor (numpy.ndarray): The tensor returned by build_cost_tensor.
+    - expanded (bool): True for the expanded sub-slot matrix of generate_cost_matrix_vectorized, False for the
+      students x timeslots matrix of generate_slot_cost_matrix.
+    """
+
+    def __init__(self, cost_tensor, sub_slot_counts, languages, expanded=True):
+        self.cost_tensor = cost_tensor
+        self.expanded = expanded
+        self._language_indices = {language: index for index, language in enumerate(languages)}
+        num_students, num_slots = cost_tensor.shape[:2]
+        if expanded:
+            # The sub-slot columns of timeslot j are bounds[j]:bounds[j + 1]
+            self._bounds = np.concatenate(([0], np.cumsum(sub_slot_counts)))
+            self._matrix = np.empty((num_students, self._bounds[-1]), dtype=np.float64)
+        else:
+            self._matrix = np.empty((num_students, num_slots), dtype=cost_tensor.dtype)
+        self._combination = None
+
+    def update(self, language_combination):
+        """
+        Rewrite the columns of the timeslots whose language differs from the previous combination.
+
+        Parameters:
+        - language_combination (tuple): The language of every original timeslot.
+
+        Returns:
+        - numpy.ndarray: The buffer with the same content as the matrix of generate_cost_matrix_vectorized resp.
+          generate_slot_cost_matrix. It is overwritten by the next call.
+        """
+        for slot, language in enumerate(language_combination):
+            if self._combination is not None and self._combination[slot] == language:
+                continue
+            costs = self.cost_tensor[:, slot, self._language_indices[language]]
+            if self.expanded:
+                self._matrix[:, self._bounds[slot]:self._bounds[slot + 1]] = costs[:, np.newaxis]
+            else:
+                self._matrix[:, slot] = costs
+        self._combination = language_combination
+        return self._matrix
+
+
 # Exemplary use of the code
 if __name__ == "__main__":
     benchmark_file = os.path.join(os.path.expanduser('~'), 'Desktop', 'Bachelor Arbeit', 'Code', 'Projekt', 'benchmarks',
@@ -1,4 +1,6 @@
 #! /usr/bin/env python
+import numpy as np
+from ortools.graph.python import min_cost_flow
 from scipy.optimize import linear_sum_assignment
 
 
@@ -21,3 +23,323 @@ def hungarian_algorithm(cost_matrix):
     # Using SciPy's linear_sum_assignment to solve the assignment problem
     row_ind, col_ind = linear_sum_assignment(cost_matrix)
     return list(zip(row_ind, col_ind))
+
+
+def capacitated_assignment(cost_matrix, capacities):
+    """
+    Solve the assignment problem with slot capacities as a min-cost flow problem.
+
+    Instead of expanding every timeslot into identical sub-slot columns, this function works directly on the
+    students x timeslots cost matrix. Every student is a supply node with one unit of flow, every timeslot is
+    connected to the sink with its capacity as arc capacity. The optimal flow has the same total cost as the
+    Hungarian algorithm on the expanded square matrix, but needs only O(n * k) memory.
+
+    Parameters:
+    - cost_matrix (array_like): An integer cost matrix of shape (num_students, num_timeslots).
+    - capacities (array_like): The number of students each timeslot can take.
+
+    Returns:
+    - list of tuples: A list where each tuple contains the indices of the assigned row and timeslot column
+      in the format (row_index, column_index). The list is empty if no assignment satisfies the capacities.
+    """
+    cost_matrix = np.asarray(cost_matrix)
+    num_rows, num_columns = cost_matrix.shape
+    source = num_rows + num_columns
+    sink = source + 1
+
+    rows = np.arange(num_rows, dtype=np.int32)
+    columns = np.arange(num_columns, dtype=np.int32)
+    row_nodes = np.repeat(rows, num_columns)
+    column_nodes = np.tile(columns, num_rows) + num_rows
+
+    smcf = min_cost_flow.SimpleMinCostFlow()
+    smcf.add_arcs_with_capacity_and_unit_cost(np.full(num_rows, source, dtype=np.int32), rows,
+                                              np.ones(num_rows, dtype=np.int64), np.zeros(num_rows, dtype=np.int64))
+    assignment_arcs = smcf.add_arcs_with_capacity_and_unit_cost(row_nodes, column_nodes,
+                                                                np.ones(row_nodes.size, dtype=np.int64),
+                                                                np.rint(cost_matrix).astype(np.int64).ravel())
+    smcf.add_arcs_with_capacity_and_unit_cost(columns + num_rows, np.full(num_columns, sink, dtype=np.int32),
+                                              np.asarray(capacities, dtype=np.int64),
+                                              np.zeros(num_columns, dtype=np.int64))
+    smcf.set_node_supply(source, num_rows)
+    smcf.set_node_supply(sink, -num_rows)
+
+    if smcf.solve() != smcf.OPTIMAL:
+        return []
+
+    assigned = smcf.flows(assignment_arcs) > 0
+    return list(zip(row_nodes[assigned], column_nodes[assigned] - num_rows))
+
+
+def _group_flow(cost_matrix, sizes, capacities, allowed, scale):
+    """
+    Solve the min-cost flow relaxation of group_assignment in which the members of a group may be split.
+
+    Every row sends one unit of flow per member over its allowed columns and pays scale // size times its cost per
+    unit, so a row that is not split pays scale times its cost.
+
+    Returns:
+    - tuple: The lower bound on the cost (infinity if the relaxation is infeasible), the column that received most
+      of the members of every row (or None) and a split row with that column (or None, None).
+    """
+    rows, columns = np.nonzero(allowed)
+    num_rows, num_columns = cost_matrix.shape
+    source = num_rows + num_columns
+    sink = source + 1
+    demand = int(sizes.sum())
+
+    smcf = min_cost_flow.SimpleMinCostFlow()
+    smcf.add_arcs_with_capacity_and_unit_cost(np.full(num_rows, source, dtype=np.int32),
+                                              np.arange(num_rows, dtype=np.int32), sizes,
+                                              np.zeros(num_rows, dtype=np.int64))
+    assignment_arcs = smcf.add_arcs_with_capacity_and_unit_cost(rows.astype(np.int32),
+                                                                (columns + num_rows).astype(np.int32), sizes[rows],
+                                                                cost_matrix[rows, columns] * (scale // sizes[rows]))
+    smcf.add_arcs_with_capacity_and_unit_cost(np.arange(num_rows, source, dtype=np.int32),
+                                              np.full(num_columns, sink, dtype=np.int32), capacities,
+                                              np.zeros(num_columns, dtype=np.int64))
+    smcf.set_node_supply(source, demand)
+    smcf.set_node_supply(sink, -demand)
+    if smcf.solve() != smcf.OPTIMAL:
+        return np.inf, None, None, None
+
+    # The costs are integers, so the bound can be rounded up
+    bound = -(-smcf.optimal_cost() // scale)
+    flows = smcf.flows(assignment_arcs)
+    # The arcs are written in the order of their flow, so every row keeps the column with the largest flow
+    order = np.argsort(flows, kind='stable')
+    row_columns = np.empty(num_rows, dtype=np.int64)
+    row_columns[rows[order]] = columns[order]
+    split = (flows > 0) & (flows < sizes[rows])
+    if split.any():
+        split_row = int(rows[np.flatnonzero(split)[0]])
+        return bound, row_columns, split_row, int(row_columns[split_row])
+    return bound, row_columns, None, None
+
+
+def group_assignment(cost_matrix, sizes, capacities):
+    """
+    Solve the capacitated assignment problem for rows that are pre-formed groups of several students.
+
+    Every row is a group whose members have to be assigned to the same column, so it takes as many places of the
+    column capacity as it has members; its cost is the summed cost of its members (see contract_cost_tensor). With
+    groups of one member, this is the problem of capacitated_assignment.
+
+    Splitting the groups into their members gives a min-cost flow relaxation whose cost is a lower bound. If no group
+    is split, its flow is an optimal assignment. Otherwise the relaxation is rounded by keeping every group in the
+    column that received most of its members and solving the flow of the students without a group again, which gives
+    an assignment and usually one whose cost equals the bound. If it does not, a split group is either fixed to the
+    column that received most of its members or forbidden to use that column, and the two subproblems are searched
+    depth first. Subproblems whose relaxation cannot beat the best assignment found so far are pruned, so the result
+    is optimal.
+
+    Parameters:
+    - cost_matrix (array_like): An integer cost matrix of shape (num_groups, num_timeslots).
+    - sizes (array_like): The number of members of every group.
+    - capacities (array_like): The number of students each timeslot can take.
+
+    Returns:
+    - list of tuples: A list where each tuple contains the indices of the assigned group and timeslot column in the
+      format (row_index, column_index). The list is empty if the groups cannot be packed into the capacities.
+    """
+    cost_matrix = np.rint(np.asarray(cost_matrix)).astype(np.int64)
+    sizes = np.asarray(sizes, dtype=np.int64)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    scale = int(np.lcm.reduce(sizes))
+    groups = np.flatnonzero(sizes > 1)
+
+    best_cost, best_columns = np.inf, None
+    subproblems = [np.ones(cost_matrix.shape, dtype=bool)]
+    while subproblems:
+        allowed = subproblems.pop()
+        bound, row_columns, split_row, split_column = _group_flow(cost_matrix, sizes, capacities, allowed, scale)
+        if bound >= best_cost:
+            continue
+        if split_row is None:
+            best_cost, best_columns = bound, row_columns
+            continue
+
+        rounded = allowed.copy()
+        rounded[groups] = False
+        rounded[groups, row_columns[groups]] = True
+        rounded_cost, rounded_columns, _, _ = _group_flow(cost_matrix, sizes, capacities, rounded, scale)
+        if rounded_cost < best_cost:
+            best_cost, best_columns = rounded_cost, rounded_columns
+            if bound >= best_cost:
+                continue
+
+        forbidden = allowed.copy()
+        forbidden[split_row, split_column] = False
+        fixed = allowed.copy()
+        fixed[split_row] = False
+        fixed[split_row, split_column] = True
+        # The fixed subproblem is searched first, since it is closest to the relaxed solution
+        subproblems.extend([forbidden, fixed])
+
+    if best_columns is None:
+        return []
+    return list(zip(range(len(best_columns)), best_columns.tolist()))
+
+
+class WarmStartAssignment:
+    """
+    Capacitated assignment solver that reuses its solution when only some columns of the cost matrix change.
+
+    Like capacitated_assignment, it works on the students x timeslots cost matrix with the number of sub-slots of
+    every timeslot as its capacity, which is the expanded square matrix of hungarian_algorithm with its identical
+    sub-slot columns merged. The assignment is built by shortest augmenting paths (as in the Jonker-Volgenant
+    algorithm) over the timeslots: an unassigned row either takes a place in a timeslot with free capacity or pushes
+    assigned rows along a chain of timeslots towards one.
+
+    The solver keeps a potential for every column and the assignment between calls. Every assigned row is in a column
+    with the smallest cost minus potential, so the row potentials follow from the assignment. The cheapest move of a
+    row from one column to another does not depend on the potentials, so it is kept for every pair of columns and
+    only updated for the columns on an augmenting path. When solve is called
+    with a cost matrix that differs from the previous one only in some columns, only the rows assigned to these
+    columns are unassigned and augmented again, and the potentials of these columns are lowered until no other row
+    prefers them. Consecutive language combinations often differ in a single timeslot, so a re-solve augments about
+    num_rows / num_columns rows instead of all of them.
+
+    Attributes:
+    - capacities (numpy.ndarray): The number of rows every column can take; they must add up to the number of rows.
+    - augmentations (int): The number of shortest path searches of all calls of solve, e.g. for statistics.
+    """
+
+    def __init__(self, capacities):
+        self.capacities = np.asarray(capacities, dtype=np.int64)
+        self.augmentations = 0
+        # Columns without capacity (more timeslots than rows) are left out
+        self._used_columns = np.flatnonzero(self.capacities > 0)
+        self._capacities = self.capacities[self._used_columns]
+        self._cost_matrix = None
+        self._potentials = None
+        self._columns = None
+        self._loads = None
+        # The smallest cost difference of moving a row of column a to column b and the row that achieves it
+        self._move_costs = None
+        self._move_rows = None
+
+    def solve(self, cost_matrix):
+        """
+        Solve the capacitated assignment problem for a cost matrix, starting from the solution of the previous call.
+
+        Parameters:
+        - cost_matrix (array_like): A cost matrix of shape (num_rows, num_columns) with finite entries.
+
+        Returns:
+        - list of tuples: A list where each tuple contains the indices of the assigned row and column in the format
+          (row_index, column_index), like capacitated_assignment.
+        """
+        cost_matrix = np.asarray(cost_matrix, dtype=np.float64)
+        num_rows, num_columns = cost_matrix.shape
+        if self.capacities.shape != (num_columns,) or self.capacities.sum() != num_rows:
+            raise ValueError("The capacities must have one entry per column and add up to the number of rows.")
+        cost_matrix = cost_matrix[:, self._used_columns]
+        num_columns = len(self._used_columns)
+
+        if self._cost_matrix is None or self._cost_matrix.shape != cost_matrix.shape:
+            self._potentials = np.zeros(num_columns)
+            self._columns = np.full(num_rows, -1, dtype=np.int64)
+            self._loads = np.zeros(num_columns, dtype=np.int64)
+        else:
+            changed = np.flatnonzero((cost_matrix != self._cost_matrix).any(axis=0))
+            self._release_columns(cost_matrix, changed)
+        self._cost_matrix = cost_matrix
+
+        unassigned = self._assign_free_rows()
+        if len(unassigned):
+            self._move_costs = np.full((num_columns, num_columns), np.inf)
+            self._move_rows = np.zeros((num_columns, num_columns), dtype=np.int64)
+            self._update_moves(range(num_columns))
+        for row in unassigned:
+            self._augment(row)
+            self.augmentations += 1
+        return list(zip(range(num_rows), self._used_columns[self._columns].tolist()))
+
+    def _release_columns(self, cost_matrix, changed):
+        """
+        Unassign the rows of the changed columns and lower the potentials of these columns, so that every assigned
+        row is still in one of its cheapest columns under the new costs.
+        """
+        if not len(changed):
+            return
+        released = np.isin(self._columns, changed)
+        self._columns[released] = -1
+        self._loads[changed] = 0
+        assigned = np.flatnonzero(~released)
+        if len(assigned):
+            # The reduced cost of every assigned row in its own column
+            own = cost_matrix[assigned, self._columns[assigned]] - self._potentials[self._columns[assigned]]
+            self._potentials[changed] = (cost_matrix[np.ix_(assigned, changed)] - own[:, np.newaxis]).min(axis=0)
+
+    def _assign_free_rows(self):
+        """
+        Assign unassigned rows to their cheapest column as long as it has free capacity, which needs no potential
+        updates, and return the rows that are still unassigned.
+        """
+        rows = np.flatnonzero(self._columns < 0)
+        if not len(rows):
+            return rows
+        best = np.argmin(self._cost_matrix[rows] - self._potentials, axis=1)
+        # The rows of every column in the order of the rows, so the first free places go to the first rows
+        order = np.argsort(best, kind='stable')
+        rows, best = rows[order], best[order]
+        rank = np.arange(len(rows)) - np.searchsorted(best, best)
+        fits = rank < (self._capacities - self._loads)[best]
+        self._columns[rows[fits]] = best[fits]
+        self._loads += np.bincount(best[fits], minlength=len(self._loads))
+        return np.sort(rows[~fits])
+
+    def _update_moves(self, columns):
+        """
+        Recompute the cheapest moves of the rows of the given columns to every other column.
+        """
+        for column in columns:
+            members = np.flatnonzero(self._columns == column)
+            if not len(members):
+                self._move_costs[column] = np.inf
+                continue
+            differences = self._cost_matrix[members] - self._cost_matrix[members, column, np.newaxis]
+            best_members = np.argmin(differences, axis=0)
+            self._move_costs[column] = differences[best_members, np.arange(differences.shape[1])]
+            self._move_rows[column] = members[best_members]
+
+    def _augment(self, row):
+        """
+        Assign one row along a shortest augmenting path (Dijkstra over the columns) and update the potentials.
+        """
+        num_columns = len(self._potentials)
+        reduced = self._cost_matrix[row] - self._potentials
+        distances = reduced - reduced.min()
+        # The distances of the columns that are not settled yet (infinite for the settled ones)
+        open_distances = distances.copy()
+        # The column that reached every column on the shortest path (-1 for the unassigned row)
+        predecessors = np.full(num_columns, -1, dtype=np.int64)
+        settled = np.zeros(num_columns, dtype=bool)
+        free = self._loads < self._capacities
+
+        while True:
+            column = int(open_distances.argmin())
+            settled[column] = True
+            open_distances[column] = np.inf
+            if free[column]:
+                break
+            # The reduced cost of the cheapest move of a row of the full column to each other column
+            candidates = (distances[column] + self._potentials[column]) + (self._move_costs[column] - self._potentials)
+            better = (candidates < open_distances) & ~settled
+            distances[better] = open_distances[better] = candidates[better]
+            predecessors[better] = column
+
+        # Columns that were settled before the free column get closer to the unassigned rows
+        shortest = distances[column]
+        self._potentials[settled] += distances[settled] - shortest
+
+        self._loads[column] += 1
+        path = [column]
+        while predecessors[column] >= 0:
+            source = predecessors[column]
+            self._columns[self._move_rows[source, column]] = column
+            column = source
+            path.append(column)
+        self._columns[row] = column
+        self._update_moves(path)
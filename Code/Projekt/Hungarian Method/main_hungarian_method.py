@@ -1,15 +1,137 @@
 #! /usr/bin/env python
 
-from data_loader_Hungarian_Method import load_and_preprocess_data, generate_cost_matrix
-from hungarian_method import hungarian_algorithm
+from data_loader_Hungarian_Method import (get_sub_slot_counts, build_cost_tensor, contract_cost_tensor,
+                                          expand_group_assignment, CostMatrixBuffer, OBJECTIVE_VERSION)
+from hungarian_method import hungarian_algorithm, capacitated_assignment, group_assignment, WarmStartAssignment
 import numpy as np
-import itertools
 import os
+import sys
 import time
 import argparse
 
+# The modules shared by all solvers are located in the parent directory (or next to this file in a lab experiment)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from combination_search import (branch_and_bound, evaluate_in_parallel, enumerate_combinations,  # noqa: E402
+                                find_slot_classes, ORDERS)
+from deadline import DEADLINE  # noqa: E402
+from feasibility import FeasibilityOracle, is_combination_feasible  # noqa: E402
+from instance import load_instance  # noqa: E402
+from phase_timer import TIMER  # noqa: E402
+from result_cache import CACHE, DEFAULT_MAX_SIZE, instance_fingerprint  # noqa: E402
+from run_result import make_result, write_result  # noqa: E402
 
-def main():
+# The warm-start solver of this process, which keeps its solution from one language combination to the next
+_warm_start_solver = None
+# The cost matrix buffer of this process, which keeps the matrix of the previous language combination
+_cost_matrix_buffer = None
+
+
+def get_cost_matrix_buffer(cost_tensor, sub_slot_counts, languages, expanded):
+    """
+    Return the cost matrix buffer of this process for the cost tensor, creating it for a new instance or engine.
+    """
+    global _cost_matrix_buffer
+    if (_cost_matrix_buffer is None or _cost_matrix_buffer.cost_tensor is not cost_tensor
+            or _cost_matrix_buffer.expanded != expanded):
+        _cost_matrix_buffer = CostMatrixBuffer(cost_tensor, sub_slot_counts, languages, expanded)
+    return _cost_matrix_buffer
+
+
+def get_warm_start_solver(sub_slot_counts):
+    """
+    Return the warm-start solver of this process for the given capacities, creating it for a new instance.
+    """
+    global _warm_start_solver
+    if _warm_start_solver is None or not np.array_equal(_warm_start_solver.capacities, sub_slot_counts):
+        _warm_start_solver = WarmStartAssignment(sub_slot_counts)
+    return _warm_start_solver
+
+
+def solve_combination(cost_tensor, sub_slot_counts, languages, engine, combination, groups=None):
+    """
+    Solve the assignment problem for one language combination.
+
+    If groups are given, the members of every pre-formed group are assigned to the same timeslot: the groups are the
+    rows of the groups x timeslots matrix, which is solved by group_assignment whatever the engine.
+
+    Every engine solves the combination optimally, so the result is taken from the result cache (see result_cache.py)
+    if it is known and stored there otherwise.
+
+    Parameters:
+    - cost_tensor (numpy.ndarray): The tensor returned by build_cost_tensor.
+    - sub_slot_counts (numpy.ndarray): The number of sub-slots per original timeslot.
+    - languages (list): A list of language identifiers.
+    - engine (str): "hungarian" for the expanded sub-slot matrix, "flow" for the min-cost flow or "warm-start" for
+      the shortest augmenting path solver that starts from the solution of the previous combination.
+    - combination (tuple): The language of every original timeslot.
+    - groups (tuple): Optional group index of every student, number of members of every group and cost tensor of
+      the groups (see Instance.group_units and contract_cost_tensor).
+
+    Returns:
+    - tuple: The total cost and the list of (student_index, timeslot_index) assignments (infinity and None if the
+      groups do not fit into the timeslots).
+    """
+    cached = CACHE.get(combination)
+    if cached is not None:
+        TIMER.count('cached')
+        total_cost, slots = cached
+        return total_cost, None if slots is None else list(enumerate(slots))
+
+    TIMER.count('tried')
+    if groups is not None:
+        labels, group_sizes, group_cost_tensor = groups
+        with TIMER.phase('build'):
+            cost_matrix = get_cost_matrix_buffer(group_cost_tensor, sub_slot_counts, languages,
+                                                 False).update(combination)
+        with TIMER.phase('optimization'):
+            assignments = group_assignment(cost_matrix, group_sizes, sub_slot_counts)
+        if not assignments:
+            CACHE.put(combination, np.inf, None)
+            return np.inf, None
+        with TIMER.phase('extract'):
+            total_cost = float(sum(cost_matrix[row, col] for row, col in assignments))
+            assignments = expand_group_assignment(assignments, labels)
+        CACHE.put(combination, total_cost, [col for _, col in assignments])
+        return total_cost, assignments
+
+    # Only the columns of the timeslots whose language differs from the previous combination are rewritten; the
+    # Hungarian algorithm works on the expanded sub-slot matrix, the other engines on the students x timeslots matrix
+    with TIMER.phase('build'):
+        cost_matrix = get_cost_matrix_buffer(cost_tensor, sub_slot_counts, languages,
+                                             engine == "hungarian").update(combination)
+    if engine == "flow":
+        # Solve the capacitated assignment directly on the students x timeslots matrix
+        with TIMER.phase('optimization'):
+            assignments = capacitated_assignment(cost_matrix, sub_slot_counts)
+    elif engine == "warm-start":
+        # Only the columns of the timeslots whose language changed since the previous combination are re-solved
+        with TIMER.phase('optimization'):
+            assignments = get_warm_start_solver(sub_slot_counts).solve(cost_matrix)
+    else:
+        # Use the Hungarian algorithm to find the optimal assignment
+        with TIMER.phase('optimization'):
+            assignments = hungarian_algorithm(cost_matrix)
+    # Calculate the total cost of the assignment
+    with TIMER.phase('extract'):
+        total_cost = float(sum(cost_matrix[row, col] for row, col in assignments))
+        if engine == "hungarian":
+            # Every sub-slot column is replaced by its original timeslot
+            slot_of_column = np.repeat(np.arange(len(sub_slot_counts)), sub_slot_counts)
+            assignments = [(row, int(slot_of_column[col])) for row, col in assignments]
+    if CACHE.enabled:
+        CACHE.put(combination, total_cost, [col for _, col in sorted(assignments)])
+    return total_cost, assignments
+
+
+def evaluate_combination(context, combination):
+    """
+    Solve one language combination in a worker process; context holds the arguments of solve_combination.
+    """
+    cost_tensor, sub_slot_counts, languages, engine, groups = context
+    return solve_combination(cost_tensor, sub_slot_counts, languages, engine, combination, groups)
+
+
+def main(argv=None):
     """
     Main function to find the optimal assignment of students to timeslots based on language combinations.
 
@@ -18,49 +140,184 @@ def main():
     that minimizes the total cost. The cost matrix is generated based on the preferences of students
     for each language combination in each timeslot. The script outputs the optimal language combination
     and the assignment of students to timeslots with the minimum total cost.
+
+    Parameters:
+    - argv (list): The command line arguments; defaults to sys.argv[1:]. batch_solve.py passes them to solve many
+      instances in one process.
     """
+    # The warm-start solver and the cost matrix buffer belong to the previous instance of a batch
+    global _warm_start_solver, _cost_matrix_buffer
+    _warm_start_solver = None
+    _cost_matrix_buffer = None
+
     parser = argparse.ArgumentParser(description="Run the Hungarian method on a benchmark file.")
     parser.add_argument("benchmark_file", type=str, help="Path to the benchmark file")
-    args = parser.parse_args()
+    parser.add_argument("--engine", choices=["hungarian", "flow", "warm-start"], default="hungarian",
+                        help="Solve each combination with the Hungarian algorithm on the expanded sub-slot matrix "
+                             "(hungarian), as a min-cost flow on the students x timeslots matrix (flow) or by "
+                             "shortest augmenting paths on the students x timeslots matrix that only re-assign the "
+                             "students of the timeslots whose language changed since the previous combination "
+                             "(warm-start). Instances with pre-formed groups are solved on the groups x timeslots "
+                             "matrix instead, unless --ignore-groups is given"),
+    parser.add_argument("--search", choices=["enumerate", "branch-and-bound"], default="enumerate",
+                        help="Evaluate every language combination (enumerate) or skip combinations whose lower bound "
+                             "cannot beat the best assignment found so far (branch-and-bound)")
+    parser.add_argument("--order", choices=ORDERS, default="lexicographic",
+                        help="Order of the language combinations of the enumerate search: lexicographic or a Gray "
+                             "code in which consecutive combinations differ in one timeslot, so the cost matrix and "
+                             "the warm-start engine only have to be updated for that timeslot")
+    parser.add_argument("--ignore-groups", action="store_true",
+                        help="Assign the members of pre-formed groups independently of each other, which can split "
+                             "the groups between timeslots")
+    parser.add_argument("--reduce-symmetry", action="store_true",
+                        help="Treat timeslots with the same preferences of all students and the same number of "
+                             "sub-slots as interchangeable and only evaluate one language combination per number of "
+                             "timeslots of every language among them")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes that evaluate the language combinations of the enumerate "
+                             "search in parallel (default: 1)")
+    parser.add_argument("--result-file", type=str,
+                        help="Write the result as a JSON record (see run_result.py) to this file instead of printing "
+                             "the assignment")
+    parser.add_argument("--time-limit", type=float,
+                        help="Stop after this many seconds and report the best assignment found so far, which is then "
+                             "not proven optimal (default: no limit)")
+    parser.add_argument("--cache", type=str,
+                        help="SQLite database with the results of single language combinations (see result_cache.py). "
+                             "Combinations found in it are not solved again, and the solved ones are added")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_SIZE,
+                        help="Size limit of the cache in megabytes; the least recently used results are removed "
+                             "beyond it (default: %(default)g)")
+    args = parser.parse_args(argv)
     start_time = time.time()
+    DEADLINE.start(args.time_limit, start_time)
     # Path to the benchmark file containing student and timeslot data
     # benchmark_file = os.path.join(os.path.expanduser('~'), 'Desktop', 'Bachelor Arbeit', 'Code', 'Projekt',
     # 'benchmarks', 'n50-s11-01')
     benchmark_file = args.benchmark_file
     try:
         # Load data from the benchmark file and preprocess it
-        students, timeslots, student_ids, timeslot_ids, expanded_timeslots = load_and_preprocess_data(benchmark_file)
-        # Generate all possible language combinations for the timeslots
-        language_combinations = list(itertools.product(['E', 'G'], repeat=len(timeslots)))
+        with TIMER.phase('load'):
+            instance = load_instance(benchmark_file)
+        with TIMER.phase('preprocess'):
+            languages = ['E', 'G']
+            sub_slot_counts = get_sub_slot_counts(instance.num_students, instance.num_timeslots)
+            slot_classes = find_slot_classes(instance.availability, sub_slot_counts) if args.reduce_symmetry else None
     except MemoryError:
         print("MemoryError: The number of timeslots is too large to handle all language combinations in memory.")
         return
 
-    # Set initial minimum cost to infinity and optimal assignment to None
     np.set_printoptions(suppress=True)
-    min_cost = np.inf
-    optimal_assignment = None
-    optimal_combination = None
-
-    # Iterate over all language combinations and find the optimal assignment
-    for combination in language_combinations:
-        # Generate the cost matrix for the current language combination
-        cost_matrix = generate_cost_matrix(students, timeslot_ids, combination, expanded_timeslots, timeslots)
-        # Use the Hungarian algorithm to find the optimal assignment
-        assignments = hungarian_algorithm(cost_matrix)
-        # Calculate the total cost of the assignment
-        total_cost = sum(cost_matrix[row, col] for row, col in assignments)
 
-        # Update the minimum cost and optimal assignment if the current assignment has lower cost
-        if total_cost < min_cost:
-            min_cost = total_cost
-            optimal_assignment = assignments
-            optimal_combination = combination
+    with TIMER.phase('preprocess'):
+        # Precompute the costs of every student, timeslot and language once per instance
+        cost_tensor = build_cost_tensor(instance.availability, instance.language_columns(languages))
+        # The members of a pre-formed group share their timeslot, so every group becomes one row of summed costs
+        labels, group_sizes = instance.group_units()
+        if args.ignore_groups or (group_sizes == 1).all():
+            groups = None
+            bound_tensor = cost_tensor
+        else:
+            bound_tensor = contract_cost_tensor(cost_tensor, labels, len(group_sizes))
+            groups = (labels, group_sizes, bound_tensor)
+        # Combinations that force an unmet preference cost at least 100 * num_students and only have to be solved
+        # if every combination does. With groups, the oracle ignores that members share their timeslot, so a
+        # combination it accepts may still force an unmet preference (see below)
+        feasibility_oracle = FeasibilityOracle(instance.availability, instance.language_columns(languages),
+                                               sub_slot_counts, languages)
+
+        # The results of the language combinations solved by earlier runs on the same instance; keeping the groups
+        # together changes the optimal costs
+        CACHE.open(args.cache, instance_fingerprint(instance, languages) if args.cache else None,
+                   "hungarian_ignore_groups" if args.ignore_groups else "hungarian", OBJECTIVE_VERSION,
+                   args.cache_size)
 
-    formatted_assignment = [
-        (student_ids[student_idx], timeslot_ids[timeslot_idx].rsplit('_', 1)[0])
-        for student_idx, timeslot_idx in optimal_assignment
-    ]
+    # The combinations rejected by the feasibility oracle, which are only solved after the search (see below)
+    rejected = []
+
+    def evaluate(combination):
+        if not is_combination_feasible(feasibility_oracle, combination):
+            rejected.append(combination)
+            return np.inf, None
+        return solve_combination(cost_tensor, sub_slot_counts, languages, args.engine, combination, groups)
+
+    def accepted_combinations():
+        """
+        Yield the combinations the feasibility oracle accepts to the worker processes and keep the others.
+        """
+        for combination in enumerate_combinations(languages, instance.num_timeslots, slot_classes, args.order):
+            if DEADLINE.expired():
+                TIMER.count('interrupted')
+                return
+            if is_combination_feasible(feasibility_oracle, combination):
+                yield combination
+            else:
+                rejected.append(combination)
+
+    def search(combinations=None):
+        """
+        Search the given language combinations (all accepted ones if None) and return the minimum cost, its
+        combination and its assignment.
+        """
+        if args.search == "branch-and-bound" and combinations is None:
+            # Fix the timeslot languages one after another and skip subtrees that cannot beat the best assignment
+            min_cost, optimal_combination, optimal_assignment, statistics = branch_and_bound(
+                bound_tensor, languages, evaluate, slot_classes)
+            statistics.report()
+            return min_cost, optimal_combination, optimal_assignment
+        if args.workers > 1:
+            # Solve the language combinations on a pool of worker processes; the oracle runs in this process, so it
+            # can keep the rejected combinations
+            context = (cost_tensor, sub_slot_counts, languages, args.engine, groups)
+            min_cost, optimal_combination, optimal_assignment, statistics = evaluate_in_parallel(
+                instance.num_timeslots, languages, evaluate_combination, context, args.workers, bound_tensor,
+                slot_classes=slot_classes, order=args.order,
+                combinations=accepted_combinations() if combinations is None else combinations)
+            statistics.report()
+            return min_cost, optimal_combination, optimal_assignment
+
+        # Iterate over all language combinations and find the optimal assignment; they are generated one at a time,
+        # since there are too many to keep them in memory for many timeslots
+        min_cost, optimal_combination, optimal_assignment = np.inf, None, None
+        if combinations is None:
+            combinations = enumerate_combinations(languages, instance.num_timeslots, slot_classes, args.order)
+            solve = evaluate
+        else:
+            def solve(combination):
+                return solve_combination(cost_tensor, sub_slot_counts, languages, args.engine, combination, groups)
+        for combination in combinations:
+            if DEADLINE.expired():
+                TIMER.count('interrupted')
+                break
+            total_cost, assignments = solve(combination)
+
+            # Update the minimum cost and optimal assignment if the current assignment has lower cost
+            if total_cost < min_cost:
+                min_cost = total_cost
+                optimal_assignment = assignments
+                optimal_combination = combination
+        return min_cost, optimal_combination, optimal_assignment
+
+    min_cost, optimal_combination, optimal_assignment = search()
+    if rejected and min_cost >= 100 * instance.num_students:
+        # Every accepted combination forces an unmet preference (or none was accepted), so a rejected one may be
+        # cheaper; only the rejected ones are solved, the accepted ones are not searched again. Like a search without
+        # the oracle, the first combination in lexicographic order wins among equal costs
+        def lexicographic_key(combination):
+            return [languages.index(language) for language in combination]
+
+        rejected.sort(key=lexicographic_key)
+        fallback = search(rejected)
+        if fallback[0] < min_cost or (fallback[1] is not None and fallback[0] == min_cost
+                                      and lexicographic_key(fallback[1]) < lexicographic_key(optimal_combination)):
+            min_cost, optimal_combination, optimal_assignment = fallback
+
+    with TIMER.phase('extract'):
+        # The assignments of all engines refer to the original timeslots
+        formatted_assignment = [
+            (instance.student_ids[student_idx], instance.timeslot_ids[timeslot_idx])
+            for student_idx, timeslot_idx in optimal_assignment or []
+        ]
 
     # Output the optimal assignment and language combination
     # print(f'Optimal assignment for language combination {optimal_combination} with total costs {min_cost}:')
@@ -72,9 +329,24 @@ def main():
     end_time = time.time()
     solve_time = end_time - start_time
 
+    # Without an interruption by the time limit, every combination was evaluated or pruned
+    proven_optimal = TIMER.counts['interrupted'] == 0
+    # Every student (or group) pays at least their cheapest cost, whatever the language combination
+    lower_bound = float(bound_tensor.min(axis=(1, 2)).sum())
+
     # print(best_solution_value)
-    print(f"Assignment: {formatted_assignment}")
+    TIMER.report()
+    if args.result_file:
+        write_result(args.result_file, make_result(instance, min_cost, formatted_assignment, solve_time,
+                                                   proven_optimal=proven_optimal,
+                                                   lower_bound=None if proven_optimal else lower_bound,
+                                                   **TIMER.as_properties()))
+    else:
+        print(f"Assignment: {formatted_assignment}")
     print(f"Total cost: {min_cost}")
+    print(f"Proven optimal: {int(proven_optimal)}")
+    if not proven_optimal:
+        print(f"Lower bound: {lower_bound}")
     print(f"Solve time: {solve_time}s")
 
 
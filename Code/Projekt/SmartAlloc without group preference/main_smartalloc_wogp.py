@@ -1,71 +1,118 @@
 #! /usr/bin/env python
 
 import argparse
-import itertools
 import logging
 import time
 import os
-from data_loader_smartalloc_wogp import load_and_preprocess_data
-from solver_wogp import create_solver, define_variables, define_constraints, define_objective
+import sys
+from solver_wogp import define_variables, define_constraints, define_objective
+import numpy as np
 from ortools.linear_solver import pywraplp
 
-
-def is_combination_feasible(language_preferences, language_combination, timeslots):
+# The modules shared by all solvers are located in the parent directory (or next to this file in a lab experiment)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from milp_solver import (create_solver, solve_model, is_proven_optimal, count_interruption,  # noqa: E402
+                         compute_capacities, compute_penalty_tensor, combination_penalties, extract_slots,
+                         add_solver_arguments, solver_parameters_from_args, DEFAULT_SOLVER_PARAMETERS,
+                         OBJECTIVE_VERSION)
+from combination_search import evaluate_in_parallel, enumerate_combinations, find_slot_classes  # noqa: E402
+from deadline import DEADLINE  # noqa: E402
+from feasibility import FeasibilityOracle, is_combination_feasible  # noqa: E402
+from instance import load_instance  # noqa: E402
+from phase_timer import TIMER  # noqa: E402
+from result_cache import CACHE, DEFAULT_MAX_SIZE, instance_fingerprint  # noqa: E402
+from run_result import decode_assignment, make_result, write_result  # noqa: E402
+
+
+def solve_combination(instance, languages, penalty_tensor, capacities, language_combination, backend='scip',
+                      solver_parameters=None):
     """
-    Checks if a given language combination is feasible for all students across the specified timeslots.
-
-    This function iterates through each timeslot and assigns the corresponding language from the language_combination.
-    It then checks for each student if there is at least one timeslot where a preferred language is available.
-    If any student does not have a preferred language available in any of the timeslots, the combination is deemed
-    infeasible.
+    Builds and solves the SCIP model for a single language combination.
 
     Args:
-        language_preferences (dict): A dictionary mapping each student to their language preferences.
-                                     The preferences are represented as a dictionary of languages with their
-                                     corresponding preference level.
-        language_combination (tuple): A tuple representing the selected language for each timeslot.
-        timeslots (list): A list of timeslots available for assignment.
+        instance (Instance): The instance.
+        languages (list): The languages in the order of the last axis of the penalty tensor.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot, see compute_capacities.
+        language_combination (tuple): The language of every timeslot.
+        backend (str): The MILP backend, see milp_solver.BACKENDS.
+        solver_parameters (dict): Optional solver parameter overrides, see milp_solver.DEFAULT_SOLVER_PARAMETERS.
 
     Returns:
-        bool: True if the language combination is feasible for all students, False otherwise.
+        tuple: The optimal solution value (float('inf') if no solution was found) and the timeslot index of every
+            student (None if no solution was found). If the time limit stops SCIP, the best solution found so far is
+            returned. The result is taken from the result cache (see result_cache.py) if it is known, and stored
+            there if it is proven optimal or infeasible.
     """
-    # Create a set of available languages for each slot
-    available_languages_per_slot = {slot: set() for slot in timeslots}
-    for slot, language in zip(timeslots, language_combination):
-        available_languages_per_slot[slot].add(language)
-
-    # Check for each student if at least one preferred language is available in any timeslot
-    for student, preferences in language_preferences.items():
-        if not any(preferences[language] > 0 for slot in timeslots for language in available_languages_per_slot[slot]):
-            return False  # At least one student cannot find a suitable slot
-
-    return True
-
-
-def adjust_language_preferences(original_preferences, language_combination, timeslots):
+    cached = CACHE.get(language_combination)
+    if cached is not None:
+        TIMER.count('cached')
+        return cached
+
+    TIMER.count('tried')
+    with TIMER.phase('build'):
+        penalties = combination_penalties(penalty_tensor, language_combination, languages)
+        solver = create_solver(backend, solver_parameters)
+        if not solver:
+            return float('inf'), None
+
+        allowed = np.isfinite(penalties)
+        x = define_variables(solver, allowed)
+        define_constraints(solver, x, capacities, instance.num_students)
+        define_objective(solver, x, penalties)
+    if DEADLINE.expired():
+        # The time limit was reached while the model was built
+        TIMER.count('interrupted')
+        return float('inf'), None
+    with TIMER.phase('optimization'):
+        DEADLINE.limit_solver(solver)
+        status = solve_model(solver, solver_parameters)
+
+    count_interruption(status)
+    if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        with TIMER.phase('extract'):
+            slots = extract_slots(x, instance.num_students)
+        solution_value = solver.Objective().Value()
+        if is_proven_optimal(status, solution_value, solver_parameters):
+            CACHE.put(language_combination, solution_value, slots)
+        return solution_value, slots
+    elif status == pywraplp.Solver.INFEASIBLE:
+        TIMER.count('infeasible')
+        CACHE.put(language_combination, float('inf'), None)
+        print(f"The problem is infeasible for {language_combination}.")
+    else:
+        print('The problem does not have an optimal solution.')
+    return float('inf'), None
+
+
+def evaluate_combination(context, language_combination):
     """
-    Adjusts the language preferences based on a given language combination and timeslots.
+    Solves one language combination in a worker process of the parallel enumeration.
 
     Args:
-        original_preferences (dict): Original language preferences of students.
-        language_combination (tuple): A tuple representing a combination of languages for the timeslots.
-        timeslots (list): List of timeslots.
+        context (tuple): The instance, languages, penalty tensor, capacities and feasibility oracle, the MILP backend
+            and the solver parameters.
+        language_combination (tuple): The language of every timeslot.
 
     Returns:
-        dict: Adjusted language preferences.
+        tuple: The optimal solution value (float('inf') if the combination is infeasible) and the timeslot index of
+            every student.
     """
-    adjusted_preferences = {}
-    for student, preferences in original_preferences.items():
-        adjusted_preferences[student] = {}
-        for slot, language in zip(timeslots, language_combination):
-            adjusted_preferences[student][slot] = preferences.get(language)
-    return adjusted_preferences
+    instance, languages, penalty_tensor, capacities, feasibility_oracle, backend, solver_parameters = context
+    if not is_combination_feasible(feasibility_oracle, language_combination):
+        return float('inf'), None
+    return solve_combination(instance, languages, penalty_tensor, capacities, language_combination, backend,
+                             solver_parameters)
 
 
-def main():
+def main(argv=None):
     """
     Main function to find the optimal assignment of students to timeslots based on timeslot, language and group
     preferences.
+
+    Args:
+        argv (list): The command line arguments; defaults to sys.argv[1:]. batch_solve.py passes them to solve many
+            instances in one process.
     """
     start_time = time.time()
     logging.basicConfig(level=logging.CRITICAL)
@@ -74,44 +121,76 @@ def main():
     # 'benchmarks', 'n50-s11-01')
     parser = (argparse.ArgumentParser(description='Solve the SmartAlloc problem.'))
     parser.add_argument('benchmark_file', type=str, help='Path to the benchmark file containing student and timeslot data.')
-    args = parser.parse_args()
+    add_solver_arguments(parser)
+    parser.add_argument('--reduce-symmetry', action='store_true',
+                        help='Treat timeslots with the same preferences of all students and the same capacity as '
+                             'interchangeable and only solve one language combination per number of timeslots of '
+                             'every language among them.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes that solve the language combinations in parallel '
+                             '(default: 1).')
+    parser.add_argument('--result-file', type=str,
+                        help='Write the result as a JSON record (see run_result.py) to this file instead of printing '
+                             'the assignment.')
+    parser.add_argument('--time-limit', type=float,
+                        help='Stop after this many seconds and report the best assignment found so far, which is then '
+                             'not proven optimal (default: no limit).')
+    parser.add_argument('--cache', type=str,
+                        help='SQLite database with the results of single language combinations (see result_cache.py). '
+                             'Combinations found in it are not solved again, and the ones proven optimal or '
+                             'infeasible are added.')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_MAX_SIZE,
+                        help='Size limit of the cache in megabytes; the least recently used results are removed '
+                             'beyond it (default: %(default)g).')
+    args = parser.parse_args(argv)
+    DEADLINE.start(args.time_limit, start_time)
+    solver_parameters = solver_parameters_from_args(args)
     benchmark_file = args.benchmark_file
     # Load data from the benchmark file
-    students, timeslots, availability, num_students, language_preferences = (
-        load_and_preprocess_data(benchmark_file))
+    with TIMER.phase('load'):
+        instance = load_instance(benchmark_file)
 
     languages = ['E', 'G']  # Define the languages to consider
     best_solution_value = float('inf')
     best_combination = None
-    best_assignment = []
-
-    # Iterate over all possible language combinations
-    for language_combination in itertools.product(languages, repeat=len(timeslots)):
-        if not is_combination_feasible(language_preferences, language_combination, timeslots):
-            # print(f"The problem is infeasible for {language_combination}")
-            continue
-
-        adjusted_language_preferences = adjust_language_preferences(language_preferences, language_combination,
-                                                                    timeslots)
-        solver = create_solver()
-        if solver:
-            x = define_variables(solver, students, timeslots)
-            define_constraints(solver, x, students, timeslots, availability, num_students,
-                               adjusted_language_preferences)
-            define_objective(solver, x, students, timeslots, availability, adjusted_language_preferences)
-            status = solver.Solve()
-
-            if status == pywraplp.Solver.OPTIMAL:
-                solution_value = solver.Objective().Value()
-                if solution_value < best_solution_value:
-                    best_solution_value = solution_value
-                    best_combination = language_combination
-                    best_assignment = [(student, slot) for student in students for slot in timeslots if
-                                       x[student, slot].solution_value() == 1]
-            elif status == pywraplp.Solver.INFEASIBLE:
-                print(f"The problem is infeasible for {language_combination}.")
-            else:
-                print('The problem does not have an optimal solution.')
+    best_slots = None
+
+    with TIMER.phase('preprocess'):
+        capacities = compute_capacities(instance.num_timeslots, instance.num_students)
+        slot_classes = find_slot_classes(instance.availability, capacities) if args.reduce_symmetry else None
+        penalty_tensor = compute_penalty_tensor(instance.availability, instance.language_columns(languages))
+        # Rejects the combinations for which not every student can get an allowed timeslot
+        feasibility_oracle = FeasibilityOracle(instance.availability, instance.language_columns(languages),
+                                               capacities, languages)
+        # The results of the language combinations solved by earlier runs on the same instance
+        CACHE.open(args.cache, instance_fingerprint(instance, languages) if args.cache else None,
+                   'smartalloc_without_group_preference', OBJECTIVE_VERSION, args.cache_size)
+
+    if args.workers > 1:
+        # Solve the language combinations on a pool of worker processes
+        context = (instance, languages, penalty_tensor, capacities, feasibility_oracle, args.backend, solver_parameters)
+        best_solution_value, best_combination, best_slots, statistics = evaluate_in_parallel(
+            instance.num_timeslots, languages, evaluate_combination, context, args.workers, penalty_tensor,
+            slot_classes=slot_classes)
+        statistics.report()
+    else:
+        # Iterate over all possible language combinations
+        for language_combination in enumerate_combinations(languages, instance.num_timeslots, slot_classes):
+            if DEADLINE.expired():
+                TIMER.count('interrupted')
+                break
+            if not is_combination_feasible(feasibility_oracle, language_combination):
+                # print(f"The problem is infeasible for {language_combination}")
+                continue
+
+            solution_value, slots = solve_combination(instance, languages, penalty_tensor, capacities,
+                                                      language_combination, args.backend, solver_parameters)
+            if solution_value < best_solution_value:
+                best_solution_value = solution_value
+                best_combination = language_combination
+                best_slots = slots
+    # The assignment is reported as (student, timeslot) pairs
+    best_assignment = decode_assignment(instance, best_slots) if best_slots is not None else []
 
     # Output the number of students assigned to each timeslot
 
@@ -123,7 +202,7 @@ def main():
     # Output the number of students assigned to each timeslot
 
     # print('\nNumber of students per timeslot:')
-    # for slot in timeslots:
+    # for slot in instance.timeslot_ids:
         # num_students_assigned = sum(1 for student, assigned_slot in best_assignment if assigned_slot == slot)
         # print(f'Timeslot {slot}: {num_students_assigned} Student(en)')
 
@@ -132,11 +211,39 @@ def main():
     end_time = time.time()
     solve_time = end_time - start_time
 
+    # Without an interruption by the time limit, every combination was solved or pruned to optimality
+    proven_optimal = TIMER.counts['interrupted'] == 0
+    # Every student pays at least their cheapest penalty, whatever the language combination
+    lower_bound = float(penalty_tensor.min(axis=(1, 2)).sum())
+    if args.relative_gap > DEFAULT_SOLVER_PARAMETERS['relative_gap']:
+        # The costs are integers, so a solve within the gap is only optimal if the gap is below one
+        proven_optimal = proven_optimal and (best_solution_value == float('inf')
+                                             or args.relative_gap * best_solution_value < 1)
+
+    TIMER.report()
+    print(f"Solver backend: {args.backend}")
+    print(f"Solver threads: {args.threads}")
+    print(f"Relative gap: {args.relative_gap}")
+    print(f"Presolve: {int(solver_parameters['presolve'])}")
+    print(f"Solver parameters: {args.solver_params!r}")
     if best_solution_value != float('inf'):
         print(f"Total cost: {best_solution_value}")
-
-    # Adjusted so that the empty assignments resp. unsolvable problems are also considered.
-    print(f"Assignment: {best_assignment}")
+    print(f"Proven optimal: {int(proven_optimal)}")
+    if not proven_optimal:
+        print(f"Lower bound: {lower_bound}")
+
+    if args.result_file:
+        write_result(args.result_file, make_result(instance, best_solution_value, best_assignment, solve_time,
+                                                   proven_optimal=proven_optimal,
+                                                   lower_bound=None if proven_optimal else lower_bound,
+                                                   solver_backend=args.backend, solver_threads=args.threads,
+                                                   relative_gap=args.relative_gap,
+                                                   presolve=solver_parameters['presolve'],
+                                                   solver_specific_parameters=args.solver_params,
+                                                   **TIMER.as_properties()))
+    else:
+        # Adjusted so that the empty assignments resp. unsolvable problems are also considered.
+        print(f"Assignment: {best_assignment}")
     print(f"Solve time: {solve_time}s")
 
 
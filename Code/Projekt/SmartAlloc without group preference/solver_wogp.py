@@ -1,113 +1,67 @@
 #! /usr/bin/env python
 
-from ortools.linear_solver import pywraplp
+import numpy as np
 
 
-def create_solver():
-    """
-    Creates a SCIP solver instance.
-
-    Returns:
-        A SCIP solver instance if successful, None otherwise.
-    """
-    solver = pywraplp.Solver.CreateSolver('SCIP')
-    if not solver:
-        return None
-    return solver
-
-
-def define_variables(solver, students, timeslots):
+def define_variables(solver, allowed):
     """
     Defines boolean variables for each student and timeslot combination.
 
+    Variables are only created for the pairs that are allowed, e.g. with availability and language preference greater
+    than 0 under a language combination. The other pairs would be fixed to 0 anyway, so leaving them out keeps the
+    model small; all functions below treat a missing pair as 0.
+
     Args:
         solver: The SCIP solver instance.
-        students: A list of student identifiers.
-        timeslots: A list of timeslot identifiers.
+        allowed: A boolean array of shape (number of students, number of timeslots).
 
     Returns:
-        A dictionary mapping (student, timeslot) pairs to SCIP boolean variables.
+        A dictionary mapping (student index, timeslot index) pairs to SCIP boolean variables.
     """
     x = {}
-    for student in students:
-        for slot in timeslots:
-            x[student, slot] = solver.BoolVar(f'x_{student}_{slot}')
+    students, slots = np.nonzero(allowed)
+    for student, slot in zip(students.tolist(), slots.tolist()):
+        x[student, slot] = solver.BoolVar(f'x_{student}_{slot}')
     return x
 
 
-def define_constraints(solver, x, students, timeslots, availability, num_students, language_preferences):
+def define_constraints(solver, x, capacities, num_students):
     """
-    Defines the constraints for the solver based on student availability, timeslot capacities,
-    and language preferences.
+    Defines the constraints for the solver based on timeslot capacities. The pairs with availability or language
+    preference 0 have no variable (see define_variables), so they need no constraint.
 
     Args:
         solver: The SCIP solver instance.
         x: The dictionary of decision variables.
-        students: A list of student identifiers.
-        timeslots: A list of timeslot identifiers.
-        availability: A dictionary mapping (student, timeslot) pairs to availability scores.
-        num_students: The total number of students.
-        language_preferences: A dictionary mapping (student, timeslot) pairs to language preference scores.
+        capacities: An integer array with the capacity of every timeslot, see milp_solver.compute_capacities.
+        num_students: The number of students; a student without any variable makes the model infeasible.
     """
-    # Set capacity per slot based on the number of students divided by the number of slots
-    capacity_per_slot = num_students // len(timeslots)
-    capacities = {slot: capacity_per_slot for slot in timeslots}
-
-    remaining_students = num_students % len(timeslots)
-    for i, slot in enumerate(timeslots):
-        if i < remaining_students:
-            capacities[slot] += 1
-
-    for slot in timeslots:
-        solver.Add(solver.Sum([x[student, slot] for student in students]) <= capacities[slot])
+    slot_terms = [[] for _ in range(len(capacities))]
+    student_terms = [[] for _ in range(num_students)]
+    for (student, slot), variable in x.items():
+        slot_terms[slot].append(variable)
+        student_terms[student].append(variable)
 
-    for student in students:
-        for slot in timeslots:
-            if availability[student][slot] == 0:
-                solver.Add(x[student, slot] == 0)
+    for terms, capacity in zip(slot_terms, np.asarray(capacities).tolist()):
+        solver.Add(solver.Sum(terms) <= capacity)
 
-    for student in students:
-        for slot in timeslots:
-            if language_preferences[student][slot] == 0:
-                solver.Add(x[student, slot] == 0)
+    for terms in student_terms:
+        solver.Add(solver.Sum(terms) == 1)
 
-    for student in students:
-        solver.Add(solver.Sum([x[student, slot] for slot in timeslots]) == 1)
 
-
-def define_objective(solver, x, students, timeslots, availability, language_preferences):
+def define_objective(solver, x, penalties):
     """
     Defines the objective function for the solver to maximize student preferences while minimizing penalties.
 
     Args:
         solver: The SCIP solver instance.
         x: The dictionary of decision variables.
-        students: A list of student identifiers.
-        timeslots: A list of timeslot identifiers.
-        availability: A dictionary mapping (student, timeslot) pairs to availability scores.
-        language_preferences: A dictionary mapping (student, timeslot) pairs to language preference scores.
+        penalties: The (number of students, number of timeslots) penalties of the language combination, see
+            milp_solver.combination_penalties.
     """
-    # objective_terms = []
-    penalty_terms = []
-    num_students = len(students)
-    penalty_factor = 100 * num_students
-
-    for student in students:
-        for slot in timeslots:
-            availability_score = availability[student][slot]
-            language_preference_score = language_preferences[student][slot]
-
-            # Penalty based on preferences
-            penalty = 0
-            if availability_score == 1:
-                penalty += 1
-
-            if language_preference_score == 1:
-                penalty += 1
-
-            # Add penalty terms for non-preferred assignments
-            penalty_terms.append(penalty * x[student, slot])
-
-    solver.Minimize(solver.Sum(penalty_terms))
-
-
+    students, slots = np.array(list(x), dtype=np.int64).reshape(-1, 2).T
+    coefficients = penalties[students, slots]
+    objective = solver.Objective()
+    for variable, penalty in zip(x.values(), np.where(np.isfinite(coefficients), coefficients, 0.0).tolist()):
+        objective.SetCoefficient(variable, penalty)
+    objective.SetMinimization()
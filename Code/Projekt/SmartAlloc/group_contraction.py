@@ -0,0 +1,39 @@
+#! /usr/bin/env python
+
+import numpy as np
+
+
+def compute_unit_penalties(penalties, labels, num_units):
+    """
+    Computes the summed penalty of every unit for every timeslot.
+
+    Members of a pre-formed group have to be assigned to the same timeslot, so the solver can decide for the whole
+    group at once (see Instance.group_units). A unit may only be assigned to a timeslot if all its members may be
+    assigned to it, which the sum keeps: a single infinite penalty makes the sum infinite.
+
+    Args:
+        penalties: The (number of students, number of timeslots) penalties of a language combination, see
+            milp_solver.combination_penalties.
+        labels: The unit index of every student, see Instance.group_units.
+        num_units: The number of units.
+
+    Returns:
+        numpy.ndarray: A float array of shape (number of units, number of timeslots); forbidden pairs are infinite.
+    """
+    unit_penalties = np.zeros((num_units, penalties.shape[1]))
+    np.add.at(unit_penalties, labels, penalties)
+    return unit_penalties
+
+
+def expand_assignment(unit_slots, labels):
+    """
+    Expands an assignment of units to timeslots back to the individual students.
+
+    Args:
+        unit_slots: The timeslot index of every unit.
+        labels: The unit index of every student, see Instance.group_units.
+
+    Returns:
+        numpy.ndarray: The timeslot index of every student.
+    """
+    return np.asarray(unit_slots)[labels]
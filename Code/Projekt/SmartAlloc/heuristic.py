@@ -0,0 +1,223 @@
+#! /usr/bin/env python
+
+import numpy as np
+from ortools.graph.python import min_cost_flow
+
+
+def _split_flow(unit_sizes, capacities, costs, allowed):
+    """
+    Solves the min-cost flow in which the members of a unit may be assigned to different timeslots.
+
+    Every unit sends one unit of flow per member over its allowed timeslots and every timeslot takes at most its
+    capacity, so the flow exists whenever the members fit into the timeslots one by one.
+
+    Returns:
+        tuple: The timeslot that received most of the members of every unit and a unit that was split (or None), or
+            None if the members do not fit into the allowed timeslots.
+    """
+    units, slots = np.nonzero(allowed)
+    num_units, num_timeslots = allowed.shape
+    source = num_units + num_timeslots
+    sink = source + 1
+    demand = int(unit_sizes.sum())
+
+    smcf = min_cost_flow.SimpleMinCostFlow()
+    smcf.add_arcs_with_capacity_and_unit_cost(np.full(num_units, source, dtype=np.int32),
+                                              np.arange(num_units, dtype=np.int32), unit_sizes,
+                                              np.zeros(num_units, dtype=np.int64))
+    assignment_arcs = smcf.add_arcs_with_capacity_and_unit_cost(units.astype(np.int32),
+                                                                (slots + num_units).astype(np.int32),
+                                                                unit_sizes[units], costs[units, slots])
+    smcf.add_arcs_with_capacity_and_unit_cost(np.arange(num_units, source, dtype=np.int32),
+                                              np.full(num_timeslots, sink, dtype=np.int32), capacities,
+                                              np.zeros(num_timeslots, dtype=np.int64))
+    smcf.set_node_supply(source, demand)
+    smcf.set_node_supply(sink, -demand)
+    if smcf.solve() != smcf.OPTIMAL:
+        return None
+
+    flows = smcf.flows(assignment_arcs)
+    # The arcs are written in the order of their flow, so every unit keeps the timeslot with the largest flow
+    order = np.argsort(flows, kind='stable')
+    unit_slots = np.empty(num_units, dtype=np.int64)
+    unit_slots[units[order]] = slots[order]
+    split = np.flatnonzero((flows > 0) & (flows < unit_sizes[units]))
+    return unit_slots, (int(units[split[0]]) if len(split) else None)
+
+
+def flow_assignment(unit_sizes, capacities, penalties):
+    """
+    Assigns the units to timeslots by min-cost flow, so an assignment is found whenever one exists.
+
+    The members of a unit pay equal shares of its penalty (rounded to integers) and are first allowed to split up.
+    Every unit is then kept in the timeslot that received most of its members and the flow is solved again, which
+    places the single students optimally around the groups. If the groups do not fit this way, a split unit is either
+    fixed to that timeslot or forbidden to use it, and the two subproblems are searched depth first until one has an
+    assignment in which no unit is split.
+
+    Args:
+        unit_sizes: An integer array with the number of members of every unit.
+        capacities: An integer array with the capacity of every timeslot.
+        penalties: The (number of units, number of timeslots) penalties, see greedy_assignment.
+
+    Returns:
+        numpy.ndarray: The timeslot index of every unit, or None if the units cannot be packed into the capacities.
+    """
+    unit_sizes = np.asarray(unit_sizes, dtype=np.int64)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    allowed = np.isfinite(penalties)
+    scale = int(np.lcm.reduce(unit_sizes))
+    costs = np.rint(np.where(allowed, penalties, 0.0) * (scale // unit_sizes)[:, np.newaxis]).astype(np.int64)
+    groups = np.flatnonzero(unit_sizes > 1)
+
+    subproblems = [allowed]
+    while subproblems:
+        allowed = subproblems.pop()
+        result = _split_flow(unit_sizes, capacities, costs, allowed)
+        if result is None:
+            continue
+        unit_slots, split_unit = result
+        if split_unit is None:
+            return unit_slots
+
+        # Units of one member cannot be split, so the flow with every group in a single timeslot is an assignment
+        rounded = np.zeros_like(allowed)
+        rounded[groups, unit_slots[groups]] = True
+        singles = unit_sizes == 1
+        rounded[singles] = allowed[singles]
+        result = _split_flow(unit_sizes, capacities, costs, rounded)
+        if result is not None:
+            return result[0]
+
+        forbidden = allowed.copy()
+        forbidden[split_unit, unit_slots[split_unit]] = False
+        fixed = allowed.copy()
+        fixed[split_unit] = False
+        fixed[split_unit, unit_slots[split_unit]] = True
+        # The fixed subproblem is searched first, since it is closest to the flow
+        subproblems.extend([forbidden, fixed])
+    return None
+
+
+def greedy_assignment(unit_sizes, capacities, penalties):
+    """
+    Assigns the units one after another to their cheapest timeslot with enough free places.
+
+    Larger units are placed first, since they are the hardest to fit into the remaining places. If a unit does not
+    fit into any of its allowed timeslots, the greedy placement is given up and all units are placed by
+    flow_assignment instead, so an assignment is found whenever one exists.
+
+    Args:
+        unit_sizes: An integer array with the number of members of every unit.
+        capacities: An integer array with the capacity of every timeslot.
+        penalties: The (number of units, number of timeslots) penalties returned by
+            group_contraction.compute_unit_penalties; forbidden pairs are infinite.
+
+    Returns:
+        numpy.ndarray: The timeslot index of every unit, or None if the units cannot be packed into the capacities.
+    """
+    num_units, num_timeslots = penalties.shape
+    slots = np.full(num_units, -1, dtype=np.int64)
+    loads = np.zeros(num_timeslots, dtype=np.int64)
+
+    # The stable sort keeps units of the same size in their original order
+    for unit in np.argsort(-unit_sizes, kind='stable'):
+        fits = (loads + unit_sizes[unit] <= capacities) & np.isfinite(penalties[unit])
+        if not fits.any():
+            return flow_assignment(unit_sizes, capacities, penalties)
+        slot = int(np.argmin(np.where(fits, penalties[unit], np.inf)))
+        slots[unit] = slot
+        loads[slot] += unit_sizes[unit]
+    return slots
+
+
+def improve_assignment(unit_sizes, capacities, penalties, slots, max_rounds=100):
+    """
+    Improves an assignment of units to timeslots by local search.
+
+    Every round first moves single units to a cheaper timeslot with enough free places and then swaps units of the
+    same size between two timeslots if this lowers the summed penalty. The search stops when a round finds no
+    improvement.
+
+    Args:
+        unit_sizes: An integer array with the number of members of every unit.
+        capacities: An integer array with the capacity of every timeslot.
+        penalties: The (number of units, number of timeslots) penalties, see greedy_assignment.
+        slots: The timeslot index of every unit, e.g. as returned by greedy_assignment.
+        max_rounds: The maximum number of rounds.
+
+    Returns:
+        numpy.ndarray: The improved timeslot index of every unit.
+    """
+    num_units, num_timeslots = penalties.shape
+    slots = slots.copy()
+    loads = np.bincount(slots, weights=unit_sizes, minlength=num_timeslots).astype(np.int64)
+
+    for _ in range(max_rounds):
+        improved = False
+
+        # Moves: a unit changes to a cheaper timeslot that still has enough free places. Units that already have
+        # their cheapest timeslot can be skipped.
+        current_penalties = penalties[np.arange(num_units), slots]
+        for unit in np.flatnonzero((penalties < current_penalties[:, np.newaxis]).any(axis=1)):
+            current = slots[unit]
+            fits = loads + unit_sizes[unit] <= capacities
+            fits[current] = False
+            gains = np.where(fits, penalties[unit, current] - penalties[unit], -np.inf)
+            target = int(np.argmax(gains))
+            if gains[target] > 0:
+                slots[unit] = target
+                loads[current] -= unit_sizes[unit]
+                loads[target] += unit_sizes[unit]
+                improved = True
+
+        # Swaps: units of the same size exchange their timeslots, which keeps the loads unchanged. The units of both
+        # timeslots are sorted by their gain, so pairing them in this order finds all improving pairs at once.
+        for first in range(num_timeslots):
+            for second in range(first + 1, num_timeslots):
+                in_first = np.flatnonzero(slots == first)
+                in_second = np.flatnonzero(slots == second)
+                for size in np.intersect1d(unit_sizes[in_first], unit_sizes[in_second]):
+                    units_a = in_first[unit_sizes[in_first] == size]
+                    units_b = in_second[unit_sizes[in_second] == size]
+                    gains_a = penalties[units_a, first] - penalties[units_a, second]
+                    gains_b = penalties[units_b, second] - penalties[units_b, first]
+                    order_a = np.argsort(-gains_a, kind='stable')
+                    order_b = np.argsort(-gains_b, kind='stable')
+                    count = min(len(units_a), len(units_b))
+                    pair_gains = gains_a[order_a[:count]] + gains_b[order_b[:count]]
+                    num_pairs = int(np.count_nonzero(pair_gains > 0))
+                    if num_pairs:
+                        slots[units_a[order_a[:num_pairs]]] = second
+                        slots[units_b[order_b[:num_pairs]]] = first
+                        improved = True
+
+        if not improved:
+            break
+    return slots
+
+
+def heuristic_assignment(unit_sizes, capacities, unit_penalties):
+    """
+    Computes a good assignment of units to timeslots for one language combination without SCIP.
+
+    The units are placed greedily and then improved by local search. The cost is the sum of the penalties of the
+    assigned students, i.e. the value of the objective of define_objective for the same assignment.
+
+    Args:
+        unit_sizes: An integer array with the number of members of every unit, see Instance.group_units.
+        capacities: An integer array with the capacity of every timeslot, see milp_solver.compute_capacities.
+        unit_penalties: The (number of units, number of timeslots) penalties returned by
+            group_contraction.compute_unit_penalties.
+
+    Returns:
+        tuple: The cost (float('inf') if no assignment was found) and the timeslot index of every unit (None if no
+            assignment was found).
+    """
+    slots = greedy_assignment(unit_sizes, capacities, unit_penalties)
+    if slots is None:
+        return float('inf'), None
+    slots = improve_assignment(unit_sizes, capacities, unit_penalties, slots)
+
+    cost = float(unit_penalties[np.arange(len(unit_sizes)), slots].sum())
+    return cost, slots
@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+
+import math
+
+import numpy as np
+
+from heuristic import greedy_assignment, improve_assignment
+
+
+def _relieve_overloads(unit_sizes, capacities, reduced_costs, slots):
+    """
+    Moves units out of timeslots whose capacity is exceeded, cheapest increase of the reduced cost first.
+
+    Returns:
+        numpy.ndarray: The timeslot index of every unit, or None if some overload could not be relieved.
+    """
+    slots = slots.copy()
+    loads = np.bincount(slots, weights=unit_sizes, minlength=len(capacities)).astype(np.int64)
+    while (loads > capacities).any():
+        slot = int(np.flatnonzero(loads > capacities)[0])
+        members = np.flatnonzero(slots == slot)
+        fits = loads + unit_sizes[members, np.newaxis] <= capacities
+        fits[:, slot] = False
+        alternative_costs = np.where(fits, reduced_costs[members], np.inf)
+        targets = np.argmin(alternative_costs, axis=1)
+        increases = alternative_costs[np.arange(len(members)), targets] - reduced_costs[members, slot]
+        moved = False
+        for index in np.argsort(increases, kind='stable'):
+            unit, target = members[index], targets[index]
+            if not np.isfinite(increases[index]) or loads[slot] <= capacities[slot]:
+                break
+            if loads[target] + unit_sizes[unit] > capacities[target]:
+                break  # An earlier move filled the target, so the alternatives have to be recomputed
+            slots[unit] = target
+            loads[slot] -= unit_sizes[unit]
+            loads[target] += unit_sizes[unit]
+            moved = True
+        if not moved:
+            return None
+    return slots
+
+
+def repair_assignment(unit_sizes, capacities, penalties, multipliers):
+    """
+    Builds a feasible assignment guided by the Lagrange multipliers of the capacities.
+
+    Every unit starts in the timeslot with the smallest reduced cost, which makes crowded timeslots more expensive,
+    and units are moved out of overloaded timeslots where this increases the reduced cost least. If this gets stuck,
+    the units are placed by heuristic.greedy_assignment instead. The result is improved by local search on the
+    original penalties.
+
+    Returns:
+        tuple: The cost (infinity if no assignment was found) and the timeslot index of every unit (or None).
+    """
+    reduced_costs = penalties + unit_sizes[:, np.newaxis] * multipliers
+    slots = _relieve_overloads(unit_sizes, capacities, reduced_costs, np.argmin(reduced_costs, axis=1))
+    if slots is None:
+        slots = greedy_assignment(unit_sizes, capacities, reduced_costs)
+    if slots is None:
+        return math.inf, None
+    slots = improve_assignment(unit_sizes, capacities, penalties, slots)
+    return float(penalties[np.arange(len(slots)), slots].sum()), slots
+
+
+def lagrangian_bound(unit_sizes, capacities, penalties, upper_bound=math.inf, max_iterations=300, patience=10):
+    """
+    Computes a lower bound on the optimal cost of one language combination by Lagrangian relaxation.
+
+    Relaxing the capacity constraints with multipliers lambda >= 0 splits the model into independent subproblems per
+    unit: every unit takes the timeslot with the smallest reduced cost penalty + size * lambda. The dual function
+    sum(min reduced cost) - lambda * capacities is a lower bound on the optimal cost for every lambda and is maximized
+    by subgradient steps with the Polyak step size towards upper_bound. The step scale is halved whenever the bound
+    did not improve for patience iterations. Since the penalties are integers, the bound is rounded up.
+
+    The search stops early if the bound reaches upper_bound (e.g. the best cost of another language combination),
+    since then the combination cannot improve on it, or if the relaxed assignment respects the capacities.
+
+    Args:
+        unit_sizes: An integer array with the number of members of every unit.
+        capacities: An integer array with the capacity of every timeslot.
+        penalties: The (number of units, number of timeslots) penalties, see group_contraction.compute_unit_penalties.
+        upper_bound: A known upper bound on the optimal cost, or infinity.
+        max_iterations: The maximum number of subgradient iterations.
+        patience: The number of iterations without improvement after which the step scale is halved.
+
+    Returns:
+        tuple: The lower bound (infinity if some unit has no allowed timeslot), the multipliers of the bound and the
+            relaxed assignment if it respects the capacities (otherwise None).
+    """
+    num_units, num_timeslots = penalties.shape
+    rows = np.arange(num_units)
+    multipliers = np.zeros(num_timeslots)
+    if not np.isfinite(penalties).any(axis=1).all():
+        return math.inf, multipliers, None
+
+    lower_bound, best_multipliers = -math.inf, multipliers
+    scale, stalled = 2.0, 0
+    for _ in range(max_iterations):
+        reduced_costs = penalties + unit_sizes[:, np.newaxis] * multipliers
+        slots = np.argmin(reduced_costs, axis=1)
+        value = float(reduced_costs[rows, slots].sum() - multipliers @ capacities)
+        if value > lower_bound + 1e-9:
+            lower_bound, best_multipliers, stalled = value, multipliers, 0
+        else:
+            stalled += 1
+            if stalled >= patience:
+                scale, stalled = scale / 2, 0
+
+        loads = np.bincount(slots, weights=unit_sizes, minlength=num_timeslots)
+        subgradient = loads - capacities
+        if (subgradient <= 0).all() and np.isclose(multipliers @ subgradient, 0):
+            # The relaxed assignment respects the capacities and complementary slackness, so it is optimal
+            return float(math.ceil(lower_bound - 1e-6)), multipliers, slots
+        if math.ceil(lower_bound - 1e-6) >= upper_bound or scale < 1e-4:
+            break
+
+        # Timeslots without a multiplier that are not full cannot lower their multiplier any further
+        subgradient[(multipliers <= 0) & (subgradient < 0)] = 0
+        norm = float(subgradient @ subgradient)
+        if norm == 0:
+            break
+        # Without an upper bound, the target is estimated slightly above the current value
+        target = upper_bound if math.isfinite(upper_bound) else value + max(1.0, 0.05 * abs(value))
+        multipliers = np.maximum(0.0, multipliers + scale * max(target - value, 1e-3) / norm * subgradient)
+    return float(math.ceil(lower_bound - 1e-6)), best_multipliers, None
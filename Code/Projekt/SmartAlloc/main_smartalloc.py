@@ -1,71 +1,591 @@
 #! /usr/bin/env python
 
 import argparse
-import itertools
 import logging
 import time
 import os
-from data_loader_smartalloc import load_and_preprocess_data
-from solver import create_solver, define_variables, define_constraints, define_objective
+import sys
+from solver import (define_variables, define_constraints, define_objective, define_language_selection,
+                    define_language_selection_objective, update_language_combination, set_warm_start,
+                    define_unit_model)
+from group_contraction import compute_unit_penalties, expand_assignment
+from heuristic import heuristic_assignment
+from lagrangian import lagrangian_bound, repair_assignment
+import numpy as np
 from ortools.linear_solver import pywraplp
 
+# The modules shared by all solvers are located in the parent directory (or next to this file in a lab experiment)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from combination_search import (branch_and_bound, evaluate_in_parallel, enumerate_combinations, ORDERS,  # noqa: E402
+                                find_slot_classes)
+from deadline import DEADLINE  # noqa: E402
+from feasibility import FeasibilityOracle, is_combination_feasible  # noqa: E402
+from instance import load_instance  # noqa: E402
+from milp_solver import (create_solver, solve_model, is_proven_optimal, count_interruption,  # noqa: E402
+                         compute_capacities, compute_penalty_tensor, combination_penalties, extract_slots,
+                         add_solver_arguments, solver_parameters_from_args, DEFAULT_SOLVER_PARAMETERS,
+                         OBJECTIVE_VERSION)
+from phase_timer import TIMER  # noqa: E402
+from result_cache import CACHE, DEFAULT_MAX_SIZE, instance_fingerprint  # noqa: E402
+from run_result import decode_assignment, make_result, write_result  # noqa: E402
 
-def is_combination_feasible(language_preferences, language_combination, timeslots):
+
+def solve_combination(instance, languages, penalty_tensor, capacities, units, language_combination,
+                      contract_groups=False, use_hint=False, backend='scip', solver_parameters=None):
+    """
+    Builds and solves the SCIP model for a single language combination.
+
+    Args:
+        instance (Instance): The instance.
+        languages (list): The languages in the order of the last axis of the penalty tensor.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot, see compute_capacities.
+        units (tuple): The unit index of every student and the number of members of every unit, see
+            Instance.group_units.
+        language_combination (tuple): The language of every timeslot.
+        contract_groups (bool): Build the model with one variable per unit and timeslot instead of one per student
+            and timeslot, see define_unit_model.
+        use_hint (bool): Pass the assignment of the greedy and local search heuristic (see heuristic.py) to SCIP as
+            a hint.
+        backend (str): The MILP backend, see milp_solver.BACKENDS.
+        solver_parameters (dict): Optional solver parameter overrides, see milp_solver.DEFAULT_SOLVER_PARAMETERS.
+
+    Returns:
+        tuple: The optimal solution value (float('inf') if no solution was found) and the timeslot index of every
+            student (None if no solution was found). If the time limit stops SCIP, the best solution found so far is
+            returned. The result is taken from the result cache (see result_cache.py) if it is known, and stored
+            there if it is proven optimal or infeasible.
+    """
+    cached = CACHE.get(language_combination)
+    if cached is not None:
+        TIMER.count('cached')
+        return cached
+
+    TIMER.count('tried')
+    with TIMER.phase('build'):
+        penalties = combination_penalties(penalty_tensor, language_combination, languages)
+        solver = create_solver(backend, solver_parameters)
+        if not solver:
+            return float('inf'), None
+
+        labels, unit_sizes = units
+        if contract_groups or use_hint:
+            unit_penalties = compute_unit_penalties(penalties, labels, len(unit_sizes))
+        if contract_groups:
+            z = define_unit_model(solver, unit_sizes, capacities, unit_penalties)
+        else:
+            allowed = np.isfinite(penalties)
+            x = define_variables(solver, allowed)
+            define_constraints(solver, x, capacities, ~allowed, instance.group_indptr, instance.group_indices)
+            define_objective(solver, x, penalties)
+
+        if use_hint:
+            _, unit_hint = heuristic_assignment(unit_sizes, capacities, unit_penalties)
+            if unit_hint is not None and contract_groups:
+                set_warm_start(solver, z, unit_hint, backend)
+            elif unit_hint is not None:
+                set_warm_start(solver, x, expand_assignment(unit_hint, labels), backend)
+    if DEADLINE.expired():
+        # The time limit was reached while the model was built
+        TIMER.count('interrupted')
+        return float('inf'), None
+    with TIMER.phase('optimization'):
+        DEADLINE.limit_solver(solver)
+        status = solve_model(solver, solver_parameters)
+
+    count_interruption(status)
+    if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        with TIMER.phase('extract'):
+            if contract_groups:
+                slots = expand_assignment(extract_slots(z, len(unit_sizes)), labels)
+            else:
+                slots = extract_slots(x, instance.num_students)
+        solution_value = solver.Objective().Value()
+        if is_proven_optimal(status, solution_value, solver_parameters):
+            CACHE.put(language_combination, solution_value, slots)
+        return solution_value, slots
+    elif status == pywraplp.Solver.INFEASIBLE:
+        TIMER.count('infeasible')
+        CACHE.put(language_combination, float('inf'), None)
+        print(f"The problem is infeasible for {language_combination}.")
+    else:
+        print('The problem does not have an optimal solution.')
+    return float('inf'), None
+
+
+def solve_by_enumeration(instance, languages, penalty_tensor, capacities, units, contract_groups=False,
+                         slot_classes=None, feasibility_oracle=None, use_hint=False, backend='scip',
+                         solver_parameters=None):
+    """
+    Solves one SCIP model per feasible language combination and keeps the best one.
+
+    Args:
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        units (tuple): The units of the pre-formed groups, see solve_combination.
+        contract_groups (bool): Build the models on contracted groups, see solve_combination.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes. Only one
+            combination per class of equivalent combinations is solved.
+        feasibility_oracle (FeasibilityOracle): The oracle that rejects infeasible combinations before a model is
+            built, see is_combination_feasible.
+        use_hint (bool): Pass the assignment of the heuristic to SCIP as a hint, see solve_combination.
+        backend (str): The MILP backend, see milp_solver.BACKENDS.
+        solver_parameters (dict): Optional solver parameter overrides, see milp_solver.DEFAULT_SOLVER_PARAMETERS.
+
+    Returns:
+        tuple: The best solution value, the best language combination and the timeslot index of every student in the
+            best assignment (None if none was found).
+    """
+    best_solution_value = float('inf')
+    best_combination = None
+    best_slots = None
+
+    # Iterate over all possible language combinations
+    for language_combination in enumerate_combinations(languages, instance.num_timeslots, slot_classes):
+        if DEADLINE.expired():
+            TIMER.count('interrupted')
+            break
+        if not is_combination_feasible(feasibility_oracle, language_combination):
+            # print(f"The problem is infeasible for {language_combination}")
+            continue
+
+        solution_value, slots = solve_combination(instance, languages, penalty_tensor, capacities, units,
+                                                  language_combination, contract_groups, use_hint, backend,
+                                                  solver_parameters)
+        if solution_value < best_solution_value:
+            best_solution_value = solution_value
+            best_combination = language_combination
+            best_slots = slots
+
+    return best_solution_value, best_combination, best_slots
+
+
+def evaluate_combination(context, language_combination):
+    """
+    Solves one language combination in a worker process of solve_in_parallel.
+
+    Args:
+        context (tuple): The instance, languages, penalty tensor, capacities, units and feasibility oracle, whether
+            the models are built on contracted groups, whether the heuristic hint is used, the MILP backend and the
+            solver parameters.
+        language_combination (tuple): The language of every timeslot.
+
+    Returns:
+        tuple: The optimal solution value (float('inf') if the combination is infeasible) and the timeslot index of
+            every student.
+    """
+    (instance, languages, penalty_tensor, capacities, units, feasibility_oracle, contract_groups, use_hint, backend,
+     solver_parameters) = context
+    if not is_combination_feasible(feasibility_oracle, language_combination):
+        return float('inf'), None
+    return solve_combination(instance, languages, penalty_tensor, capacities, units, language_combination,
+                             contract_groups, use_hint, backend, solver_parameters)
+
+
+def solve_in_parallel(instance, languages, penalty_tensor, capacities, units, workers, contract_groups=False,
+                      slot_classes=None, feasibility_oracle=None, use_hint=False, backend='scip',
+                      solver_parameters=None):
     """
-    Checks if a given language combination is feasible for all students across the specified timeslots.
+    Solves the language combinations on a pool of worker processes.
 
-    This function iterates through each timeslot and assigns the corresponding language from the language_combination.
-    It then checks for each student if there is at least one timeslot where a preferred language is available.
-    If any student does not have a preferred language available in any of the timeslots, the combination is deemed
-    infeasible.
+    The workers share the best solution value found so far and skip combinations whose lower bound is already worse.
+    The result, including the choice among equally good combinations, is the same as the one of solve_by_enumeration.
 
     Args:
-        language_preferences (dict): A dictionary mapping each student to their language preferences.
-                                     The preferences are represented as a dictionary of languages with their
-                                     corresponding preference level.
-        language_combination (tuple): A tuple representing the selected language for each timeslot.
-        timeslots (list): A list of timeslots available for assignment.
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor, also used to skip
+            combinations.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        units (tuple): The units of the pre-formed groups, see solve_combination.
+        workers (int): The number of worker processes.
+        contract_groups (bool): Build the models on contracted groups, see solve_combination.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes. Only one
+            combination per class of equivalent combinations is solved.
+        feasibility_oracle (FeasibilityOracle): The oracle that rejects infeasible combinations before a model is
+            built, see is_combination_feasible.
+        use_hint (bool): Pass the assignment of the heuristic to SCIP as a hint, see solve_combination.
+        backend (str): The MILP backend, see milp_solver.BACKENDS.
+        solver_parameters (dict): Optional solver parameter overrides, see milp_solver.DEFAULT_SOLVER_PARAMETERS.
 
     Returns:
-        bool: True if the language combination is feasible for all students, False otherwise.
+        tuple: The best solution value, the best language combination and the timeslot index of every student in the
+            best assignment.
+    """
+    context = (instance, languages, penalty_tensor, capacities, units, feasibility_oracle, contract_groups, use_hint,
+               backend, solver_parameters)
+
+    best_solution_value, best_combination, best_slots, statistics = evaluate_in_parallel(
+        instance.num_timeslots, languages, evaluate_combination, context, workers, penalty_tensor,
+        slot_classes=slot_classes)
+    statistics.report()
+    return best_solution_value, best_combination, best_slots
+
+
+def solve_by_branch_and_bound(instance, languages, penalty_tensor, capacities, units, contract_groups=False,
+                              slot_classes=None, feasibility_oracle=None, use_hint=False, backend='scip',
+                              solver_parameters=None):
     """
-    # Create a set of available languages for each slot
-    available_languages_per_slot = {slot: set() for slot in timeslots}
-    for slot, language in zip(timeslots, language_combination):
-        available_languages_per_slot[slot].add(language)
+    Searches the language combinations with branch and bound and solves SCIP models only for promising ones.
+
+    Subtrees of partial language combinations whose lower bound cannot beat the best solution found so far are
+    skipped. The search statistics are printed after the search.
+
+    Args:
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor, also used for the lower
+            bounds.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        units (tuple): The units of the pre-formed groups, see solve_combination.
+        contract_groups (bool): Build the models on contracted groups, see solve_combination.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes. Only one
+            combination per class of equivalent combinations is solved.
+        feasibility_oracle (FeasibilityOracle): The oracle that rejects infeasible combinations before a model is
+            built, see is_combination_feasible.
+        use_hint (bool): Pass the assignment of the heuristic to SCIP as a hint, see solve_combination.
+        backend (str): The MILP backend, see milp_solver.BACKENDS.
+        solver_parameters (dict): Optional solver parameter overrides, see milp_solver.DEFAULT_SOLVER_PARAMETERS.
 
-    # Check for each student if at least one preferred language is available in any timeslot
-    for student, preferences in language_preferences.items():
-        if not any(preferences[language] > 0 for slot in timeslots for language in available_languages_per_slot[slot]):
-            return False  # At least one student cannot find a suitable slot
+    Returns:
+        tuple: The best solution value, the best language combination and the timeslot index of every student in the
+            best assignment.
+    """
+    def evaluate(language_combination):
+        if not is_combination_feasible(feasibility_oracle, language_combination):
+            return float('inf'), None
+        return solve_combination(instance, languages, penalty_tensor, capacities, units, language_combination,
+                                 contract_groups, use_hint, backend, solver_parameters)
 
-    return True
+    best_solution_value, best_combination, best_slots, statistics = branch_and_bound(penalty_tensor, languages,
+                                                                                    evaluate, slot_classes)
+    statistics.report()
+    return best_solution_value, best_combination, best_slots
 
 
-def adjust_language_preferences(original_preferences, language_combination, timeslots):
+def solve_incrementally(instance, languages, penalty_tensor, capacities, units, slot_classes=None,
+                        feasibility_oracle=None, use_hint=False, backend='scip', solver_parameters=None,
+                        order='lexicographic'):
     """
-    Adjusts the language preferences based on a given language combination and timeslots.
+    Builds one SCIP model and re-solves it for every feasible language combination.
+
+    Only the variable upper bounds and the objective coefficients of the timeslots whose language differs from the
+    previously solved combination change, and the best assignment found so far (or the assignment of the heuristic,
+    if use_hint is set) is passed to the solver as a warm start. Combinations whose result is in the result cache are
+    not solved, see solve_combination.
 
     Args:
-        original_preferences (dict): Original language preferences of students.
-        language_combination (tuple): A tuple representing a combination of languages for the timeslots.
-        timeslots (list): List of timeslots.
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        units (tuple): The units of the pre-formed groups, used by the heuristic hint.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes. Only one
+            combination per class of equivalent combinations is solved.
+        feasibility_oracle (FeasibilityOracle): The oracle that rejects infeasible combinations before a model is
+            built, see is_combination_feasible.
+        use_hint (bool): Use the assignment of the heuristic as the warm start of every combination.
+        backend (str): The MILP backend, see milp_solver.BACKENDS.
+        solver_parameters (dict): Optional solver parameter overrides, see milp_solver.DEFAULT_SOLVER_PARAMETERS.
+        order (str): The order of the combinations, see combination_search.enumerate_combinations. In the Gray code
+            order, consecutive combinations differ in one timeslot.
 
     Returns:
-        dict: Adjusted language preferences.
+        tuple: The best solution value, the best language combination and the timeslot index of every student in the
+            best assignment.
     """
-    adjusted_preferences = {}
-    for student, preferences in original_preferences.items():
-        adjusted_preferences[student] = {}
-        for slot, language in zip(timeslots, language_combination):
-            adjusted_preferences[student][slot] = preferences.get(language)
-    return adjusted_preferences
+    best_solution_value = float('inf')
+    best_combination = None
+    best_slots = None
+    labels, unit_sizes = units
+
+    with TIMER.phase('build'):
+        solver = create_solver(backend, solver_parameters)
+        if not solver:
+            return best_solution_value, best_combination, best_slots
+
+        x = define_variables(solver, np.ones(instance.availability.shape, dtype=bool))
+        define_constraints(solver, x, capacities, instance.availability == 0, instance.group_indptr,
+                           instance.group_indices)
+
+    # The combination the model was last updated to (None before the first update)
+    model_combination = None
+    for language_combination in enumerate_combinations(languages, instance.num_timeslots, slot_classes, order):
+        if DEADLINE.expired():
+            TIMER.count('interrupted')
+            break
+        if not is_combination_feasible(feasibility_oracle, language_combination):
+            continue
+
+        cached = CACHE.get(language_combination)
+        if cached is not None:
+            TIMER.count('cached')
+            solution_value, slots = cached
+            if solution_value < best_solution_value:
+                best_solution_value, best_combination, best_slots = solution_value, language_combination, slots
+            continue
 
+        TIMER.count('tried')
+        with TIMER.phase('build'):
+            penalties = combination_penalties(penalty_tensor, language_combination, languages)
+            changed_slots = [slot for slot in range(instance.num_timeslots)
+                             if model_combination is None or model_combination[slot] != language_combination[slot]]
+            update_language_combination(solver, x, penalties, changed_slots)
+            model_combination = language_combination
+            unit_hint = None
+            if use_hint:
+                unit_penalties = compute_unit_penalties(penalties, labels, len(unit_sizes))
+                _, unit_hint = heuristic_assignment(unit_sizes, capacities, unit_penalties)
+            if unit_hint is not None:
+                set_warm_start(solver, x, expand_assignment(unit_hint, labels), backend)
+            elif best_slots is not None:
+                set_warm_start(solver, x, best_slots, backend)
+        with TIMER.phase('optimization'):
+            DEADLINE.limit_solver(solver)
+            status = solve_model(solver, solver_parameters)
 
-def main():
+        count_interruption(status)
+        if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            solution_value = solver.Objective().Value()
+            # The assignment is only read if it is the best one so far or is stored in the result cache
+            store = CACHE.enabled and is_proven_optimal(status, solution_value, solver_parameters)
+            if solution_value < best_solution_value or store:
+                with TIMER.phase('extract'):
+                    slots = extract_slots(x, instance.num_students)
+                if store:
+                    CACHE.put(language_combination, solution_value, slots)
+            if solution_value < best_solution_value:
+                best_solution_value = solution_value
+                best_combination = language_combination
+                best_slots = slots
+        elif status == pywraplp.Solver.INFEASIBLE:
+            TIMER.count('infeasible')
+            CACHE.put(language_combination, float('inf'), None)
+            print(f"The problem is infeasible for {language_combination}.")
+        else:
+            print('The problem does not have an optimal solution.')
+
+    return best_solution_value, best_combination, best_slots
+
+
+def solve_by_heuristic(instance, languages, penalty_tensor, capacities, units, slot_classes=None,
+                       feasibility_oracle=None):
+    """
+    Assigns the students of every feasible language combination with the greedy and local search heuristic instead of
+    SCIP and keeps the best assignment.
+
+    The solution values are the objective values of define_objective for the heuristic assignments, so they can be
+    compared with the optimal values of the other modes, but they are not proven optimal.
+
+    Args:
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        units (tuple): The units of the pre-formed groups, see solve_combination.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes. Only one
+            combination per class of equivalent combinations is evaluated.
+        feasibility_oracle (FeasibilityOracle): The oracle that rejects infeasible combinations, see
+            is_combination_feasible.
+
+    Returns:
+        tuple: The best solution value, the best language combination and the timeslot index of every student in the
+            best assignment.
+    """
+    best_solution_value = float('inf')
+    best_combination = None
+    best_unit_slots = None
+    labels, unit_sizes = units
+
+    for language_combination in enumerate_combinations(languages, instance.num_timeslots, slot_classes):
+        if DEADLINE.expired():
+            TIMER.count('interrupted')
+            break
+        if not is_combination_feasible(feasibility_oracle, language_combination):
+            continue
+
+        TIMER.count('tried')
+        with TIMER.phase('build'):
+            penalties = combination_penalties(penalty_tensor, language_combination, languages)
+            unit_penalties = compute_unit_penalties(penalties, labels, len(unit_sizes))
+        with TIMER.phase('optimization'):
+            solution_value, unit_slots = heuristic_assignment(unit_sizes, capacities, unit_penalties)
+
+        if solution_value < best_solution_value:
+            best_solution_value, best_combination, best_unit_slots = solution_value, language_combination, unit_slots
+
+    best_slots = None
+    if best_unit_slots is not None:
+        with TIMER.phase('extract'):
+            best_slots = expand_assignment(best_unit_slots, labels)
+    return best_solution_value, best_combination, best_slots
+
+
+def solve_by_lagrangian_relaxation(instance, languages, penalty_tensor, capacities, units, feasibility_oracle,
+                                   slot_classes=None):
+    """
+    Computes a lower bound and a feasible assignment for every language combination by Lagrangian relaxation of the
+    capacities (see lagrangian.py) and keeps the best assignment.
+
+    No SCIP model is built, so the mode also works for instances with tens of thousands of students. The assignment
+    of a combination is only repaired if its bound is below the best cost found so far, and the bounding stops as soon
+    as the bound reaches it.
+
+    Args:
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        units (tuple): The units of the pre-formed groups, see solve_combination.
+        feasibility_oracle (FeasibilityOracle): The oracle that rejects infeasible combinations.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes. Only one
+            combination per class of equivalent combinations is evaluated.
+
+    Returns:
+        tuple: The best solution value, the best language combination, the timeslot index of every student in the
+            best assignment and the lower bound on the optimal cost over all combinations (-inf if the time limit
+            stopped the search).
+    """
+    best_solution_value = float('inf')
+    best_combination = None
+    best_unit_slots = None
+    lower_bound = float('inf')
+    labels, unit_sizes = units
+
+    for language_combination in enumerate_combinations(languages, instance.num_timeslots, slot_classes):
+        if DEADLINE.expired():
+            TIMER.count('interrupted')
+            lower_bound = -float('inf')
+            break
+        if not is_combination_feasible(feasibility_oracle, language_combination):
+            continue
+
+        TIMER.count('tried')
+        with TIMER.phase('build'):
+            penalties = compute_unit_penalties(combination_penalties(penalty_tensor, language_combination, languages),
+                                               labels, len(unit_sizes))
+        with TIMER.phase('optimization'):
+            bound, multipliers, slots = lagrangian_bound(unit_sizes, capacities, penalties, best_solution_value)
+            lower_bound = min(lower_bound, bound)
+            if slots is not None:
+                # The relaxed assignment respects the capacities, so it is optimal for this combination
+                solution_value = float(penalties[np.arange(len(slots)), slots].sum())
+            elif bound < best_solution_value:
+                solution_value, slots = repair_assignment(unit_sizes, capacities, penalties, multipliers)
+            else:
+                continue
+
+        if solution_value < best_solution_value:
+            best_solution_value, best_combination, best_unit_slots = solution_value, language_combination, slots
+    # Combinations that were stopped early have a bound of at least the best solution value
+    lower_bound = min(lower_bound, best_solution_value)
+
+    best_slots = None
+    if best_unit_slots is not None:
+        with TIMER.phase('extract'):
+            best_slots = expand_assignment(best_unit_slots, labels)
+    return best_solution_value, best_combination, best_slots, lower_bound
+
+
+def build_language_selection_model(solver, instance, languages, penalty_tensor, capacities):
+    """
+    Builds the model in which the solver also selects the language of every timeslot.
+
+    Building the model takes several seconds for thousands of students, so the time limit is checked after every
+    step.
+
+    Args:
+        solver: The SCIP solver instance.
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+
+    Returns:
+        tuple: The assignment variables and the language selection variables, or None if the time limit was reached
+            before the model was complete.
+    """
+    x = define_variables(solver, np.ones(instance.availability.shape, dtype=bool))
+    if DEADLINE.expired():
+        return None
+    define_constraints(solver, x, capacities, instance.availability == 0, instance.group_indptr,
+                       instance.group_indices)
+    if DEADLINE.expired():
+        return None
+    y, w = define_language_selection(solver, x, instance.availability, instance.language_columns(languages))
+    if DEADLINE.expired():
+        return None
+    define_language_selection_objective(solver, w, penalty_tensor)
+    return x, y
+
+
+def solve_with_language_selection(instance, languages, penalty_tensor, capacities, backend='scip',
+                                  solver_parameters=None):
+    """
+    Solves a single SCIP model in which the solver also selects the language of every timeslot.
+
+    The optimal cost is the same as the minimum over all language combinations computed by solve_by_enumeration,
+    but only one model is built and solved.
+
+    Args:
+        instance (Instance): The instance.
+        languages (list): The languages to consider.
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        backend (str): The MILP backend, see milp_solver.BACKENDS.
+        solver_parameters (dict): Optional solver parameter overrides, see milp_solver.DEFAULT_SOLVER_PARAMETERS.
+
+    Returns:
+        tuple: The best solution value, the best language combination and the timeslot index of every student in the
+            best assignment.
+    """
+    best_solution_value = float('inf')
+    best_combination = None
+    best_slots = None
+
+    if DEADLINE.expired():
+        # The time limit was reached while the instance was loaded and preprocessed
+        TIMER.count('interrupted')
+        return best_solution_value, best_combination, best_slots
+    solver = create_solver(backend, solver_parameters)
+    if solver:
+        TIMER.count('tried')
+        with TIMER.phase('build'):
+            model = build_language_selection_model(solver, instance, languages, penalty_tensor, capacities)
+        if model is None:
+            TIMER.count('interrupted')
+            return best_solution_value, best_combination, best_slots
+        x, y = model
+        with TIMER.phase('optimization'):
+            DEADLINE.limit_solver(solver)
+            status = solve_model(solver, solver_parameters)
+
+        count_interruption(status)
+        if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            best_solution_value = solver.Objective().Value()
+            with TIMER.phase('extract'):
+                best_combination = tuple(languages[language] for (slot, language), variable in y.items()
+                                         if variable.solution_value() > 0.5)
+                best_slots = extract_slots(x, instance.num_students)
+        elif status == pywraplp.Solver.INFEASIBLE:
+            TIMER.count('infeasible')
+            print("The problem is infeasible for every language combination.")
+        else:
+            print('The problem does not have an optimal solution.')
+
+    return best_solution_value, best_combination, best_slots
+
+
+def main(argv=None):
     """
     Main function to find the optimal assignment of students to timeslots based on timeslot, language and group
     preferences.
+
+    Args:
+        argv (list): The command line arguments; defaults to sys.argv[1:]. batch_solve.py passes them to solve many
+            instances in one process.
     """
     start_time = time.time()
     logging.basicConfig(level=logging.CRITICAL)
@@ -74,44 +594,94 @@ def main():
     # 'benchmarks', 'n50-s11-01')
     parser = (argparse.ArgumentParser(description='Solve the SmartAlloc problem.'))
     parser.add_argument('benchmark_file', type=str, help='Path to the benchmark file containing student and timeslot data.')
-    args = parser.parse_args()
+    parser.add_argument('--mode', choices=['enumerate', 'incremental', 'branch-and-bound', 'language-milp',
+                                           'heuristic', 'lagrangian'],
+                        default='enumerate',
+                        help='Solve one model per language combination (enumerate), re-solve one model with updated '
+                             'bounds per combination (incremental), skip combinations by a lower bound '
+                             '(branch-and-bound), solve a single model that also selects the timeslot languages '
+                             '(language-milp), assign the students of every combination with a greedy and local '
+                             'search heuristic without SCIP (heuristic) or bound and repair every combination by '
+                             'Lagrangian relaxation of the capacities without SCIP (lagrangian).')
+    parser.add_argument('--contract-groups', action='store_true',
+                        help='Merge every pre-formed group into a single unit before building the per-combination '
+                             'models (used by the enumerate and branch-and-bound modes and by --workers).')
+    parser.add_argument('--reduce-symmetry', action='store_true',
+                        help='Treat timeslots with the same preferences of all students and the same capacity as '
+                             'interchangeable and only solve one language combination per number of timeslots of '
+                             'every language among them (not used by the language-milp mode).')
+    add_solver_arguments(parser)
+    parser.add_argument('--order', choices=ORDERS, default='lexicographic',
+                        help='Order of the language combinations of the incremental mode: lexicographic or a Gray '
+                             'code in which consecutive combinations differ in one timeslot, so only the variables of '
+                             'that timeslot are updated (default: lexicographic).')
+    parser.add_argument('--heuristic-hint', action='store_true',
+                        help='Pass the assignment of the greedy and local search heuristic to SCIP as a hint for every '
+                             'language combination (not used by the language-milp mode).')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes that solve the language combinations of the enumerate mode in '
+                             'parallel (default: 1).')
+    parser.add_argument('--result-file', type=str,
+                        help='Write the result as a JSON record (see run_result.py) to this file instead of printing '
+                             'the assignment.')
+    parser.add_argument('--time-limit', type=float,
+                        help='Stop after this many seconds and report the best assignment found so far, which is then '
+                             'not proven optimal (default: no limit).')
+    parser.add_argument('--cache', type=str,
+                        help='SQLite database with the results of single language combinations (see result_cache.py). '
+                             'Combinations found in it are not solved again, and the ones proven optimal or '
+                             'infeasible are added (used by the enumerate, incremental and branch-and-bound modes).')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_MAX_SIZE,
+                        help='Size limit of the cache in megabytes; the least recently used results are removed '
+                             'beyond it (default: %(default)g).')
+    args = parser.parse_args(argv)
+    DEADLINE.start(args.time_limit, start_time)
+    solver_parameters = solver_parameters_from_args(args)
     benchmark_file = args.benchmark_file
     # Load data from the benchmark file
-    students, timeslots, availability, num_students, language_preferences, group_preferences = (
-        load_and_preprocess_data(benchmark_file))
-
-    languages = ['E', 'G']  # Define the languages to consider
-    best_solution_value = float('inf')
-    best_combination = None
-    best_assignment = []
-
-    # Iterate over all possible language combinations
-    for language_combination in itertools.product(languages, repeat=len(timeslots)):
-        if not is_combination_feasible(language_preferences, language_combination, timeslots):
-            # print(f"The problem is infeasible for {language_combination}")
-            continue
-
-        adjusted_language_preferences = adjust_language_preferences(language_preferences, language_combination,
-                                                                    timeslots)
-        solver = create_solver()
-        if solver:
-            x = define_variables(solver, students, timeslots)
-            define_constraints(solver, x, students, timeslots, availability, num_students,
-                               adjusted_language_preferences, group_preferences)
-            define_objective(solver, x, students, timeslots, availability, adjusted_language_preferences)
-            status = solver.Solve()
-
-            if status == pywraplp.Solver.OPTIMAL:
-                solution_value = solver.Objective().Value()
-                if solution_value < best_solution_value:
-                    best_solution_value = solution_value
-                    best_combination = language_combination
-                    best_assignment = [(student, slot) for student in students for slot in timeslots if
-                                       x[student, slot].solution_value() == 1]
-            elif status == pywraplp.Solver.INFEASIBLE:
-                print(f"The problem is infeasible for {language_combination}.")
-            else:
-                print('The problem does not have an optimal solution.')
+    with TIMER.phase('load'):
+        instance = load_instance(benchmark_file)
+    with TIMER.phase('preprocess'):
+        languages = ['E', 'G']  # Define the languages to consider
+        # The models are built from the penalties of every student, timeslot and language
+        penalty_tensor = compute_penalty_tensor(instance.availability, instance.language_columns(languages))
+        # The pre-formed groups as units for the contracted models, the heuristic and the relaxation
+        units = instance.group_units()
+        capacities = compute_capacities(instance.num_timeslots, instance.num_students)
+        slot_classes = find_slot_classes(instance.availability, capacities) if args.reduce_symmetry else None
+        # Rejects the combinations for which not every student can get an allowed timeslot
+        feasibility_oracle = FeasibilityOracle(instance.availability, instance.language_columns(languages),
+                                               capacities, languages)
+        # The results of the language combinations solved by earlier runs on the same instance
+        CACHE.open(args.cache, instance_fingerprint(instance, languages) if args.cache else None, 'smartalloc',
+                   OBJECTIVE_VERSION, args.cache_size)
+    if args.mode == 'language-milp':
+        best_solution_value, best_combination, best_slots = solve_with_language_selection(
+            instance, languages, penalty_tensor, capacities, args.backend, solver_parameters)
+    elif args.mode == 'lagrangian':
+        best_solution_value, best_combination, best_slots, lagrangian_bound = solve_by_lagrangian_relaxation(
+            instance, languages, penalty_tensor, capacities, units, feasibility_oracle, slot_classes)
+    elif args.mode == 'heuristic':
+        best_solution_value, best_combination, best_slots = solve_by_heuristic(
+            instance, languages, penalty_tensor, capacities, units, slot_classes, feasibility_oracle)
+    elif args.mode == 'branch-and-bound':
+        best_solution_value, best_combination, best_slots = solve_by_branch_and_bound(
+            instance, languages, penalty_tensor, capacities, units, args.contract_groups, slot_classes,
+            feasibility_oracle, args.heuristic_hint, args.backend, solver_parameters)
+    elif args.mode == 'incremental':
+        best_solution_value, best_combination, best_slots = solve_incrementally(
+            instance, languages, penalty_tensor, capacities, units, slot_classes, feasibility_oracle,
+            args.heuristic_hint, args.backend, solver_parameters, args.order)
+    elif args.workers > 1:
+        best_solution_value, best_combination, best_slots = solve_in_parallel(
+            instance, languages, penalty_tensor, capacities, units, args.workers, args.contract_groups, slot_classes,
+            feasibility_oracle, args.heuristic_hint, args.backend, solver_parameters)
+    else:
+        best_solution_value, best_combination, best_slots = solve_by_enumeration(
+            instance, languages, penalty_tensor, capacities, units, args.contract_groups, slot_classes,
+            feasibility_oracle, args.heuristic_hint, args.backend, solver_parameters)
+    # The assignment is reported as (student, timeslot) pairs
+    best_assignment = decode_assignment(instance, best_slots) if best_slots is not None else []
 
     # Output the number of students assigned to each timeslot
 
@@ -123,7 +693,7 @@ def main():
     # Output the number of students assigned to each timeslot
 
     # print('\nNumber of students per timeslot:')
-    # for slot in timeslots:
+    # for slot in instance.timeslot_ids:
         # num_students_assigned = sum(1 for student, assigned_slot in best_assignment if assigned_slot == slot)
         # print(f'Timeslot {slot}: {num_students_assigned} Student(en)')
 
@@ -132,11 +702,44 @@ def main():
     end_time = time.time()
     solve_time = end_time - start_time
 
+    # Without an interruption by the time limit, every combination was solved or pruned to optimality (except by the
+    # heuristic, which never proves optimality)
+    proven_optimal = TIMER.counts['interrupted'] == 0 and args.mode != 'heuristic'
+    # Every student pays at least their cheapest penalty, whatever the language combination
+    lower_bound = float(penalty_tensor.min(axis=(1, 2)).sum())
+    if args.mode == 'lagrangian':
+        # The relaxation only proves optimality if its bound meets the best solution value
+        lower_bound = max(lower_bound, lagrangian_bound)
+        proven_optimal = proven_optimal and best_solution_value <= lagrangian_bound
+    if args.mode not in ('heuristic', 'lagrangian') and args.relative_gap > DEFAULT_SOLVER_PARAMETERS['relative_gap']:
+        # The costs are integers, so a solve within the gap is only optimal if the gap is below one
+        proven_optimal = proven_optimal and (best_solution_value == float('inf')
+                                             or args.relative_gap * best_solution_value < 1)
+
+    TIMER.report()
+    print(f"Solver backend: {args.backend}")
+    print(f"Solver threads: {args.threads}")
+    print(f"Relative gap: {args.relative_gap}")
+    print(f"Presolve: {int(solver_parameters['presolve'])}")
+    print(f"Solver parameters: {args.solver_params!r}")
     if best_solution_value != float('inf'):
         print(f"Total cost: {best_solution_value}")
+    print(f"Proven optimal: {int(proven_optimal)}")
+    if not proven_optimal:
+        print(f"Lower bound: {lower_bound}")
 
-    # Adjusted so that the empty assignments resp. unsolvable problems are also considered.
-    print(f"Assignment: {best_assignment}")
+    if args.result_file:
+        write_result(args.result_file, make_result(instance, best_solution_value, best_assignment, solve_time,
+                                                   proven_optimal=proven_optimal,
+                                                   lower_bound=None if proven_optimal else lower_bound,
+                                                   solver_backend=args.backend, solver_threads=args.threads,
+                                                   relative_gap=args.relative_gap,
+                                                   presolve=solver_parameters['presolve'],
+                                                   solver_specific_parameters=args.solver_params,
+                                                   **TIMER.as_properties()))
+    else:
+        # Adjusted so that the empty assignments resp. unsolvable problems are also considered.
+        print(f"Assignment: {best_assignment}")
     print(f"Solve time: {solve_time}s")
 
 
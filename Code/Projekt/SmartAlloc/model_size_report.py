@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from solver import define_variables, define_constraints, define_objective, count_dense_model_size, define_unit_model
+from group_contraction import compute_unit_penalties
+from milp_solver import create_solver, compute_capacities, compute_penalty_tensor, combination_penalties
+from combination_search import enumerate_combinations
+from feasibility import FeasibilityOracle
+from instance import load_instance
+
+
+def build_model(instance, capacities, penalties, sparse):
+    """
+    Builds the SCIP model for one language combination without solving it.
+
+    Args:
+        instance (Instance): The instance.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        penalties (numpy.ndarray): The penalties of the language combination, see combination_penalties.
+        sparse (bool): Whether to create variables only for the allowed (student, timeslot) pairs.
+
+    Returns:
+        tuple: The number of variables, the number of constraints and the build time in seconds.
+    """
+    start_time = time.perf_counter()
+    solver = create_solver()
+    allowed = np.isfinite(penalties)
+    x = define_variables(solver, allowed if sparse else np.ones(allowed.shape, dtype=bool))
+    define_constraints(solver, x, capacities, ~allowed, instance.group_indptr, instance.group_indices)
+    define_objective(solver, x, penalties)
+    build_time = time.perf_counter() - start_time
+    return solver.NumVariables(), solver.NumConstraints(), build_time
+
+
+def build_unit_model(instance, capacities, penalties):
+    """
+    Builds the SCIP model on contracted groups for one language combination without solving it.
+
+    Args:
+        instance (Instance): The instance.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        penalties (numpy.ndarray): The penalties of the language combination, see combination_penalties.
+
+    Returns:
+        tuple: The number of variables, the number of constraints and the build time in seconds.
+    """
+    start_time = time.perf_counter()
+    solver = create_solver()
+    labels, unit_sizes = instance.group_units()
+    unit_penalties = compute_unit_penalties(penalties, labels, len(unit_sizes))
+    define_unit_model(solver, unit_sizes, capacities, unit_penalties)
+    build_time = time.perf_counter() - start_time
+    return solver.NumVariables(), solver.NumConstraints(), build_time
+
+
+def main():
+    """
+    Reports the size of the dense, the sparse and the contracted SmartAlloc model for the first feasible language
+    combination.
+    """
+    parser = argparse.ArgumentParser(description='Compare the size of the SmartAlloc model variants.')
+    parser.add_argument('pattern', type=str,
+                        help='Glob pattern of the benchmark files, e.g. "benchmarks supervisor/n2000-*".')
+    args = parser.parse_args()
+
+    languages = ['E', 'G']
+    for benchmark_file in sorted(glob.glob(args.pattern)):
+        instance = load_instance(benchmark_file)
+        capacities = compute_capacities(instance.num_timeslots, instance.num_students)
+        feasibility_oracle = FeasibilityOracle(instance.availability, instance.language_columns(languages),
+                                               capacities, languages)
+        language_combination = next((combination for combination in
+                                     enumerate_combinations(languages, instance.num_timeslots)
+                                     if feasibility_oracle.is_feasible(combination)), None)
+        if language_combination is None:
+            print(f"{os.path.basename(benchmark_file)}: no feasible language combination")
+            continue
+
+        penalty_tensor = compute_penalty_tensor(instance.availability, instance.language_columns(languages))
+        penalties = combination_penalties(penalty_tensor, language_combination, languages)
+        expected_size = count_dense_model_size(~np.isfinite(penalties), instance.group_indices)
+        dense_size = build_model(instance, capacities, penalties, sparse=False)
+        sparse_size = build_model(instance, capacities, penalties, sparse=True)
+        unit_size = build_unit_model(instance, capacities, penalties)
+        assert dense_size[:2] == expected_size, "count_dense_model_size does not match the built model"
+
+        print(f"{os.path.basename(benchmark_file)}: "
+              f"variables {dense_size[0]} -> {sparse_size[0]} -> {unit_size[0]}, "
+              f"constraints {dense_size[1]} -> {sparse_size[1]} -> {unit_size[1]}, "
+              f"build time {dense_size[2]:.2f}s -> {sparse_size[2]:.2f}s -> {unit_size[2]:.2f}s "
+              f"(dense -> sparse -> contracted groups)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,56 @@
 #! /usr/bin/env python
 
-from ortools.linear_solver import pywraplp
+import os
+import sys
 
+import numpy as np
 
-def create_solver():
+# The modules shared by all solvers are located in the parent directory (or next to this file in a lab experiment)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from milp_solver import HINT_BACKENDS  # noqa: E402
+
+
+def _pair_indices(variables):
     """
-    Creates a SCIP solver instance.
+    Returns the row and column indices of the keys of a dictionary of variables as two integer arrays.
+    """
+    return np.array(list(variables), dtype=np.int64).reshape(-1, 2).T
 
-    Returns:
-        A SCIP solver instance if successful, None otherwise.
+
+def _minimize(solver, variables, penalties):
+    """
+    Sets the objective to the sum of the penalties of the variables; infinite penalties of forbidden pairs become 0.
     """
-    solver = pywraplp.Solver.CreateSolver('SCIP')
-    if not solver:
-        return None
-    return solver
+    objective = solver.Objective()
+    penalties = np.where(np.isfinite(penalties), penalties, 0.0).tolist()
+    for variable, penalty in zip(variables, penalties):
+        objective.SetCoefficient(variable, penalty)
+    objective.SetMinimization()
 
 
-def define_variables(solver, students, timeslots):
+def define_variables(solver, allowed):
     """
     Defines boolean variables for each student and timeslot combination.
 
+    Variables are only created for the pairs that are allowed, e.g. with availability and language preference greater
+    than 0 under a language combination. The other pairs would be fixed to 0 anyway, so leaving them out keeps the
+    model small; all functions below treat a missing pair as 0. An all-true array gives the dense model.
+
     Args:
         solver: The SCIP solver instance.
-        students: A list of student identifiers.
-        timeslots: A list of timeslot identifiers.
+        allowed: A boolean array of shape (number of students, number of timeslots).
 
     Returns:
-        A dictionary mapping (student, timeslot) pairs to SCIP boolean variables.
+        A dictionary mapping (student index, timeslot index) pairs to SCIP boolean variables.
     """
     x = {}
-    for student in students:
-        for slot in timeslots:
-            x[student, slot] = solver.BoolVar(f'x_{student}_{slot}')
+    students, slots = np.nonzero(allowed)
+    for student, slot in zip(students.tolist(), slots.tolist()):
+        x[student, slot] = solver.BoolVar(f'x_{student}_{slot}')
     return x
 
 
-def define_constraints(solver, x, students, timeslots, availability, num_students, language_preferences,
-                       group_preferences):
+def define_constraints(solver, x, capacities, forbidden, group_indptr, group_indices):
     """
     Defines the constraints for the solver based on student availability, timeslot capacities,
     and language preferences.
@@ -44,77 +58,224 @@ def define_constraints(solver, x, students, timeslots, availability, num_student
     Args:
         solver: The SCIP solver instance.
         x: The dictionary of decision variables.
-        students: A list of student identifiers.
-        timeslots: A list of timeslot identifiers.
-        availability: A dictionary mapping (student, timeslot) pairs to availability scores.
-        num_students: The total number of students.
-        language_preferences: A dictionary mapping (student, timeslot) pairs to language preference scores.
-        group_preferences: A dictionary mapping students to lists of preferred group members.
+        capacities: An integer array with the capacity of every timeslot, see milp_solver.compute_capacities.
+        forbidden: A boolean array of shape (number of students, number of timeslots) of the pairs that are fixed to
+            0, i.e. availability 0 and, if the language combination is fixed, language preference 0.
+        group_indptr: The CSR row pointers of the group members, see Instance.group_indptr.
+        group_indices: The student indices of the group members, see Instance.group_indices.
     """
-    # Set capacity per slot based on the number of students divided by the number of slots
-    capacity_per_slot = num_students // len(timeslots)
-    capacities = {slot: capacity_per_slot for slot in timeslots}
+    num_students, num_timeslots = forbidden.shape
+    slot_terms = [[] for _ in range(num_timeslots)]
+    student_terms = [[] for _ in range(num_students)]
+    for (student, slot), variable in x.items():
+        slot_terms[slot].append(variable)
+        student_terms[student].append(variable)
+
+    for terms, capacity in zip(slot_terms, np.asarray(capacities).tolist()):
+        solver.Add(solver.Sum(terms) <= capacity)
 
-    remaining_students = num_students % len(timeslots)
-    for i, slot in enumerate(timeslots):
-        if i < remaining_students:
-            capacities[slot] += 1
+    students, slots = np.nonzero(forbidden)
+    for student, slot in zip(students.tolist(), slots.tolist()):
+        if (student, slot) in x:
+            solver.Add(x[student, slot] == 0)
 
-    for slot in timeslots:
-        solver.Add(solver.Sum([x[student, slot] for student in students]) <= capacities[slot])
+    indptr = np.asarray(group_indptr).tolist()
+    indices = np.asarray(group_indices).tolist()
+    for student in range(num_students):
+        for peer in indices[indptr[student]:indptr[student + 1]]:
+            for slot in range(num_timeslots):
+                if (student, slot) in x and (peer, slot) in x:
+                    solver.Add(x[student, slot] == x[peer, slot])
+                elif (student, slot) in x:
+                    # The peer cannot take this slot, so neither can the student
+                    x[student, slot].SetUb(0)
 
-    for student in students:
-        for slot in timeslots:
-            if availability[student][slot] == 0:
-                solver.Add(x[student, slot] == 0)
+    for terms in student_terms:
+        solver.Add(solver.Sum(terms) == 1)
 
-    for student in students:
-        for slot in timeslots:
-            if language_preferences[student][slot] == 0:
-                solver.Add(x[student, slot] == 0)
 
-    for student, preferences in group_preferences.items():
-        for peer in preferences:
-            for slot in timeslots:
-                solver.Add(x[student, slot] == x[peer, slot])
+def define_objective(solver, x, penalties):
+    """
+    Defines the objective function for the solver to maximize student preferences while minimizing penalties.
 
-    for student in students:
-        solver.Add(solver.Sum([x[student, slot] for slot in timeslots]) == 1)
+    Args:
+        solver: The SCIP solver instance.
+        x: The dictionary of decision variables.
+        penalties: The (number of students, number of timeslots) penalties of the language combination, see
+            milp_solver.combination_penalties.
+    """
+    students, slots = _pair_indices(x)
+    _minimize(solver, x.values(), penalties[students, slots])
 
 
-def define_objective(solver, x, students, timeslots, availability, language_preferences):
+def define_unit_model(solver, unit_sizes, capacities, unit_penalties):
     """
-    Defines the objective function for the solver to maximize student preferences while minimizing penalties.
+    Defines the variables, constraints and objective of the model on contracted groups.
+
+    Every unit (a pre-formed group or a single student, see Instance.group_units) gets one boolean variable per
+    timeslot it may be assigned to. A unit takes as many places of a timeslot as it has members, and its objective
+    coefficient is the summed penalty of its members. The group equality constraints of define_constraints are not
+    needed, since the members of a unit share one variable.
+
+    Args:
+        solver: The SCIP solver instance.
+        unit_sizes: An integer array with the number of members of every unit.
+        capacities: An integer array with the capacity of every timeslot.
+        unit_penalties: The (number of units, number of timeslots) penalties returned by
+            group_contraction.compute_unit_penalties; forbidden pairs are infinite.
+
+    Returns:
+        A dictionary mapping (unit index, timeslot index) pairs to SCIP boolean variables.
+    """
+    z = {}
+    units, slots = np.nonzero(np.isfinite(unit_penalties))
+    for unit, slot in zip(units.tolist(), slots.tolist()):
+        z[unit, slot] = solver.BoolVar(f'z_{unit}_{slot}')
+
+    sizes = np.asarray(unit_sizes).tolist()
+    slot_terms = [[] for _ in range(len(capacities))]
+    unit_terms = [[] for _ in range(len(sizes))]
+    for (unit, slot), variable in z.items():
+        slot_terms[slot].append(sizes[unit] * variable)
+        unit_terms[unit].append(variable)
+
+    for terms, capacity in zip(slot_terms, np.asarray(capacities).tolist()):
+        solver.Add(solver.Sum(terms) <= capacity)
+
+    for terms in unit_terms:
+        solver.Add(solver.Sum(terms) == 1)
+
+    define_objective(solver, z, unit_penalties)
+    return z
+
+
+def update_language_combination(solver, x, penalties, changed_slots):
+    """
+    Adapts an existing model to a new language combination without rebuilding it.
+
+    The model has to be built with define_variables for all pairs and define_constraints without the language
+    preferences. Pairs whose timeslot language is not accepted by the student are excluded through the upper bound of
+    their variable, all other variables are released again. The objective coefficients are set to the same penalties
+    as in define_objective.
 
     Args:
         solver: The SCIP solver instance.
         x: The dictionary of decision variables.
-        students: A list of student identifiers.
-        timeslots: A list of timeslot identifiers.
-        availability: A dictionary mapping (student, timeslot) pairs to availability scores.
-        language_preferences: A dictionary mapping (student, timeslot) pairs to language preference scores.
+        penalties: The (number of students, number of timeslots) penalties of the new language combination, see
+            milp_solver.combination_penalties.
+        changed_slots: The indices of the timeslots whose language differs from the combination of the model.
     """
-    # objective_terms = []
-    penalty_terms = []
-    num_students = len(students)
-    penalty_factor = 100 * num_students
+    objective = solver.Objective()
 
-    for student in students:
-        for slot in timeslots:
-            availability_score = availability[student][slot]
-            language_preference_score = language_preferences[student][slot]
+    for slot in changed_slots:
+        for student, penalty in enumerate(penalties[:, slot].tolist()):
+            variable = x[student, slot]
+            if penalty == np.inf:
+                variable.SetUb(0)
+                objective.SetCoefficient(variable, 0)
+            else:
+                variable.SetUb(1)
+                objective.SetCoefficient(variable, penalty)
 
-            # Penalty based on preferences
-            penalty = 0
-            if availability_score == 1:
-                penalty += 1
+    objective.SetMinimization()
 
-            if language_preference_score == 1:
-                penalty += 1
 
-            # Add penalty terms for non-preferred assignments
-            penalty_terms.append(penalty * x[student, slot])
+def set_warm_start(solver, x, slots, backend='scip'):
+    """
+    Passes a previous assignment to the solver as a hint for the next solve.
 
-    solver.Minimize(solver.Sum(penalty_terms))
+    Args:
+        solver: The SCIP solver instance.
+        x: The dictionary of decision variables, keyed by (student or unit index, timeslot index).
+        slots: The timeslot index of every student (or unit), e.g. of the best assignment found so far.
+        backend: The MILP backend of the solver; backends outside HINT_BACKENDS get no hint.
+    """
+    if backend not in HINT_BACKENDS:
+        return
+    slots = np.asarray(slots).tolist()
+    values = [1.0 if slots[row] == slot else 0.0 for row, slot in x]
+    solver.SetHint(list(x.values()), values)
+
+
+def define_language_selection(solver, x, availability, language_preferences):
+    """
+    Lets the solver choose the language of every timeslot instead of fixing it beforehand.
+
+    For each timeslot a boolean variable y[slot, language] is created and exactly one language is selected per slot.
+    The assignment variable x[student, slot] is split into w[student, slot, language] variables, one for every
+    language the student accepts, and each w may only be active if its language is selected for the slot. This
+    replaces the enumeration of all language combinations by a single model.
+
+    Args:
+        solver: The SCIP solver instance.
+        x: The dictionary of decision variables.
+        availability: The (number of students, number of timeslots) availability of the Instance.
+        language_preferences: The (number of students, number of languages) language preferences in the order of the
+            languages, see Instance.language_columns.
+
+    Returns:
+        tuple: A tuple containing:
+            - A dictionary mapping (timeslot index, language index) pairs to the language selection variables.
+            - A dictionary mapping (student index, timeslot index, language index) triples to the split assignment
+              variables.
+    """
+    num_students, num_timeslots = availability.shape
+    num_languages = language_preferences.shape[1]
+
+    y = {}
+    for slot in range(num_timeslots):
+        for language in range(num_languages):
+            y[slot, language] = solver.BoolVar(f'y_{slot}_{language}')
+        solver.Add(solver.Sum([y[slot, language] for language in range(num_languages)]) == 1)
+
+    available = (availability != 0).tolist()
+    accepted = [np.flatnonzero(row).tolist() for row in language_preferences > 0]
+    w = {}
+    for student in range(num_students):
+        for slot in range(num_timeslots):
+            split_terms = []
+            if available[student][slot]:
+                for language in accepted[student]:
+                    w[student, slot, language] = solver.BoolVar(f'w_{student}_{slot}_{language}')
+                    solver.Add(w[student, slot, language] <= y[slot, language])
+                    split_terms.append(w[student, slot, language])
+            solver.Add(x[student, slot] == solver.Sum(split_terms))
+
+    return y, w
 
 
+def define_language_selection_objective(solver, w, penalty_tensor):
+    """
+    Defines the objective function for the model with language selection.
+
+    The penalties are the same as in define_objective, but they are charged on the split assignment variables, since
+    the language of a timeslot is only known once the solver has selected it.
+
+    Args:
+        solver: The SCIP solver instance.
+        w: The dictionary of split assignment variables returned by define_language_selection.
+        penalty_tensor: The penalties returned by milp_solver.compute_penalty_tensor.
+    """
+    students, slots, languages = np.array(list(w), dtype=np.int64).reshape(-1, 3).T
+    _minimize(solver, w.values(), penalty_tensor[students, slots, languages])
+
+
+def count_dense_model_size(forbidden, group_indices):
+    """
+    Computes the number of variables and constraints of the model with a variable for every pair.
+
+    This is the size the model has when define_variables is called with all pairs allowed, and serves as the
+    reference for the size of the sparse model.
+
+    Args:
+        forbidden: The boolean array of the pairs fixed to 0, see define_constraints.
+        group_indices: The student indices of the group members, see Instance.group_indices.
+
+    Returns:
+        tuple: The number of variables and the number of constraints.
+    """
+    num_students, num_timeslots = forbidden.shape
+    num_variables = num_students * num_timeslots
+    num_constraints = num_timeslots + num_students + int(np.count_nonzero(forbidden))
+    num_constraints += len(group_indices) * num_timeslots
+    return num_variables, num_constraints
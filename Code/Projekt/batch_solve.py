@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+
+"""
+Solves many instances in one process.
+
+Every run of a solver script starts a new interpreter that imports OR-Tools, NumPy and SciPy, which takes longer than
+solving a small instance. This script imports the main module of a solver once and calls its main function for every
+instance, optionally on a pool of worker processes that each import it once:
+
+    python batch_solve.py hungarian "benchmarks supervisor/n100-*" --result-file n100.json -- --engine flow
+
+The arguments after "--" are passed to the solver for every instance. The result record of every instance (see
+run_result.py) is appended to the result file with the path of the instance under "benchmark". The solve time of the
+records starts when the main function of the solver is called, so it does not include the imports. Instances that
+raise an error get a record with the error message instead.
+"""
+
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from deadline import DEADLINE
+from phase_timer import TIMER
+from run_result import read_results, write_result
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# The solvers, mapped to the directory and the name of their main module
+SOLVERS = {
+    'smartalloc': ('SmartAlloc', 'main_smartalloc'),
+    'smartalloc_without_group_preference': ('SmartAlloc without group preference', 'main_smartalloc_wogp'),
+    'hungarian': ('Hungarian Method', 'main_hungarian_method'),
+}
+
+# The main function and the arguments of the solver in this process, set by _init_worker
+_solver_main = None
+_solver_args = None
+
+
+def find_benchmarks(patterns):
+    """
+    Expands directories and glob patterns into benchmark files.
+
+    Args:
+        patterns (list): Benchmark files, directories (all files starting with "n" are used, like in the lab script)
+            or glob patterns.
+
+    Returns:
+        list: The sorted paths of the benchmark files without duplicates.
+    """
+    benchmark_files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, 'n*')
+        benchmark_files.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(benchmark_files)
+
+
+def _init_worker(solver, solver_args):
+    """
+    Imports the main module of the solver and stores the arguments for solve_instance.
+    """
+    global _solver_main, _solver_args
+    directory, module_name = SOLVERS[solver]
+    # The solver modules import their neighbours (e.g. solver.py) by name
+    sys.path.insert(0, os.path.join(SCRIPT_DIR, directory))
+    _solver_main = importlib.import_module(module_name).main
+    _solver_args = list(solver_args)
+
+
+def solve_instance(benchmark_file):
+    """
+    Solves one instance with the solver of this process.
+
+    Args:
+        benchmark_file (str): The path of the instance.
+
+    Returns:
+        tuple: The result record of the instance and the output of the solver.
+    """
+    TIMER.reset()
+    DEADLINE.start(None)
+    output = io.StringIO()
+    with tempfile.TemporaryDirectory() as directory:
+        result_file = os.path.join(directory, 'result.json')
+        try:
+            with contextlib.redirect_stdout(output):
+                _solver_main([benchmark_file, *_solver_args, '--result-file', result_file])
+            record = next(read_results(result_file))
+        except (Exception, SystemExit) as e:
+            # A solver that rejects its arguments or calls sys.exit must not end the batch
+            record = {'error': f'{type(e).__name__}: {e}', 'solved': False}
+    return dict(record, benchmark=benchmark_file), output.getvalue()
+
+
+def solve_batch(benchmark_files, solver, solver_args, result_file, workers=1):
+    """
+    Solves the instances and appends their result records to the result file in the order of the instances.
+
+    Args:
+        benchmark_files (list): The paths of the instances.
+        solver (str): The solver, one of the keys of SOLVERS.
+        solver_args (list): The command line arguments passed to the solver for every instance.
+        result_file (str): The path of the result file; its previous content is replaced.
+        workers (int): The number of worker processes; 1 solves the instances in this process.
+
+    Returns:
+        int: The number of instances with an assignment.
+    """
+    open(result_file, 'w').close()
+    num_solved = 0
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(solver, solver_args))
+        results = executor.map(solve_instance, benchmark_files)
+    else:
+        executor = contextlib.nullcontext()
+        _init_worker(solver, solver_args)
+        results = map(solve_instance, benchmark_files)
+
+    with executor:
+        for record, output in results:
+            print(f"Instance: {record['benchmark']}")
+            print(output, end='')
+            if 'error' in record:
+                print(f"Error: {record['error']}")
+            num_solved += record['solved']
+            write_result(result_file, record, append=True)
+    return num_solved
+
+
+def main():
+    """
+    Solves all instances given on the command line with one solver.
+    """
+    start_time = time.time()
+    parser = argparse.ArgumentParser(description='Solve many benchmark files in one process.')
+    parser.add_argument('solver', choices=list(SOLVERS), help='The solver to run on every instance.')
+    parser.add_argument('benchmarks', nargs='+',
+                        help='Benchmark files, directories or glob patterns (quote them to keep the shell from '
+                             'expanding them).')
+    parser.add_argument('--result-file', type=str, required=True,
+                        help='Write one JSON record per instance (see run_result.py) to this file.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes that solve the instances in parallel (default: 1). Every '
+                             'worker imports the solver once.')
+    # The arguments after "--" belong to the solver
+    argv = sys.argv[1:]
+    split = argv.index('--') if '--' in argv else len(argv)
+    args, solver_args = parser.parse_args(argv[:split]), argv[split + 1:]
+    if '--result-file' in solver_args:
+        parser.error('the result file of the instances is set by --result-file of the batch')
+
+    benchmark_files = find_benchmarks(args.benchmarks)
+    if not benchmark_files:
+        parser.error('no benchmark files match the given paths')
+    num_solved = solve_batch(benchmark_files, args.solver, solver_args, args.result_file, args.workers)
+
+    print(f"Instances solved: {num_solved}/{len(benchmark_files)}")
+    print(f"Batch time: {time.time() - start_time}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#! /usr/bin/env python
+
+"""
+Compact binary format for SmartAlloc instances.
+
+A binary instance file starts with an 8 byte magic string and the length of a JSON header. The header holds the
+string tables (student IDs, timeslot IDs and descriptions, languages) and the position of every array; the arrays
+follow as raw little-endian data, each aligned to 8 bytes:
+
+    slot_preferences      int8  (num_students, num_timeslots)   0 - no, 1 - maybe, 2 - yes
+    language_preferences  int8  (num_students, num_languages)   0 - no, 1 - maybe, 2 - yes
+    group_indptr          int32 (num_students + 1,)             CSR row pointers of the group members
+    group_indices         int32 (num_group_entries,)            student indices of the group members
+
+The arrays are memory-mapped when loading, so opening an instance does not parse or copy the preferences.
+"""
+
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'SAINST01'
+BINARY_SUFFIX = '.bin'
+_ALIGNMENT = 8
+
+
+def is_binary_instance(file_path):
+    """
+    Checks whether a file is stored in the binary instance format.
+
+    Args:
+        file_path (str): The path to the instance file.
+
+    Returns:
+        bool: True if the file starts with the magic string of the binary format.
+    """
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def convert_json_to_binary(json_path, binary_path):
+    """
+    Converts an instance from the JSON format of the generator into the binary format.
+
+    The JSON instance is parsed by instance.instance_from_data, so the binary file holds the timeslot preferences as
+    the solvers see them, i.e. students that rejected every timeslot are available everywhere.
+
+    Args:
+        json_path (str): The path to the JSON instance.
+        binary_path (str): The path of the binary file to write.
+    """
+    # Imported here, since the instance module loads binary instances with this module
+    from instance import instance_from_data
+
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    instance = instance_from_data(data)
+
+    header = {
+        'team_size': instance.team_size,
+        'student_ids': instance.student_ids,
+        'timeslot_ids': instance.timeslot_ids,
+        'timeslot_descriptions': instance.timeslot_descriptions,
+        'languages': instance.languages,
+    }
+    if 'seed' in data:
+        header['seed'] = data['seed']
+    write_binary_instance(binary_path, header, instance.availability, instance.language_preferences,
+                          instance.group_indptr, instance.group_indices)
+
+
+def write_binary_instance(binary_path, header, slot_preferences, language_preferences, group_indptr,
+                          group_indices):
+    """
+    Writes an instance given as arrays in the binary format.
+
+    Args:
+        binary_path (str): The path of the binary file to write.
+        header (dict): The header entries team_size, student_ids, timeslot_ids, timeslot_descriptions and languages,
+            and optionally the seed of a generated instance.
+        slot_preferences (numpy.ndarray): The (num_students, num_timeslots) timeslot preferences.
+        language_preferences (numpy.ndarray): The (num_students, num_languages) language preferences.
+        group_indptr (numpy.ndarray): The CSR row pointers of the group members.
+        group_indices (numpy.ndarray): The student indices of the group members.
+    """
+    arrays = {
+        'slot_preferences': np.asarray(slot_preferences, dtype=np.int8),
+        'language_preferences': np.asarray(language_preferences, dtype=np.int8),
+        'group_indptr': np.asarray(group_indptr, dtype=np.int32),
+        'group_indices': np.asarray(group_indices, dtype=np.int32),
+    }
+    header = dict(header, arrays={})
+
+    # The offsets depend on the header length, so the header is encoded until its length no longer changes
+    header_length = 0
+    while True:
+        offset = _align(len(MAGIC) + 8 + header_length)
+        for name, array in arrays.items():
+            header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            offset = _align(offset + array.nbytes)
+        encoded_header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        if len(encoded_header) == header_length:
+            break
+        header_length = len(encoded_header)
+
+    with open(binary_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(encoded_header)))
+        f.write(encoded_header)
+        for name, array in arrays.items():
+            f.write(b'\0' * (header['arrays'][name]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def load_binary_instance(file_path):
+    """
+    Loads an instance in the binary format with memory-mapped arrays.
+
+    Args:
+        file_path (str): The path to the binary instance.
+
+    Returns:
+        dict: The header entries (team_size, student_ids, timeslot_ids, timeslot_descriptions, languages and the seed
+            of a generated instance, if any) and the arrays slot_preferences, language_preferences, group_indptr and
+            group_indices as read-only NumPy arrays.
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{file_path} is not a binary instance file.")
+        header_length, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    instance = {key: value for key, value in header.items() if key != 'arrays'}
+    for name, layout in header['arrays'].items():
+        shape = tuple(layout['shape'])
+        if 0 in shape:
+            # Empty arrays cannot be memory-mapped
+            instance[name] = np.zeros(shape, dtype=np.dtype(layout['dtype']))
+        else:
+            instance[name] = np.memmap(file_path, dtype=np.dtype(layout['dtype']), mode='r',
+                                       offset=layout['offset'], shape=shape)
+    return instance
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def main():
+    """
+    Converts JSON instances into the binary format.
+    """
+    parser = argparse.ArgumentParser(description='Convert JSON instances into the binary instance format.')
+    parser.add_argument('output_dir', type=str, help='Directory for the binary files.')
+    parser.add_argument('instances', type=str, nargs='+', help='Paths to the JSON instance files.')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for json_path in args.instances:
+        binary_path = os.path.join(args.output_dir, os.path.basename(json_path) + BINARY_SUFFIX)
+        convert_json_to_binary(json_path, binary_path)
+        print(f"{json_path}: {os.path.getsize(json_path)} -> {os.path.getsize(binary_path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#! /usr/bin/env python
+
+"""
+Search strategies over the language combinations of the timeslots.
+
+Both SmartAlloc and the Hungarian method solve one assignment problem per language combination. The functions in
+this module decide which combinations are evaluated; the evaluation itself is passed in as a callback, so the same
+search can drive the SCIP model as well as the assignment algorithms.
+
+Timeslots with the same preferences of every student and the same capacity (e.g. the copies Mo10_0, Mo10_1 of a
+timeslot with a slot weight above one) are interchangeable. Swapping the languages of two such timeslots does not
+change the optimal cost, so only the number of timeslots per language matters within such a class. The searches accept
+these classes (see find_slot_classes) and then only consider one combination per class of equivalent combinations.
+"""
+
+import itertools
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from deadline import DEADLINE
+from phase_timer import TIMER
+from result_cache import CACHE
+
+
+class SearchStatistics:
+    """
+    Counters collected during a search over language combinations.
+
+    Attributes:
+        nodes_explored (int): The number of search nodes (partial and complete combinations) that were visited.
+        nodes_pruned (int): The number of nodes whose subtree was cut off by the lower bound.
+        combinations_evaluated (int): The number of complete combinations passed to the evaluation callback; the
+            remaining combinations were skipped by a lower bound.
+        combinations_total (int): The number of combinations a full enumeration would consider.
+    """
+
+    def __init__(self, combinations_total):
+        self.nodes_explored = 0
+        self.nodes_pruned = 0
+        self.combinations_evaluated = 0
+        self.combinations_total = combinations_total
+
+    def report(self):
+        """
+        Prints the counters in the "Key: value" format parsed by the lab script.
+        """
+        if self.nodes_explored:
+            print(f"Nodes explored: {self.nodes_explored}")
+            print(f"Nodes pruned: {self.nodes_pruned}")
+        print(f"Combinations evaluated: {self.combinations_evaluated}")
+        print(f"Combinations skipped: {self.combinations_total - self.combinations_evaluated}")
+
+
+def find_slot_classes(availability, capacities):
+    """
+    Groups the timeslots that are interchangeable for the assignment.
+
+    Two timeslots are interchangeable if every student has the same preference for both and they have the same
+    capacity. Groups do not need to be considered, since group members are only required to share a timeslot.
+
+    Args:
+        availability (numpy.ndarray): Array of shape (num_students, num_timeslots) with the timeslot preferences.
+        capacities (list): The capacity of every timeslot.
+
+    Returns:
+        list: The classes of interchangeable timeslots as sorted lists of timeslot indices, ordered by their first
+            timeslot.
+    """
+    availability = np.asarray(availability)
+    classes = {}
+    for slot, capacity in enumerate(capacities):
+        key = (int(capacity), np.ascontiguousarray(availability[:, slot]).tobytes())
+        classes.setdefault(key, []).append(slot)
+    return sorted(classes.values())
+
+
+def _class_predecessors(num_slots, slot_classes):
+    """
+    Returns for every timeslot the previous timeslot of its class, or -1 for the first timeslot of a class.
+    """
+    predecessors = [-1] * num_slots
+    for slot_class in slot_classes or []:
+        for previous, slot in zip(slot_class, slot_class[1:]):
+            predecessors[slot] = previous
+    return predecessors
+
+
+# The orders in which enumerate_combinations can visit the language combinations
+ORDERS = ['lexicographic', 'gray']
+
+
+def enumerate_combinations(languages, num_slots, slot_classes=None, order='lexicographic'):
+    """
+    Enumerates the language combinations in the order of itertools.product(languages, repeat=num_slots).
+
+    With order='gray', the same combinations are visited in a reflected Gray code order instead, in which two
+    consecutive combinations differ in the language of a single timeslot (see _enumerate_gray). Solvers that keep
+    data of the previous combination then only have to update one timeslot per step. The best cost of a search does
+    not depend on the order, but among equally good combinations another one may be found first.
+
+    If slot_classes is given, only the first combination of every class of equivalent combinations is generated: the
+    languages within a class of interchangeable timeslots do not decrease (in the order of languages) from one
+    timeslot of the class to the next. This is the combination a full enumeration would keep among equally good
+    ones, so the result of a search does not change. Instead of len(languages) ** num_slots combinations, there is
+    one combination per number of timeslots of every language in every class.
+
+    Args:
+        languages (list): The languages to consider.
+        num_slots (int): The number of timeslots.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes.
+        order (str): One of ORDERS.
+
+    Returns:
+        iterator: The language combinations as tuples.
+    """
+    if order == 'gray':
+        return _enumerate_gray(languages, num_slots, slot_classes)
+    if not slot_classes:
+        return itertools.product(languages, repeat=num_slots)
+    return _enumerate_canonical(languages, _class_predecessors(num_slots, slot_classes), [])
+
+
+def _enumerate_canonical(languages, predecessors, language_indices):
+    depth = len(language_indices)
+    if depth == len(predecessors):
+        yield tuple(languages[index] for index in language_indices)
+        return
+    first = language_indices[predecessors[depth]] if predecessors[depth] >= 0 else 0
+    for language_index in range(first, len(languages)):
+        language_indices.append(language_index)
+        yield from _enumerate_canonical(languages, predecessors, language_indices)
+        language_indices.pop()
+
+
+def _enumerate_gray(languages, num_slots, slot_classes=None):
+    """
+    Enumerates the language combinations in reflected mixed-radix Gray code order.
+
+    Every class of interchangeable timeslots (every single timeslot without classes) is one digit whose values are
+    the non-decreasing language sequences of the class in lexicographic order, like in _enumerate_canonical. Every
+    step changes one digit by one value, starting with the digit of the last timeslot. For two languages, this
+    changes the language of exactly one timeslot; with more languages, a step within a class of several timeslots
+    may change several of them.
+    """
+    slot_classes = slot_classes or [[slot] for slot in range(num_slots)]
+    # The digits are ordered by the last timeslot of their class, so the last timeslot changes most often
+    slot_classes = sorted(slot_classes, key=lambda slot_class: slot_class[-1], reverse=True)
+    values = [list(itertools.combinations_with_replacement(range(len(languages)), len(slot_class)))
+              for slot_class in slot_classes]
+    digits = [0] * len(slot_classes)
+    directions = [1] * len(slot_classes)
+    language_indices = [0] * num_slots
+
+    while True:
+        yield tuple(languages[index] for index in language_indices)
+        # The first digit that can still move in its direction changes, all digits before it turn around
+        for position, digit in enumerate(digits):
+            if 0 <= digit + directions[position] < len(values[position]):
+                break
+        else:
+            return
+        digits[position] += directions[position]
+        for previous in range(position):
+            directions[previous] = -directions[previous]
+        for slot, language_index in zip(slot_classes[position], values[position][digits[position]]):
+            language_indices[slot] = language_index
+
+
+def branch_and_bound(cost_tensor, languages, evaluate, slot_classes=None):
+    """
+    Finds the best language combination by depth-first branch and bound.
+
+    The languages of the timeslots are fixed one at a time in the order of the timeslots. For a partial combination
+    the lower bound is the sum over all students of their cheapest (timeslot, language) pair that is still possible,
+    i.e. capacities and groups are relaxed. A subtree is pruned as soon as its bound is not smaller than the best
+    cost found so far. Since the subtrees are visited in the order of itertools.product(languages, ...) and only
+    strictly better combinations replace the incumbent, the result is the same as the one of a full enumeration.
+    When the time limit (deadline.DEADLINE) is reached, the search stops and returns the best combination so far.
+
+    Args:
+        cost_tensor (numpy.ndarray): Array of shape (num_students, num_timeslots, num_languages) with the cost of every
+            assignment; forbidden assignments are np.inf.
+        languages (list): The languages, in the order of the last axis of cost_tensor.
+        evaluate (callable): Called with a complete language combination (tuple); returns a tuple of the optimal cost
+            (float('inf') if the combination is infeasible) and an arbitrary solution object.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes; only the
+            combinations generated by enumerate_combinations are searched.
+
+    Returns:
+        tuple: A tuple containing:
+            - The best cost (float('inf') if no combination is feasible).
+            - The best language combination, or None.
+            - The solution object returned by evaluate for the best combination, or None.
+            - The SearchStatistics of the search.
+    """
+    cost_tensor = np.asarray(cost_tensor, dtype=np.float64)
+    num_students, num_slots, _ = cost_tensor.shape
+    statistics = SearchStatistics(len(languages) ** num_slots)
+
+    # suffix_min[:, d] is the cheapest cost of every student over the timeslots d, d+1, ... with any language
+    free_min = cost_tensor.min(axis=2)
+    suffix_min = np.full((num_students, num_slots + 1), np.inf)
+    for slot in range(num_slots - 1, -1, -1):
+        suffix_min[:, slot] = np.minimum(free_min[:, slot], suffix_min[:, slot + 1])
+
+    predecessors = _class_predecessors(num_slots, slot_classes)
+    best = {'cost': float('inf'), 'combination': None, 'solution': None}
+
+    def search(depth, combination, language_indices, fixed_min):
+        if DEADLINE.expired():
+            TIMER.count('interrupted')
+            return
+        statistics.nodes_explored += 1
+        lower_bound = np.minimum(fixed_min, suffix_min[:, depth]).sum()
+        if lower_bound >= best['cost'] or lower_bound == np.inf:
+            statistics.nodes_pruned += 1
+            return
+
+        if depth == num_slots:
+            statistics.combinations_evaluated += 1
+            cost, solution = evaluate(tuple(combination))
+            if cost < best['cost']:
+                best['cost'] = cost
+                best['combination'] = tuple(combination)
+                best['solution'] = solution
+            return
+
+        first = language_indices[predecessors[depth]] if predecessors[depth] >= 0 else 0
+        for language_index in range(first, len(languages)):
+            combination.append(languages[language_index])
+            language_indices.append(language_index)
+            search(depth + 1, combination, language_indices,
+                   np.minimum(fixed_min, cost_tensor[:, depth, language_index]))
+            language_indices.pop()
+            combination.pop()
+
+    search(0, [], [], np.full(num_students, np.inf))
+    return best['cost'], best['combination'], best['solution'], statistics
+
+
+# State of a worker process of evaluate_in_parallel, set once by _init_worker.
+_worker_state = {}
+
+
+def _init_worker(evaluate, context, cost_tensor, shared_best, deadline_end, cache_config):
+    DEADLINE.end = deadline_end
+    CACHE.open(**cache_config)
+    # A forked worker starts with a copy of the totals of the parent process, which the parent already counts
+    TIMER.reset()
+    _worker_state['evaluate'] = evaluate
+    _worker_state['context'] = context
+    _worker_state['cost_tensor'] = cost_tensor
+    _worker_state['shared_best'] = shared_best
+
+
+def _combination_lower_bound(cost_tensor, language_indices):
+    return cost_tensor[:, np.arange(cost_tensor.shape[1]), language_indices].min(axis=1).sum()
+
+
+def _evaluate_chunk(chunk):
+    """
+    Evaluates a chunk of (index, combination, language indices) triples in a worker process.
+
+    Returns the best (cost, index, combination, solution) of the chunk, the number of evaluated combinations and the
+    phase times of the worker since its last chunk.
+    """
+    evaluate = _worker_state['evaluate']
+    context = _worker_state['context']
+    cost_tensor = _worker_state['cost_tensor']
+    shared_best = _worker_state['shared_best']
+
+    best = (float('inf'), -1, None, None)
+    evaluated = 0
+    for index, combination, language_indices in chunk:
+        if DEADLINE.expired():
+            TIMER.count('interrupted')
+            break
+        # Ties are not skipped, the final result would depend on the schedule otherwise
+        if cost_tensor is not None and _combination_lower_bound(cost_tensor, language_indices) > shared_best.value:
+            continue
+
+        evaluated += 1
+        cost, solution = evaluate(context, combination)
+        if cost < best[0]:
+            best = (cost, index, combination, solution)
+            with shared_best.get_lock():
+                if cost < shared_best.value:
+                    shared_best.value = cost
+    return best, evaluated, TIMER.collect()
+
+
+def evaluate_in_parallel(num_slots, languages, evaluate, context, workers, cost_tensor=None, chunk_size=16,
+                         slot_classes=None, order='lexicographic', combinations=None):
+    """
+    Evaluates all language combinations on a pool of worker processes.
+
+    The combinations are distributed in chunks in the order of enumerate_combinations. At most two chunks per worker
+    are submitted at a time and a new one is generated whenever a chunk is done, so the combinations are never all in
+    memory. The best cost found by any worker is shared between the processes, and a combination whose lower bound
+    (see branch_and_bound) is already worse is skipped. The result is the combination with the smallest cost and,
+    among equal costs, the one that comes first in the enumeration order, so it is the same as the result of a serial
+    enumeration. When the time limit (deadline.DEADLINE) is reached, the workers skip the rest of their chunks and no
+    further chunks are submitted. The workers use the same result cache (result_cache.CACHE) as the calling process.
+
+    Args:
+        num_slots (int): The number of timeslots.
+        languages (list): The languages to consider.
+        evaluate (callable): A module level function called as evaluate(context, combination) in the worker
+            processes; returns a tuple of the optimal cost (float('inf') if the combination is infeasible) and an
+            arbitrary solution object.
+        context: A picklable object with the instance data, passed to evaluate.
+        workers (int): The number of worker processes.
+        cost_tensor (numpy.ndarray): Optional array of shape (num_students, num_timeslots, num_languages) with the cost
+            of every assignment (np.inf if forbidden), used to skip combinations early.
+        chunk_size (int): The number of combinations sent to a worker at once.
+        slot_classes (list): Optional classes of interchangeable timeslots returned by find_slot_classes; only the
+            combinations generated by enumerate_combinations are evaluated.
+        order (str): The order of the combinations, one of ORDERS.
+        combinations (iterable): Optional combinations to evaluate instead of the ones of enumerate_combinations, e.g.
+            the ones a feasibility check accepted; they are consumed in the order given.
+
+    Returns:
+        tuple: The best cost, the best language combination, the solution object of the best combination and the
+            SearchStatistics of the run.
+    """
+    statistics = SearchStatistics(len(languages) ** num_slots)
+    if cost_tensor is not None:
+        cost_tensor = np.asarray(cost_tensor, dtype=np.float64)
+
+    if combinations is None:
+        combinations = enumerate_combinations(languages, num_slots, slot_classes, order)
+    indexed_combinations = ((index, combination, [languages.index(language) for language in combination])
+                            for index, combination in enumerate(combinations))
+    chunks = iter(lambda: list(itertools.islice(indexed_combinations, chunk_size)), [])
+
+    shared_best = multiprocessing.Value('d', float('inf'))
+    best = (float('inf'), -1, None, None)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(evaluate, context, cost_tensor, shared_best, DEADLINE.end,
+                                       CACHE.config())) as executor:
+        pending = {executor.submit(_evaluate_chunk, chunk) for chunk in itertools.islice(chunks, 2 * workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_best, evaluated, phase_times = future.result()
+                statistics.combinations_evaluated += evaluated
+                TIMER.merge(phase_times)
+                if (chunk_best[0], chunk_best[1]) < (best[0], best[1]):
+                    best = chunk_best
+            if not DEADLINE.expired():
+                pending.update(executor.submit(_evaluate_chunk, chunk)
+                               for chunk in itertools.islice(chunks, len(done)))
+            elif next(chunks, None) is not None:
+                # The combinations that were not submitted yet are skipped
+                TIMER.count('interrupted')
+                chunks = iter(())
+
+    best_cost, _, best_combination, best_solution = best
+    return best_cost, best_combination, best_solution, statistics
@@ -0,0 +1,64 @@
+#! /usr/bin/env python
+
+"""
+Time limit of a solver run.
+
+With --time-limit, the solvers stop the search over the language combinations when the time is up and pass the
+remaining time to SCIP, so a run always ends with the best assignment found so far instead of being killed. Every
+time the limit cuts off a solve or a search, the counter 'interrupted' of phase_timer.TIMER is increased; the result
+is only proven optimal if this never happened.
+
+The deadline of a process is the module level DEADLINE. It stores the end as an absolute time, so it can be passed to
+worker processes (see combination_search.evaluate_in_parallel).
+"""
+
+import time
+
+
+class Deadline:
+    """
+    The point in time at which a run has to stop.
+
+    Attributes:
+        end (float): The end of the run as returned by time.time(), or None if there is no time limit.
+    """
+
+    def __init__(self):
+        self.end = None
+
+    def start(self, time_limit, start_time=None):
+        """
+        Sets the deadline.
+
+        Args:
+            time_limit (float): The time limit in seconds, or None for no limit.
+            start_time (float): The start of the run as returned by time.time(); defaults to now.
+        """
+        if time_limit is None:
+            self.end = None
+        else:
+            self.end = (time.time() if start_time is None else start_time) + time_limit
+
+    def remaining(self):
+        """
+        Returns the remaining time in seconds (infinity if there is no time limit).
+        """
+        if self.end is None:
+            return float('inf')
+        return max(0.0, self.end - time.time())
+
+    def expired(self):
+        """
+        Returns True if the time limit is reached.
+        """
+        return self.end is not None and time.time() >= self.end
+
+    def limit_solver(self, solver):
+        """
+        Passes the remaining time to a pywraplp solver.
+        """
+        if self.end is not None:
+            solver.SetTimeLimit(max(1, int(self.remaining() * 1000)))
+
+
+DEADLINE = Deadline()
@@ -0,0 +1,136 @@
+#! /usr/bin/env python
+
+"""
+Feasibility check of language combinations.
+
+For a fixed language combination, a student can only be assigned to a timeslot they are available for (preference
+above 0) and whose language they accept (preference above 0). A complete assignment exists if and only if the
+students can be matched to the timeslots without exceeding the capacities, which is checked with a maximum flow.
+Students with the same allowed timeslots are merged into one node first, so the flow network stays small.
+"""
+
+import numpy as np
+from ortools.graph.python import max_flow
+
+from phase_timer import TIMER
+
+
+class FeasibilityOracle:
+    """
+    Decides for language combinations whether every student can be assigned to an allowed timeslot.
+
+    The check is exact for the model without groups. With pre-formed groups it is a relaxation (members of a group
+    may be matched to different timeslots), so a combination it rejects is infeasible in every model.
+
+    The timeslots a student may be assigned to are stored as a bitmask (bit j for timeslot j). Students with the same
+    available timeslots and accepted languages are merged into one type.
+
+    Attributes:
+        languages (list): The languages, in the order of the columns of the language preferences.
+        capacities (numpy.ndarray): The capacity of every timeslot.
+        available_masks (numpy.ndarray): The bitmask of the available timeslots of every type of student.
+        accepted (numpy.ndarray): Array (num_types, num_languages) that is 1 if the type accepts the language.
+        type_counts (numpy.ndarray): The number of students of every type.
+    """
+
+    def __init__(self, availability, language_preferences, capacities, languages):
+        """
+        Args:
+            availability (numpy.ndarray): The (num_students, num_timeslots) timeslot preferences.
+            language_preferences (numpy.ndarray): The (num_students, num_languages) language preferences, in the order
+                of languages (see Instance.language_columns).
+            capacities (list): The capacity of every timeslot.
+            languages (list): The languages of the combinations.
+        """
+        self.languages = list(languages)
+        self.capacities = np.asarray(capacities, dtype=np.int64)
+        num_timeslots = self.capacities.shape[0]
+
+        # Masks of more than 62 timeslots do not fit into an int64 and are stored as Python integers
+        self._dtype = np.int64 if num_timeslots < 63 else object
+        self._slot_bits = np.array([1 << slot for slot in range(num_timeslots)], dtype=self._dtype)
+        self._full_mask = (1 << num_timeslots) - 1
+
+        allowed = np.hstack([np.asarray(availability) > 0, np.asarray(language_preferences) > 0])
+        types, self.type_counts = np.unique(allowed, axis=0, return_counts=True)
+        self.available_masks = types[:, :num_timeslots].astype(self._dtype) @ self._slot_bits
+        self.accepted = types[:, num_timeslots:].astype(self._dtype)
+
+    def allowed_masks(self, language_combination):
+        """
+        Computes the bitmask of the timeslots every type of student can be assigned to for a language combination.
+
+        Args:
+            language_combination (tuple): The language of every timeslot.
+
+        Returns:
+            numpy.ndarray: The bitmask of every type of student.
+        """
+        language_masks = np.zeros(len(self.languages), dtype=self._dtype)
+        for slot, language in enumerate(language_combination):
+            language_masks[self.languages.index(language)] |= self._slot_bits[slot]
+        # Every timeslot has exactly one language, so the sum of the language masks is their union
+        return self.available_masks & (self.accepted @ language_masks)
+
+    def is_feasible(self, language_combination):
+        """
+        Checks whether all students can be assigned for a language combination.
+
+        Args:
+            language_combination (tuple): The language of every timeslot.
+
+        Returns:
+            bool: True if an assignment that respects availability, languages and capacities exists.
+        """
+        allowed_masks = self.allowed_masks(language_combination)
+        if (allowed_masks == 0).any():
+            return False  # At least one student cannot find a suitable slot
+
+        num_students = int(self.type_counts.sum())
+        if num_students > self.capacities.sum():
+            return False
+
+        # Merge the types with the same allowed timeslots
+        masks, inverse = np.unique(allowed_masks, return_inverse=True)
+        if len(masks) == 1 and masks[0] == self._full_mask:
+            return True
+        demands = np.bincount(inverse.reshape(-1), weights=self.type_counts, minlength=len(masks)).astype(np.int64)
+        rows = (masks[:, np.newaxis] & self._slot_bits) != 0
+
+        # Nodes: source 0, one node per mask, one node per timeslot and the sink
+        num_masks, num_timeslots = rows.shape
+        source, sink = 0, num_masks + num_timeslots + 1
+        mask_nodes = np.arange(1, num_masks + 1)
+        slot_nodes = np.arange(num_masks + 1, num_masks + num_timeslots + 1)
+        mask_indices, slot_indices = np.nonzero(rows)
+
+        tails = np.concatenate([np.full(num_masks, source), mask_nodes[mask_indices], slot_nodes])
+        heads = np.concatenate([mask_nodes, slot_nodes[slot_indices], np.full(num_timeslots, sink)])
+        arc_capacities = np.concatenate([demands, demands[mask_indices], self.capacities])
+
+        network = max_flow.SimpleMaxFlow()
+        network.add_arcs_with_capacity(tails, heads, arc_capacities)
+        if network.solve(source, sink) != network.OPTIMAL:
+            raise RuntimeError("The maximum flow of the feasibility check could not be computed.")
+        return network.optimal_flow() == num_students
+
+
+def is_combination_feasible(feasibility_oracle, language_combination):
+    """
+    Checks a language combination with the oracle before a solver works on it.
+
+    The check is timed as part of the build phase, and a rejected combination is counted as infeasible (see
+    phase_timer.py).
+
+    Args:
+        feasibility_oracle (FeasibilityOracle): The oracle of the instance.
+        language_combination (tuple): The language of every timeslot.
+
+    Returns:
+        bool: True if an assignment that respects availability, languages and capacities exists.
+    """
+    with TIMER.phase('build'):
+        feasible = feasibility_oracle.is_feasible(language_combination)
+    if not feasible:
+        TIMER.count('infeasible')
+    return feasible
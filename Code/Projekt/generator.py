@@ -0,0 +1,372 @@
+#! /usr/bin/env python
+
+"""
+Generator of random benchmark instances.
+
+Every instance is drawn from a NumPy random generator with an explicit seed, which is stored in the instance under
+"seed". The seed of an instance is derived from the seed of the suite and the name of the instance, so generating a
+suite again with the same seed reproduces it, and an instance can be regenerated on its own with generate_instance:
+
+    python generator.py --tiers supervisor large --seed 42 --output-dir benchmarks --workers 4
+
+The tiers of the suite (see TIERS) are
+- supervisor: the 17 sizes from 50 to 2000 students of the original benchmark set,
+- large: 10000, 50000 and 100000 students,
+- many-slots: 2000 to 50000 students whose timeslots lie on 25 or 50 distinct days and times, which multiplies the
+  number of language combinations.
+
+The instances are named n<students>-p<preference type>-<index>; many-slots instances add -k<distinct timeslots> after
+the size. The JSON files of the large tiers take gigabytes, so these are better written in the binary format of
+binary_instance.py with --binary.
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from binary_instance import BINARY_SUFFIX, write_binary_instance
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+TIMES = ["10:15-12:00", "12:15-14:00", "14:15-16:00", "16:15-18:00"]
+EPSILON = 0.00001
+LANGUAGES = ["E", "G"]
+LANGUAGE_PREF_ENCODED = {
+    0: {"E": 2, "G": 0},
+    1: {"E": 2, "G": 1},
+    2: {"E": 1, "G": 2},
+    3: {"E": 2, "G": 2}}
+# The rows of LANGUAGE_PREF_ENCODED with the columns of LANGUAGES
+_LANGUAGE_TABLE = np.array([[LANGUAGE_PREF_ENCODED[l_pref][language] for language in LANGUAGES]
+                            for l_pref in sorted(LANGUAGE_PREF_ENCODED)], dtype=np.int8)
+# Number of students whose JSON records are formatted at once
+_JSON_CHUNK = 1024
+
+PRETEAM_DIST = [0.75, 0.25]
+LANGUAGE_PREF = [0.05, 0.35, 0.35, 0.25]
+PREF_TYPES = [0, 1, 2]
+# The tiers of the suite: the numbers of students, the students per timeslot, the numbers of distinct days and times
+# (None draws them like the original benchmarks) and the number of instances per size and preference type
+TIERS = {
+    "supervisor": ([50, 60, 70, 80, 90, 100, 125, 150, 175, 200, 300, 400, 500, 750, 1000, 1500, 2000], 60, [None],
+                   10),
+    "large": ([10000, 50000, 100000], 60, [None], 3),
+    "many-slots": ([2000, 10000, 50000], 30, [25, 50], 3),
+}
+
+
+def draw_slots(rng, num_slots):
+    """
+    Draws distinct days and times for the timeslots.
+
+    A week has len(DAYS) * len(TIMES) distinct timeslots; if more are needed, the timeslots are spread over several
+    weeks.
+
+    Returns:
+        list: The identifier prefix and the description of every timeslot.
+    """
+    per_week = len(DAYS) * len(TIMES)
+    num_weeks = math.ceil(num_slots / per_week)
+    slots = []
+    for code in rng.choice(num_weeks * per_week, size=num_slots, replace=False):
+        week, code = divmod(int(code), per_week)
+        day, time_of_day = DAYS[code // len(TIMES)], TIMES[code % len(TIMES)]
+        if num_weeks > 1:
+            slots.append((f"W{week + 1}{day[0:2]}{time_of_day[0:2]}", f"Week {week + 1} {day} {time_of_day}"))
+        else:
+            slots.append((f"{day[0:2]}{time_of_day[0:2]}", f"{day} {time_of_day}"))
+    return slots
+
+
+def generate(name, num_students, slot_weights, preteam_dist, language_pref, slot_pref, seed=None, binary=False):
+    """
+    Generates a random instance and writes it to a file.
+
+    The students are shuffled and cut into teams whose sizes are drawn from preteam_dist; the last team takes the
+    remaining students. Every team draws one language preference and one preference per timeslot, which all its
+    members share.
+
+    Args:
+        name (str): The path of the instance file.
+        num_students (int): The number of students.
+        slot_weights (list): The number of groups of every distinct timeslot.
+        preteam_dist (list): The probability of every team size, starting with 1.
+        language_pref (list): The probability of every row of LANGUAGE_PREF_ENCODED.
+        slot_pref (list): The probabilities of the preferences 0, 1 and 2 for every distinct timeslot.
+        seed (int): The seed of the random generator; None draws a fresh one. It is stored in the instance.
+        binary (bool): Whether to write the binary format of binary_instance.py instead of JSON.
+
+    Returns:
+        int: The seed of the instance.
+    """
+    num_slots = len(slot_weights)
+    team_size = len(preteam_dist)
+    slot_pref = np.asarray(slot_pref, dtype=float)
+
+    assert abs(sum(preteam_dist) - 1) < EPSILON, "the pre team distribution does not add up to 1"
+    assert abs(sum(language_pref) - 1) < EPSILON, "the language preference distribution does not add up to 1"
+    assert len(slot_pref) == num_slots, "incosistent number of slots between slot weights and slot preferences"
+    for slot in range(num_slots):
+        assert len(slot_pref[slot]) == 3, f"slot #{slot} does not have 3 preferences"
+        assert abs(sum(slot_pref[slot]) - 1) < EPSILON, f"slot #{slot} preferences do not add up to 1"
+
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy)
+    rng = np.random.default_rng(seed)
+
+    timeslots = []
+    for s, (prefix, description) in enumerate(draw_slots(rng, num_slots)):
+        timeslots.extend((f"{prefix}_{i}", description, s) for i in range(slot_weights[s]))
+    timeslots.sort()
+    timeslot_ids = [slot for slot, _, _ in timeslots]
+    timeslot_descriptions = [description for _, description, _ in timeslots]
+    slot_of_timeslot = np.array([s for _, _, s in timeslots], dtype=np.int64)
+
+    # Team sizes are drawn until they cover all students; the members of team t are members[starts[t]:ends[t]]
+    sizes = rng.choice(np.arange(1, team_size + 1), size=num_students, p=preteam_dist)
+    ends = np.cumsum(sizes)
+    num_teams = int(np.searchsorted(ends, num_students)) + 1
+    ends = np.minimum(ends[:num_teams], num_students)
+    starts = np.concatenate(([0], ends[:-1]))
+    sizes = ends - starts
+    members = rng.permutation(num_students)
+    team_of_student = np.empty(num_students, dtype=np.int64)
+    team_of_student[members] = np.repeat(np.arange(num_teams), sizes)
+
+    team_languages = rng.choice(len(language_pref), size=num_teams, p=language_pref)
+    # A preference is the number of cumulative probabilities of its timeslot below a uniform number
+    thresholds = np.cumsum(slot_pref, axis=1)[:, :-1]
+    team_slot_prefs = (rng.random((num_teams, num_slots))[:, :, np.newaxis] > thresholds).sum(axis=2)
+
+    slot_preferences = team_slot_prefs.astype(np.int8)[team_of_student][:, slot_of_timeslot]
+    language_preferences = _LANGUAGE_TABLE[team_languages[team_of_student]]
+
+    # Every student lists the other members of its team in the order of the team
+    student_team_sizes = sizes[team_of_student]
+    group_indptr = np.zeros(num_students + 1, dtype=np.int64)
+    group_indptr[1:] = np.cumsum(student_team_sizes - 1)
+    rows = np.repeat(np.arange(num_students), student_team_sizes)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(student_team_sizes) - student_team_sizes,
+                                               student_team_sizes)
+    mates = members[starts[team_of_student[rows]] + offsets]
+    group_indices = mates[mates != rows]
+
+    student_ids = ["S{:03d}".format(i + 1) for i in range(num_students)]
+    if binary:
+        header = {
+            'team_size': team_size,
+            'student_ids': student_ids,
+            'timeslot_ids': timeslot_ids,
+            'timeslot_descriptions': timeslot_descriptions,
+            'languages': LANGUAGES,
+            'seed': seed,
+        }
+        write_binary_instance(name, header, slot_preferences, language_preferences, group_indptr, group_indices)
+    else:
+        _write_json(name, seed, team_size, student_ids, timeslot_ids, timeslot_descriptions, slot_preferences,
+                    language_preferences, group_indptr, group_indices)
+    return seed
+
+
+def _write_json(name, seed, team_size, student_ids, timeslot_ids, timeslot_descriptions, slot_preferences,
+                language_preferences, group_indptr, group_indices):
+    """
+    Writes an instance in the JSON format with sorted keys and without indentation.
+
+    The timeslot preferences of a student take most of the file, so they are written from a template of the "slot"
+    dictionary whose digits are filled in for many students at once.
+    """
+    template = bytearray(b'{')
+    digit_columns = []
+    for index, slot in enumerate(timeslot_ids):
+        template += f'{"," if index else ""}"{slot}":'.encode()
+        digit_columns.append(len(template))
+        template += b'0'
+    template += b'}}'
+
+    with open(name, 'w', encoding='utf-8') as f:
+        f.write(f'{{"seed":{seed},"students":{{')
+        for start in range(0, len(student_ids), _JSON_CHUNK):
+            stop = min(start + _JSON_CHUNK, len(student_ids))
+            records = np.tile(np.frombuffer(bytes(template), dtype=np.uint8), (stop - start, 1))
+            records[:, digit_columns] = slot_preferences[start:stop] + ord('0')
+            for student in range(start, stop):
+                group = [student_ids[peer] for peer in group_indices[group_indptr[student]:group_indptr[student + 1]]]
+                language = dict(zip(LANGUAGES, language_preferences[student].tolist()))
+                f.write(f'{"," if student else ""}"{student_ids[student]}":{{"group":{json.dumps(group)},'
+                        f'"language":{json.dumps(language, separators=(",", ":"))},"slot":')
+                f.write(records[student - start].tobytes().decode('ascii'))
+        f.write(f'}},"team_size":{team_size},"timeslots":')
+        json.dump(dict(zip(timeslot_ids, timeslot_descriptions)), f, ensure_ascii=False, sort_keys=True,
+                  separators=(",", ":"))
+        f.write('}')
+
+
+def get_slots(num_students, rng, students_per_slot=60, num_distinct=None):
+    """
+    Draws the number of groups of every distinct timeslot.
+
+    Without num_distinct, every group opens a new distinct timeslot with probability 1 / (number of distinct timeslots
+    + 1) and otherwise joins a random one, like in the original benchmarks.
+
+    Args:
+        num_students (int): The number of students.
+        rng (numpy.random.Generator): The random generator.
+        students_per_slot (int): The number of students per group.
+        num_distinct (int): The number of distinct timeslots, or None to draw it.
+
+    Returns:
+        list: The number of groups of every distinct timeslot.
+    """
+    num_slots = max(2, math.ceil(num_students / students_per_slot))
+    if num_distinct is not None:
+        if num_distinct > num_slots:
+            raise ValueError(f"{num_students} students do not fill {num_distinct} distinct timeslots")
+        # Every distinct timeslot gets one group, the other groups are spread uniformly
+        return (1 + rng.multinomial(num_slots - num_distinct, np.full(num_distinct, 1 / num_distinct))).tolist()
+    slots = [1, 1]
+    for i in range(2, num_slots):
+        rn_new_slot = int(rng.integers(0, len(slots) + 1))
+        if rn_new_slot == len(slots):
+            slots.append(1)
+        else:
+            slots[rn_new_slot] += 1
+    return slots
+
+
+# pref types:
+# 0: all slots have the same "normal" distribution
+# 1: one slot is preferred, one disliked, rest normal
+# 2: one slot is extremely preferred, one extremely disliked, rest normal
+prefs = {
+    "p+": [0.05, 0.15, 0.8],
+    "p": [0.1, 0.3, 0.6],
+    "n": [0.3, 0.4, 0.3],
+    "d": [0.6, 0.3, 0.1],
+    "d+": [0.8, 0.15, 0.05]
+}
+
+
+def get_slot_prefs(num_slots, pref_type, rng):
+    slot_prefs = [prefs["n"]] * num_slots
+    if pref_type == 1:
+        slot_prefs[0] = prefs["p"]
+        slot_prefs[1] = prefs["d"]
+    elif pref_type == 2:
+        slot_prefs[0] = prefs["p+"]
+        slot_prefs[1] = prefs["d+"]
+    rng.shuffle(slot_prefs)
+    return slot_prefs
+
+
+def instance_seed(suite_seed, name):
+    """
+    Derives the seed of an instance from the seed of the suite and the name of the instance.
+    """
+    sequence = np.random.SeedSequence(suite_seed, spawn_key=tuple(name.encode()))
+    return int(sequence.generate_state(1, np.uint64)[0])
+
+
+def generate_instance(name, num_students, pref_type, seed, students_per_slot=60, num_distinct=None, output_dir='.',
+                      binary=False):
+    """
+    Generates one instance of the suite; the same arguments always give the same instance.
+
+    The timeslots and their preference distributions are drawn from a child of the seed, the students by generate
+    from the seed itself.
+
+    Args:
+        name (str): The name of the instance file.
+        num_students (int): The number of students.
+        pref_type (int): The preference type, see get_slot_prefs.
+        seed (int): The seed of the instance.
+        students_per_slot (int): The number of students per group, see get_slots.
+        num_distinct (int): The number of distinct timeslots, or None to draw it.
+        output_dir (str): The directory of the instance file.
+        binary (bool): Whether to write the binary format instead of JSON.
+
+    Returns:
+        str: The path of the instance file.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+    slots = get_slots(num_students, rng, students_per_slot, num_distinct)
+    slot_prefs = get_slot_prefs(len(slots), pref_type, rng)
+    path = os.path.join(output_dir, name + (BINARY_SUFFIX if binary else ""))
+    generate(path, num_students, slots, PRETEAM_DIST, LANGUAGE_PREF, slot_prefs, seed, binary)
+    return path
+
+
+def suite(tiers, suite_seed, instances=None):
+    """
+    Lists the instances of the given tiers.
+
+    Args:
+        tiers (list): Keys of TIERS.
+        suite_seed (int): The seed of the suite.
+        instances (int): The number of instances per size and preference type, or None for the default of the tier.
+
+    Returns:
+        list: The arguments of generate_instance (name, students, preference type, seed, students per slot and
+            distinct timeslots) of every instance.
+    """
+    jobs = []
+    for tier in tiers:
+        sizes, students_per_slot, distinct_counts, default_instances = TIERS[tier]
+        for n in sizes:
+            for num_distinct in distinct_counts:
+                size_name = f"n{n}" if num_distinct is None else f"n{n}-k{num_distinct}"
+                for pref_type in PREF_TYPES:
+                    for i in range(default_instances if instances is None else instances):
+                        name = f"{size_name}-p{pref_type}-{i}"
+                        jobs.append((name, n, pref_type, instance_seed(suite_seed, name), students_per_slot,
+                                     num_distinct))
+    return jobs
+
+
+def main():
+    """
+    Generates the instances of the chosen tiers, in parallel on several worker processes.
+    """
+    start_time = time.time()
+    parser = argparse.ArgumentParser(description="Generate random benchmark instances.")
+    parser.add_argument("--tiers", nargs="+", choices=list(TIERS), default=["supervisor"],
+                        help="The size tiers to generate (default: supervisor).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="The seed of the suite; the seed of every instance is derived from it and its name. "
+                             "Default: a fresh seed, which is printed.")
+    parser.add_argument("--instances", type=int, default=None,
+                        help="The number of instances per size and preference type (default: set by the tier).")
+    parser.add_argument("--output-dir", type=str, default=".", help="The directory of the instance files.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="The number of worker processes (default: the number of CPUs).")
+    parser.add_argument("--binary", action="store_true",
+                        help="Write the binary format of binary_instance.py instead of JSON.")
+    args = parser.parse_args()
+
+    suite_seed = int(np.random.SeedSequence().entropy) if args.seed is None else args.seed
+    print(f"Suite seed: {suite_seed}")
+    jobs = suite(args.tiers, suite_seed, args.instances)
+    os.makedirs(args.output_dir, exist_ok=True)
+    arguments = [job + (args.output_dir, args.binary) for job in jobs]
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            paths = executor.map(_generate_job, arguments)
+            for path in paths:
+                print(path)
+    else:
+        for path in map(_generate_job, arguments):
+            print(path)
+    print(f"Generation time: {time.time() - start_time}s")
+
+
+def _generate_job(arguments):
+    return generate_instance(*arguments)
+
+
+if __name__ == "__main__":
+    main()
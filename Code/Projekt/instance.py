@@ -0,0 +1,186 @@
+#! /usr/bin/env python
+
+"""
+Instance model shared by all solvers.
+
+An Instance stores the students and timeslots as integer indices and the preferences as NumPy arrays, so the solvers
+can work on arrays instead of nested dictionaries keyed by strings. The dictionaries of the JSON format can still be
+derived from it for the reference cost matrix of the Hungarian method (see Hungarian Method/benchmark_cost_matrix.py).
+"""
+
+import json
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from binary_instance import is_binary_instance, load_binary_instance
+
+
+class Instance:
+    """
+    A SmartAlloc instance with integer-indexed arrays.
+
+    Attributes:
+        student_ids (list): The student identifiers; the position is the student index.
+        student_index (dict): Maps a student identifier to its index.
+        timeslot_ids (list): The timeslot identifiers; the position is the timeslot index.
+        timeslot_index (dict): Maps a timeslot identifier to its index.
+        timeslot_descriptions (list): The description (day and time) of every timeslot.
+        languages (list): The language identifiers; the position is the column of language_preferences.
+        availability (numpy.ndarray): int8 array (num_students, num_timeslots) with the timeslot preferences
+            (0 - no, 1 - maybe, 2 - yes). Students that rejected every timeslot are treated as available everywhere.
+        language_preferences (numpy.ndarray): int8 array (num_students, num_languages) with the language preferences.
+        group_indptr (numpy.ndarray): int32 CSR row pointers; the group members of student i are
+            group_indices[group_indptr[i]:group_indptr[i + 1]].
+        group_indices (numpy.ndarray): int32 student indices of the group members.
+        team_size (int): The team size of the instance, or None.
+    """
+
+    __slots__ = ('student_ids', 'student_index', 'timeslot_ids', 'timeslot_index', 'timeslot_descriptions',
+                 'languages', 'availability', 'language_preferences', 'group_indptr', 'group_indices', 'team_size')
+
+    def __init__(self, student_ids, timeslot_ids, timeslot_descriptions, languages, slot_preferences,
+                 language_preferences, group_indptr, group_indices, team_size=None):
+        self.student_ids = list(student_ids)
+        self.student_index = {student_id: index for index, student_id in enumerate(self.student_ids)}
+        self.timeslot_ids = list(timeslot_ids)
+        self.timeslot_index = {slot: index for index, slot in enumerate(self.timeslot_ids)}
+        self.timeslot_descriptions = list(timeslot_descriptions)
+        self.languages = list(languages)
+        self.language_preferences = np.asarray(language_preferences, dtype=np.int8)
+        self.group_indptr = np.asarray(group_indptr, dtype=np.int32)
+        self.group_indices = np.asarray(group_indices, dtype=np.int32)
+        self.team_size = team_size
+
+        # Set all preferences to 2 if they are all 0
+        slot_preferences = np.asarray(slot_preferences, dtype=np.int8)
+        rejects_all = ~(slot_preferences != 0).any(axis=1)
+        self.availability = np.where(rejects_all[:, np.newaxis], np.int8(2), slot_preferences).astype(np.int8)
+
+    @property
+    def num_students(self):
+        return len(self.student_ids)
+
+    @property
+    def num_timeslots(self):
+        return len(self.timeslot_ids)
+
+    def group_units(self):
+        """
+        Returns the pre-formed groups as units: the unit index of every student and the number of members of every
+        unit.
+
+        The groups are the connected components of the group preferences, which also covers preferences that are only
+        stated by one of the two students, and are numbered in the order of their first member. Students without a
+        group form a unit of their own.
+        """
+        graph = csr_matrix((np.ones(len(self.group_indices), dtype=np.int8), self.group_indices, self.group_indptr),
+                           shape=(self.num_students, self.num_students))
+        _, labels = connected_components(graph, directed=True, connection='weak')
+        return labels, np.bincount(labels)
+
+    def language_columns(self, languages):
+        """
+        Returns the language preferences as an (num_students, len(languages)) array in the order of languages.
+
+        Languages that do not occur in the instance get preference 0.
+        """
+        columns = np.zeros((self.num_students, len(languages)), dtype=np.int8)
+        for column, language in enumerate(languages):
+            if language in self.languages:
+                columns[:, column] = self.language_preferences[:, self.languages.index(language)]
+        return columns
+
+    def timeslot_dict(self):
+        """
+        Returns the timeslots as a dictionary mapping identifiers to descriptions, like the JSON format.
+        """
+        return dict(zip(self.timeslot_ids, self.timeslot_descriptions))
+
+    def availability_dict(self):
+        """
+        Returns a dictionary mapping each student to their availability for each timeslot.
+        """
+        return {student_id: dict(zip(self.timeslot_ids, row))
+                for student_id, row in zip(self.student_ids, self.availability.tolist())}
+
+    def language_preference_dict(self):
+        """
+        Returns a dictionary mapping each student to their preference score per language.
+        """
+        return {student_id: dict(zip(self.languages, row))
+                for student_id, row in zip(self.student_ids, self.language_preferences.tolist())}
+
+    def group_preference_dict(self):
+        """
+        Returns a dictionary mapping each student to the list of their group members.
+        """
+        indptr = self.group_indptr.tolist()
+        indices = self.group_indices.tolist()
+        return {student_id: [self.student_ids[peer] for peer in indices[indptr[index]:indptr[index + 1]]]
+                for index, student_id in enumerate(self.student_ids)}
+
+    def student_records(self):
+        """
+        Returns the students in the structure of the JSON format, with the preprocessed availability as 'slot'.
+        """
+        availability = self.availability_dict()
+        language_preferences = self.language_preference_dict()
+        group_preferences = self.group_preference_dict()
+        return {student_id: {'group': group_preferences[student_id],
+                             'language': language_preferences[student_id],
+                             'slot': availability[student_id]}
+                for student_id in self.student_ids}
+
+
+def instance_from_data(data):
+    """
+    Creates an Instance from the dictionary structure of the JSON format.
+
+    Args:
+        data (dict): The parsed JSON instance.
+
+    Returns:
+        Instance: The instance.
+    """
+    students = data['students']
+    timeslots = data['timeslots']
+    student_ids = list(students)
+    timeslot_ids = list(timeslots)
+    languages = sorted({language for details in students.values() for language in details['language']})
+    student_index = {student_id: index for index, student_id in enumerate(student_ids)}
+
+    slot_preferences = np.array([[details['slot'].get(slot, 0) for slot in timeslot_ids]
+                                 for details in students.values()], dtype=np.int8).reshape(len(student_ids),
+                                                                                           len(timeslot_ids))
+    language_preferences = np.array([[details['language'].get(language, 0) for language in languages]
+                                     for details in students.values()], dtype=np.int8).reshape(len(student_ids),
+                                                                                               len(languages))
+    group_indptr = np.zeros(len(student_ids) + 1, dtype=np.int32)
+    group_indptr[1:] = np.cumsum([len(details['group']) for details in students.values()])
+    group_indices = np.array([student_index[peer] for details in students.values() for peer in details['group']],
+                             dtype=np.int32)
+
+    return Instance(student_ids, timeslot_ids, [timeslots[slot] for slot in timeslot_ids], languages,
+                    slot_preferences, language_preferences, group_indptr, group_indices, data.get('team_size'))
+
+
+def load_instance(file_path):
+    """
+    Loads an instance in the JSON or the binary format.
+
+    Args:
+        file_path (str): The path to the instance file.
+
+    Returns:
+        Instance: The instance.
+    """
+    if is_binary_instance(file_path):
+        binary = load_binary_instance(file_path)
+        return Instance(binary['student_ids'], binary['timeslot_ids'], binary['timeslot_descriptions'],
+                        binary['languages'], binary['slot_preferences'], binary['language_preferences'],
+                        binary['group_indptr'], binary['group_indices'], binary['team_size'])
+
+    with open(file_path, 'r') as f:
+        return instance_from_data(json.load(f))
@@ -9,6 +9,7 @@ and generating a report of the results.
 """
 
 import glob
+import json
 import os
 import platform
 import sys
@@ -39,9 +40,57 @@ REMOTE = NODE.endswith(".scicore.unibas.ch") or NODE.endswith(".cluster.bc2.ch")
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))  # Directory of the script.
 BENCHMARKS_DIR = os.path.join(SCRIPT_DIR, "benchmarks")  # Directory containing benchmark files.
 BENCHMARKS = sorted(glob.glob(os.path.join(BENCHMARKS_DIR, "n*")))  # List of benchmark files.
-ALGORITHMS = ["smartalloc", "smartalloc_without_group_preference", "hungarian"]  # Algorithms to be used in the experiment.
+# Algorithms to be used in the experiment, mapped to the solver resource and the extra command line arguments.
+ALGORITHMS = {
+    "smartalloc": ("solver_smartalloc", []),
+    "smartalloc_incremental": ("solver_smartalloc", ["--mode", "incremental"]),
+    "smartalloc_incremental_gray": ("solver_smartalloc", ["--mode", "incremental", "--order", "gray"]),
+    "smartalloc_contracted_groups": ("solver_smartalloc", ["--contract-groups"]),
+    "smartalloc_branch_and_bound": ("solver_smartalloc", ["--mode", "branch-and-bound"]),
+    "smartalloc_language_milp": ("solver_smartalloc", ["--mode", "language-milp"]),
+    "smartalloc_reduced_symmetry": ("solver_smartalloc", ["--reduce-symmetry"]),
+    "smartalloc_heuristic": ("solver_smartalloc", ["--mode", "heuristic"]),
+    "smartalloc_heuristic_hint": ("solver_smartalloc", ["--heuristic-hint"]),
+    "smartalloc_lagrangian": ("solver_smartalloc", ["--mode", "lagrangian"]),
+    "smartalloc_cpsat": ("solver_smartalloc", ["--backend", "cpsat"]),
+    "smartalloc_highs": ("solver_smartalloc", ["--backend", "highs"]),
+    "smartalloc_language_milp_cpsat": ("solver_smartalloc", ["--mode", "language-milp", "--backend", "cpsat"]),
+    "smartalloc_language_milp_highs": ("solver_smartalloc", ["--mode", "language-milp", "--backend", "highs"]),
+    "smartalloc_4_threads": ("solver_smartalloc", ["--threads", "4"]),
+    "smartalloc_cpsat_4_threads": ("solver_smartalloc", ["--backend", "cpsat", "--threads", "4"]),
+    "smartalloc_without_presolve": ("solver_smartalloc", ["--presolve", "off"]),
+    "smartalloc_without_group_preference": ("solver_smartalloc_without_group_preference", []),
+    "smartalloc_without_group_preference_cpsat": ("solver_smartalloc_without_group_preference", ["--backend", "cpsat"]),
+    "smartalloc_without_group_preference_highs": ("solver_smartalloc_without_group_preference", ["--backend", "highs"]),
+    "hungarian": ("solver_hungarian", []),
+    "hungarian_flow": ("solver_hungarian", ["--engine", "flow"]),
+    "hungarian_flow_ignore_groups": ("solver_hungarian", ["--engine", "flow", "--ignore-groups"]),
+    "hungarian_flow_branch_and_bound": ("solver_hungarian", ["--engine", "flow", "--search", "branch-and-bound"]),
+    "hungarian_flow_reduced_symmetry": ("solver_hungarian", ["--engine", "flow", "--reduce-symmetry"]),
+    "hungarian_warm_start": ("solver_hungarian", ["--engine", "warm-start"]),
+    "hungarian_warm_start_branch_and_bound": ("solver_hungarian", ["--engine", "warm-start", "--search",
+                                                                   "branch-and-bound"]),
+    "hungarian_warm_start_gray": ("solver_hungarian", ["--engine", "warm-start", "--order", "gray"]),
+}
+# The same models solved with different MILP backends, compared in a separate report.
+BACKEND_ALGORITHMS = [
+    "smartalloc", "smartalloc_cpsat", "smartalloc_highs",
+    "smartalloc_language_milp", "smartalloc_language_milp_cpsat", "smartalloc_language_milp_highs",
+    "smartalloc_without_group_preference", "smartalloc_without_group_preference_cpsat",
+    "smartalloc_without_group_preference_highs",
+]
+# The same model solved with different solver parameters, compared in a separate report.
+PARAMETER_ALGORITHMS = [
+    "smartalloc", "smartalloc_4_threads", "smartalloc_cpsat", "smartalloc_cpsat_4_threads",
+    "smartalloc_without_presolve",
+]
+RESULT_FILE = "result.json"  # Result record written by the solvers (see run_result.py).
 TIME_LIMIT = 1800  # Time limit for each run in seconds.
+SOLVER_TIME_LIMIT = TIME_LIMIT - 60  # Time limit passed to the solvers, so they can still report their best result.
 MEMORY_LIMIT = 4000  # Memory limit for each run in megabytes.
+# Result cache shared by all runs (see result_cache.py), so a repeated experiment only solves the language combinations
+# whose results are not known yet. Cached combinations are not solved, so their time is missing from the run times.
+CACHE_FILE = None  # e.g. os.path.join(SCRIPT_DIR, "combination-cache.sqlite")
 
 # Configure the environment based on whether the script is running remotely.
 if REMOTE:
@@ -53,11 +102,30 @@ else:
 
 # Attributes to be collected and reported for each run.
 ATTRIBUTES = [
-    "assignment",  # Assignment of students to time slots.
     "total_cost",  # Total cost of the assignment.
     "error",
     "solve_time",
     "solver_exit_code",  # Exit code of the solver.
+    "nodes_explored",  # Nodes visited by the branch and bound search over language combinations.
+    "nodes_pruned",  # Nodes whose subtree was skipped by the lower bound.
+    "combinations_evaluated",  # Language combinations that were actually solved.
+    "combinations_skipped",  # Language combinations that were never solved.
+    "load_time",  # Time for reading the instance file.
+    "preprocess_time",  # Time for the data structures, bounds and checks built once per instance.
+    "build_time",  # Time for building the models resp. cost matrices of all combinations.
+    "optimization_time",  # Time spent in SCIP resp. the assignment algorithms.
+    "extract_time",  # Time for reading the assignments from the solutions.
+    "combinations_tried",  # Language combinations for which a model was solved.
+    "combinations_infeasible",  # Language combinations rejected by the feasibility check or the solver.
+    "combinations_interrupted",  # Searches and solves cut off by the solver time limit.
+    "combinations_cached",  # Language combinations whose result was taken from the result cache.
+    Attribute("proven_optimal", absolute=True),  # 1 if the search finished within the solver time limit.
+    "lower_bound",  # Lower bound on the optimal cost of runs that were not proven optimal.
+    "solver_backend",  # MILP backend of OR-Tools that solved the models.
+    "solver_threads",  # Threads of the MILP solver per model.
+    "relative_gap",  # Relative MIP gap at which the MILP solver stops.
+    Attribute("presolve", absolute=True),  # 1 if the presolve of the MILP solver was on.
+    "solver_specific_parameters",  # Parameters passed to the MILP backend in its own format.
     Attribute("solved", absolute=True),  # Boolean indicating whether the problem was solved.
 ]
 
@@ -67,27 +135,30 @@ def make_parser():
     Creates a parser for extracting information from solver output.
 
     This function sets up a parser that scans through the solver's output logs to extract
-    essential information such as the node, solver exit code, assignment details, total cost,
-    and solve time. It also assesses whether the problem was solved successfully and identifies
-    any errors that occurred during the process. The parser uses regular expressions to find
-    specific patterns in the text that match the expected output format of the solver.
+    essential information such as the node, solver exit code, total cost, and solve time.
+    It also assesses whether the problem was solved successfully and identifies any errors
+    that occurred during the process. The parser uses regular expressions to find specific
+    patterns in the text that match the expected output format of the solver, and reads the
+    result record the solver wrote to RESULT_FILE.
 
     Returns:
         Parser: A configured parser object for extracting run information.
     """
     def solved(content, props):
         """
-        Determines if the problem was solved based on the presence of an assignment in the properties.
+        Determines if the problem was solved based on the result record of the solver.
 
-        This function checks if the 'assignment' key exists in the properties dictionary, indicating
-        that an assignment was found and thus the problem was considered solved. It updates the
-        'solved' key in the properties dictionary with a boolean value representing the outcome.
+        The record is a single line of JSON. The assignment it contains is not copied into the
+        properties, so the size of the properties does not depend on the number of students.
+        If the solver did not write a record (e.g. because it ran out of time or memory), the
+        problem is considered unsolved.
 
         Args:
-            content (str): The content of the output log (unused in this function).
+            content (str): The content of the result file (empty if it is missing).
             props (dict): The properties dictionary where the 'solved' status is updated.
         """
-        props["solved"] = int("assignment" in props)  # Determine if the problem was solved.
+        record = json.loads(content) if content.strip() else {}
+        props["solved"] = int(record.get("solved", False))  # Determine if the problem was solved.
 
     def error(content, props):
         """
@@ -109,10 +180,29 @@ def make_parser():
     vc_parser = Parser()
     vc_parser.add_pattern("node", r"node: (.+)\n", type=str, file="driver.log", required=True)
     vc_parser.add_pattern("solver_exit_code", r"solve exit code: (.+)\n", type=int, file="driver.log")
-    vc_parser.add_pattern("assignment", r"Assignment: (\[.*\])", type=str)
     vc_parser.add_pattern("total_cost", r"Total cost: (.+)\n", type=float)
     vc_parser.add_pattern("solve_time", r"Solve time: (.+)s", type=float)
-    vc_parser.add_function(solved)
+    vc_parser.add_pattern("nodes_explored", r"Nodes explored: (\d+)", type=int)
+    vc_parser.add_pattern("nodes_pruned", r"Nodes pruned: (\d+)", type=int)
+    vc_parser.add_pattern("combinations_evaluated", r"Combinations evaluated: (\d+)", type=int)
+    vc_parser.add_pattern("combinations_skipped", r"Combinations skipped: (\d+)", type=int)
+    vc_parser.add_pattern("load_time", r"Load time: (.+)s", type=float)
+    vc_parser.add_pattern("preprocess_time", r"Preprocess time: (.+)s", type=float)
+    vc_parser.add_pattern("build_time", r"Build time: (.+)s", type=float)
+    vc_parser.add_pattern("optimization_time", r"Optimization time: (.+)s", type=float)
+    vc_parser.add_pattern("extract_time", r"Extraction time: (.+)s", type=float)
+    vc_parser.add_pattern("combinations_tried", r"Combinations tried: (\d+)", type=int)
+    vc_parser.add_pattern("combinations_infeasible", r"Combinations infeasible: (\d+)", type=int)
+    vc_parser.add_pattern("combinations_interrupted", r"Time limit interruptions: (\d+)", type=int)
+    vc_parser.add_pattern("combinations_cached", r"Combinations cached: (\d+)", type=int)
+    vc_parser.add_pattern("proven_optimal", r"Proven optimal: (\d)", type=int)
+    vc_parser.add_pattern("lower_bound", r"Lower bound: (.+)\n", type=float)
+    vc_parser.add_pattern("solver_backend", r"Solver backend: (.+)\n", type=str)
+    vc_parser.add_pattern("solver_threads", r"Solver threads: (\d+)", type=int)
+    vc_parser.add_pattern("relative_gap", r"Relative gap: (.+)\n", type=float)
+    vc_parser.add_pattern("presolve", r"Presolve: (\d)", type=int)
+    vc_parser.add_pattern("solver_specific_parameters", r"Solver parameters: (.+)\n", type=str)
+    vc_parser.add_function(solved, file=RESULT_FILE)
     vc_parser.add_function(error)
     return vc_parser
 
@@ -121,30 +211,36 @@ def make_parser():
 exp = Experiment(environment=ENV)
 # Add solver to experiment and make it available to all runs.
 exp.add_resource("solver_smartalloc", "SmartAlloc/main_smartalloc.py")
-exp.add_resource("data_loader_smartalloc", "SmartAlloc/data_loader_smartalloc.py")
 exp.add_resource("solver", "SmartAlloc/solver.py")
+exp.add_resource("group_contraction", "SmartAlloc/group_contraction.py")
+exp.add_resource("heuristic", "SmartAlloc/heuristic.py")
+exp.add_resource("lagrangian", "SmartAlloc/lagrangian.py")
 exp.add_resource("solver_smartalloc_without_group_preference", "SmartAlloc without group preference/main_smartalloc_wogp.py")
-exp.add_resource("data_loader_smartalloc_without_group_preference", "SmartAlloc without group preference/data_loader_smartalloc_wogp.py")
 exp.add_resource("solver_without_group_preference", "SmartAlloc without group preference/solver_wogp.py")
 exp.add_resource("solver_hungarian", "Hungarian Method/main_hungarian_method.py")
 exp.add_resource("data_loader_hungarian", "Hungarian Method/data_loader_Hungarian_Method.py")
 exp.add_resource("hungarian_method", "Hungarian Method/hungarian_method.py")
+exp.add_resource("combination_search", "combination_search.py")
+exp.add_resource("binary_instance", "binary_instance.py")
+exp.add_resource("instance", "instance.py")
+exp.add_resource("feasibility", "feasibility.py")
+exp.add_resource("run_result", "run_result.py")
+exp.add_resource("phase_timer", "phase_timer.py")
+exp.add_resource("deadline", "deadline.py")
+exp.add_resource("milp_solver", "milp_solver.py")
+exp.add_resource("result_cache", "result_cache.py")
 # Add custom parser.
 exp.add_parser(make_parser())
 
-for algo in ALGORITHMS:
+for algo, (solver_file, solver_args) in ALGORITHMS.items():
     for task in SUITE:
         run = exp.add_run()
         run.add_resource("task", task, symlink=True)
-        if algo == "smartalloc":
-            solver_file = "solver_smartalloc"
-        elif algo == "smartalloc_without_group_preference":
-            solver_file = "solver_smartalloc_without_group_preference"
-        else:
-            solver_file = "solver_hungarian"
         run.add_command(
             "solve",
-            [sys.executable, "{" + solver_file + "}", "{task}"],
+            [sys.executable, "{" + solver_file + "}", "{task}", "--result-file", RESULT_FILE,
+             "--time-limit", str(SOLVER_TIME_LIMIT)] + solver_args
+            + (["--cache", CACHE_FILE] if CACHE_FILE else []),
             time_limit=TIME_LIMIT,
             memory_limit=MEMORY_LIMIT,
         )
@@ -171,6 +267,10 @@ exp.add_fetcher(name="fetch")
 
 # Make a report.
 exp.add_report(BaseReport(attributes=ATTRIBUTES), outfile="report.html")
+# Compare the MILP backends on the same models.
+exp.add_report(BaseReport(attributes=ATTRIBUTES, filter_algorithm=BACKEND_ALGORITHMS), outfile="backends.html")
+# Compare the thread counts and solver parameters on the same model.
+exp.add_report(BaseReport(attributes=ATTRIBUTES, filter_algorithm=PARAMETER_ALGORITHMS), outfile="parameters.html")
 
 # Parse the commandline and run the given steps.
 exp.run_steps()
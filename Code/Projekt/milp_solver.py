@@ -0,0 +1,238 @@
+#! /usr/bin/env python
+
+"""
+MILP backends and solver parameters shared by both SmartAlloc variants.
+
+Both variants build their models through the pywraplp interface of OR-Tools and solve them with one of the backends in
+BACKENDS. This module creates and configures the solvers, adds the command line options of the backend and its
+parameters (see add_solver_arguments) and computes the penalties and capacities both models are built from. The models
+index students and timeslots like the arrays of an Instance.
+"""
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from deadline import DEADLINE
+from phase_timer import TIMER
+
+# The MILP backends, mapped to their name in OR-Tools. The model is built through the same pywraplp interface for
+# every backend; CP-SAT accepts it since all coefficients are integers.
+BACKENDS = {
+    'scip': 'SCIP',
+    'cpsat': 'CP-SAT',
+    'highs': 'HIGHS',
+}
+# The backends that accept a solution hint; setting a hint for HiGHS through pywraplp crashes the solve
+HINT_BACKENDS = {'scip', 'cpsat'}
+
+# The parameters a run can override (see create_solver and solve_model) with their defaults
+DEFAULT_SOLVER_PARAMETERS = {
+    'threads': 1,
+    'relative_gap': pywraplp.MPSolverParameters.kDefaultRelativeMipGap,
+    'presolve': True,
+    'specific': '',
+}
+# Version of the penalties of compute_penalty_tensor; increase it whenever they change, so the results of the result
+# cache (see result_cache.py) computed with the old penalties are no longer used
+OBJECTIVE_VERSION = 1
+
+
+def add_solver_arguments(parser):
+    """
+    Adds the command line options of the MILP backend and its parameters to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser of a solver script.
+    """
+    parser.add_argument('--backend', choices=list(BACKENDS), default='scip',
+                        help='MILP solver of the models: SCIP, OR-Tools CP-SAT or HiGHS (default: scip).')
+    parser.add_argument('--threads', type=int, default=DEFAULT_SOLVER_PARAMETERS['threads'],
+                        help='Number of threads of the MILP solver per model (default: 1). Combine with --workers '
+                             'with care, since every worker process runs its own solver.')
+    parser.add_argument('--relative-gap', type=float, default=DEFAULT_SOLVER_PARAMETERS['relative_gap'],
+                        help='Relative MIP gap at which the MILP solver stops (default: %(default)g). A larger gap '
+                             'is faster, but the result is then only reported as proven optimal if the gap is below '
+                             'one unit of the cost.')
+    parser.add_argument('--presolve', choices=['on', 'off'], default='on',
+                        help='Switch the presolve of the MILP solver on or off (default: on).')
+    parser.add_argument('--solver-params', type=str, default=DEFAULT_SOLVER_PARAMETERS['specific'],
+                        help='Backend specific parameters, e.g. "limits/nodes = 1000" (SCIP, one "name = value" per '
+                             'line) or "num_workers:4 linearization_level:2" (CP-SAT text format). Not supported by '
+                             'HiGHS.')
+
+
+def solver_parameters_from_args(args):
+    """
+    Collects the solver parameters of the options added by add_solver_arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        dict: The parameters with the keys of DEFAULT_SOLVER_PARAMETERS.
+    """
+    return {
+        'threads': args.threads,
+        'relative_gap': args.relative_gap,
+        'presolve': args.presolve == 'on',
+        'specific': args.solver_params,
+    }
+
+
+def create_solver(backend='scip', parameters=None):
+    """
+    Creates a solver instance.
+
+    Args:
+        backend (str): The MILP backend, one of the keys of BACKENDS.
+        parameters (dict): Optional parameters with the keys of DEFAULT_SOLVER_PARAMETERS. The number of threads and
+            the backend specific parameters (SCIP parameter file lines or CP-SAT text format) are set here, the others
+            are passed to solve_model.
+
+    Returns:
+        pywraplp.Solver: A solver instance of the backend if successful, None otherwise.
+
+    Raises:
+        ValueError: If the backend rejects the specific parameters.
+    """
+    solver = pywraplp.Solver.CreateSolver(BACKENDS[backend])
+    if not solver:
+        return None
+    parameters = dict(DEFAULT_SOLVER_PARAMETERS, **(parameters or {}))
+    solver.SetNumThreads(parameters['threads'])
+    if parameters['specific'] and not solver.SetSolverSpecificParametersAsString(parameters['specific']):
+        raise ValueError(f"The {backend} solver rejected the parameters {parameters['specific']!r}.")
+    return solver
+
+
+def solve_model(solver, parameters=None):
+    """
+    Solves the model with the relative gap and presolve setting of the parameters.
+
+    Args:
+        solver (pywraplp.Solver): A solver instance returned by create_solver.
+        parameters (dict): Optional parameters with the keys of DEFAULT_SOLVER_PARAMETERS.
+
+    Returns:
+        int: The result status of the solver.
+    """
+    parameters = dict(DEFAULT_SOLVER_PARAMETERS, **(parameters or {}))
+    solve_parameters = pywraplp.MPSolverParameters()
+    solve_parameters.SetDoubleParam(pywraplp.MPSolverParameters.RELATIVE_MIP_GAP, parameters['relative_gap'])
+    solve_parameters.SetIntegerParam(pywraplp.MPSolverParameters.PRESOLVE,
+                                     pywraplp.MPSolverParameters.PRESOLVE_ON if parameters['presolve']
+                                     else pywraplp.MPSolverParameters.PRESOLVE_OFF)
+    return solver.Solve(solve_parameters)
+
+
+def is_proven_optimal(status, solution_value, parameters=None):
+    """
+    Checks whether a solve proved its solution optimal, e.g. before it is stored in the result cache.
+
+    With a relative gap above the default, the status OPTIMAL only means that the solution is within the gap. Since the
+    costs are integers, the solution is still optimal if the gap is below one unit of the cost.
+
+    Args:
+        status (int): The result status returned by solve_model.
+        solution_value (float): The objective value of the solution.
+        parameters (dict): Optional parameters with the keys of DEFAULT_SOLVER_PARAMETERS.
+
+    Returns:
+        bool: True if the solution is proven optimal.
+    """
+    relative_gap = dict(DEFAULT_SOLVER_PARAMETERS, **(parameters or {}))['relative_gap']
+    return status == pywraplp.Solver.OPTIMAL and (relative_gap <= DEFAULT_SOLVER_PARAMETERS['relative_gap']
+                                                  or relative_gap * solution_value < 1)
+
+
+def count_interruption(status):
+    """
+    Counts a solve as interrupted (see deadline.py) unless it proved its result.
+
+    Only OPTIMAL and INFEASIBLE are proofs. FEASIBLE, NOT_SOLVED and ABNORMAL are what the backends return when the
+    time limit stops them with or without a solution, and a solve that ends after the deadline is counted whatever
+    its status, so the result of the run is never reported as proven optimal in these cases.
+
+    Args:
+        status (int): The result status returned by solve_model.
+
+    Returns:
+        bool: True if the solve was counted as interrupted.
+    """
+    interrupted = DEADLINE.expired() or status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.INFEASIBLE)
+    if interrupted:
+        TIMER.count('interrupted')
+    return interrupted
+
+
+def compute_capacities(num_timeslots, num_students):
+    """
+    Computes the capacity of every timeslot.
+
+    Args:
+        num_timeslots (int): The number of timeslots.
+        num_students (int): The total number of students.
+
+    Returns:
+        numpy.ndarray: The maximum number of students assigned to every timeslot.
+    """
+    # Set capacity per slot based on the number of students divided by the number of slots; the first slots take the
+    # remaining students
+    capacities = np.full(num_timeslots, num_students // num_timeslots, dtype=np.int64)
+    capacities[:num_students % num_timeslots] += 1
+    return capacities
+
+
+def compute_penalty_tensor(availability, language_preferences):
+    """
+    Computes the objective penalty of every student, timeslot and language as an array.
+
+    The penalties are the same as in the define_objective functions of both variants. Assignments that the
+    constraints forbid (availability 0 or language preference 0) get an infinite penalty, so the tensor can be used for
+    lower bounds on the optimal cost.
+
+    Args:
+        availability (numpy.ndarray): The (number of students, number of timeslots) availability of an Instance.
+        language_preferences (numpy.ndarray): The (number of students, number of languages) language preferences in
+            the order of the languages, see Instance.language_columns.
+
+    Returns:
+        numpy.ndarray: A float array of shape (number of students, number of timeslots, number of languages).
+    """
+    penalties = np.array([np.inf, 1.0, 0.0])
+    return penalties[availability][:, :, np.newaxis] + penalties[language_preferences][:, np.newaxis, :]
+
+
+def combination_penalties(penalty_tensor, language_combination, languages):
+    """
+    Computes the objective penalty of every student and timeslot under a language combination.
+
+    Args:
+        penalty_tensor (numpy.ndarray): The penalties returned by compute_penalty_tensor.
+        language_combination (tuple): The language of every timeslot.
+        languages (list): The languages in the order of the last axis of the penalty tensor.
+
+    Returns:
+        numpy.ndarray: A float array of shape (number of students, number of timeslots); pairs that the constraints
+            forbid are infinite.
+    """
+    language_indices = [languages.index(language) for language in language_combination]
+    return penalty_tensor[:, np.arange(penalty_tensor.shape[1]), language_indices]
+
+
+def extract_slots(variables, num_rows):
+    """
+    Reads the assignment of a solved model.
+
+    Args:
+        variables (dict): The boolean variables of the model, keyed by (student or unit index, timeslot index).
+        num_rows (int): The number of students (or units).
+
+    Returns:
+        numpy.ndarray: The index of the assigned timeslot of every student (or unit), or -1 if it is not assigned.
+    """
+    slots = np.full(num_rows, -1, dtype=np.int64)
+    for (row, slot), variable in variables.items():
+        if variable.solution_value() > 0.5:
+            slots[row] = slot
+    return slots
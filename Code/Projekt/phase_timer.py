@@ -0,0 +1,116 @@
+#! /usr/bin/env python
+
+"""
+Timing of the phases of a solver run.
+
+The solvers add the time spent in every phase (loading the instance, preprocessing, building and solving the models,
+extracting the assignments) and count the language combinations they try. The totals are printed in the
+"Key: value" format parsed by the lab script:
+
+    Load time: 0.0123s
+    Preprocess time: 0.0045s
+    Build time: 0.3456s
+    Optimization time: 1.2345s
+    Extraction time: 0.0067s
+    Combinations tried: 12
+    Combinations infeasible: 4
+    Time limit interruptions: 0
+    Combinations cached: 0
+
+The timer of a process is the module level TIMER. Worker processes send their totals to the parent process with
+collect and the parent adds them with merge (see combination_search.evaluate_in_parallel). A process that solves
+several instances resets it before every instance (see batch_solve.py).
+"""
+
+import time
+from contextlib import contextmanager
+
+# The phases in the order they are reported, mapped to the label of the output line
+PHASES = {
+    'load': 'Load time',
+    'preprocess': 'Preprocess time',
+    'build': 'Build time',
+    'optimization': 'Optimization time',
+    'extract': 'Extraction time',
+}
+COUNTERS = {
+    'tried': 'Combinations tried',
+    'infeasible': 'Combinations infeasible',
+    'interrupted': 'Time limit interruptions',
+    'cached': 'Combinations cached',
+}
+
+
+class PhaseTimer:
+    """
+    Accumulates the time per phase and the counters of a run.
+
+    Attributes:
+        times (dict): The total time in seconds of every phase in PHASES.
+        counts (dict): The value of every counter in COUNTERS.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Sets all times and counters to zero.
+        """
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Adds the time spent in the with block to the phase with the given name.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += time.perf_counter() - start_time
+
+    def count(self, name, value=1):
+        """
+        Increases the counter with the given name.
+        """
+        self.counts[name] += value
+
+    def collect(self):
+        """
+        Returns the times and counters and resets them, so they can be sent to another process.
+        """
+        totals = (self.times, self.counts)
+        self.reset()
+        return totals
+
+    def merge(self, totals):
+        """
+        Adds the times and counters returned by collect (usually in another process).
+        """
+        times, counts = totals
+        for name, value in times.items():
+            self.times[name] += value
+        for name, value in counts.items():
+            self.counts[name] += value
+
+    def as_properties(self):
+        """
+        Returns the times and counters as a flat dictionary, e.g. for a result record.
+        """
+        properties = {f'{name}_time': value for name, value in self.times.items()}
+        properties.update({f'combinations_{name}': value for name, value in self.counts.items()})
+        return properties
+
+    def report(self):
+        """
+        Prints the times and counters in the "Key: value" format parsed by the lab script.
+        """
+        for name, label in PHASES.items():
+            print(f"{label}: {self.times[name]:.6f}s")
+        for name, label in COUNTERS.items():
+            print(f"{label}: {self.counts[name]}")
+
+
+TIMER = PhaseTimer()
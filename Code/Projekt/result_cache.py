@@ -0,0 +1,204 @@
+#! /usr/bin/env python
+
+"""
+Persistent cache of the results of single language combinations.
+
+Re-running an experiment, or solving the same instance with another mode or backend, solves the same language
+combinations again. With --cache, the solvers look up every combination in an SQLite database before solving it and
+store the results they prove optimal (or infeasible), so a repeated run only solves what changed:
+
+    python main_smartalloc.py "benchmarks supervisor/n300-p0-6" --cache ~/smartalloc-cache.sqlite
+
+An entry is addressed by the SHA-256 hash of
+- the instance after preprocessing, i.e. its preferences and groups without identifiers (see instance_fingerprint),
+- the language combination,
+- the algorithm, which names the problem the solver solves exactly (e.g. 'smartalloc'), so all modes and backends of
+  a solver that prove a combination optimal share their entries, and
+- the version of its objective, which has to be increased whenever the penalties change.
+
+An entry holds the optimal cost (None for an infeasible combination) and the assignment as the timeslot index of every
+student, like the result records of run_result.py. When the database grows beyond its size limit, the least recently
+used entries are removed. SQLite locks the database for every write, so the worker processes of a run and concurrent
+runs can share it.
+
+The cache of a process is the module level CACHE. It is disabled until open is called; worker processes open it with
+the config of the parent process (see combination_search.evaluate_in_parallel).
+"""
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+
+DEFAULT_MAX_SIZE = 1024  # Default size limit of the database in megabytes
+# Entries are only counted and evicted every this many writes of a process, since this scans the whole table
+_EVICTION_INTERVAL = 64
+# Approximate size of the key and the other columns of an entry in bytes
+_ENTRY_OVERHEAD = 100
+
+
+def instance_fingerprint(instance, languages):
+    """
+    Hashes the data of an instance that determines the results of its language combinations.
+
+    The identifiers and descriptions of the students and timeslots are left out, so a renamed copy of an instance has
+    the same fingerprint. The assignments in the cache refer to the students and timeslots by their index.
+
+    Args:
+        instance (Instance): The instance.
+        languages (list): The languages of the combinations.
+
+    Returns:
+        str: The hexadecimal SHA-256 hash.
+    """
+    digest = hashlib.sha256()
+    for array in (instance.availability, instance.language_columns(languages), instance.group_indptr,
+                  instance.group_indices):
+        digest.update(repr(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(json.dumps(list(languages)).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    The results of the language combinations of one instance and algorithm, stored in an SQLite database.
+
+    Attributes:
+        path (str): The path of the database, or None if the cache is disabled.
+        max_size (float): The size limit of the database in megabytes.
+        instance_key (str): The fingerprint of the instance, see instance_fingerprint.
+        algorithm (str): The name of the problem the results belong to.
+        objective_version (int): The version of the objective of the algorithm.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.max_size = DEFAULT_MAX_SIZE
+        self.instance_key = None
+        self.algorithm = None
+        self.objective_version = None
+        self._connection = None
+        # The process that opened the connection; a connection must not be used after a fork
+        self._pid = None
+        self._writes = 0
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def open(self, path, instance_key, algorithm, objective_version, max_size=DEFAULT_MAX_SIZE):
+        """
+        Enables the cache for the language combinations of an instance.
+
+        Args:
+            path (str): The path of the database; it is created if it does not exist. None disables the cache.
+            instance_key (str): The fingerprint of the instance, see instance_fingerprint.
+            algorithm (str): The name of the problem the solver solves exactly.
+            objective_version (int): The version of the objective of the algorithm.
+            max_size (float): The size limit of the database in megabytes.
+        """
+        self.close()
+        self.path = None if path is None else os.path.abspath(os.path.expanduser(path))
+        self.instance_key = instance_key
+        self.algorithm = algorithm
+        self.objective_version = objective_version
+        self.max_size = max_size
+        if self.enabled:
+            self.evict()
+
+    def config(self):
+        """
+        Returns the arguments of open, so another process can open the same cache.
+        """
+        return {'path': self.path, 'instance_key': self.instance_key, 'algorithm': self.algorithm,
+                'objective_version': self.objective_version, 'max_size': self.max_size}
+
+    def close(self):
+        """
+        Closes the connection to the database of this process.
+        """
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def _connect(self):
+        """
+        Returns the connection of this process, creating the database and its table if necessary.
+        """
+        if self._connection is None or self._pid != os.getpid():
+            # Autocommit mode: every statement is its own transaction, so the database is never locked for long
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._pid = os.getpid()
+            # Readers do not block the writer and vice versa in write-ahead logging mode
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, cost REAL, '
+                                     'assignment TEXT, size INTEGER, last_used REAL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        return self._connection
+
+    def _key(self, language_combination):
+        key = [self.instance_key, list(language_combination), self.algorithm, self.objective_version]
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+    def get(self, language_combination):
+        """
+        Looks up the result of a language combination and marks it as recently used.
+
+        Args:
+            language_combination (tuple): The language of every timeslot.
+
+        Returns:
+            tuple: The optimal cost (infinity if the combination is infeasible) and the timeslot index of every
+                student (None if infeasible), or None if the cache is disabled or has no entry.
+        """
+        if not self.enabled:
+            return None
+        connection = self._connect()
+        key = self._key(language_combination)
+        row = connection.execute('SELECT cost, assignment FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        cost, assignment = row
+        return (math.inf, None) if cost is None else (cost, json.loads(assignment))
+
+    def put(self, language_combination, cost, slots):
+        """
+        Stores the optimal result of a language combination.
+
+        Only results that are proven optimal (or infeasible) may be stored, since they are used instead of solving.
+
+        Args:
+            language_combination (tuple): The language of every timeslot.
+            cost (float): The optimal cost, or infinity if the combination is infeasible.
+            slots (list): The timeslot index of every student (ignored if the combination is infeasible).
+        """
+        if not self.enabled:
+            return
+        connection = self._connect()
+        feasible = math.isfinite(cost)
+        assignment = json.dumps([int(slot) for slot in slots], separators=(',', ':')) if feasible else None
+        size = _ENTRY_OVERHEAD + (len(assignment) if feasible else 0)
+        connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                           (self._key(language_combination), float(cost) if feasible else None, assignment, size,
+                            time.time()))
+        self._writes += 1
+        if self._writes % _EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the entries fit into the size limit.
+        """
+        if not self.enabled:
+            return
+        # The running total over the entries from the most recently used one decides which entries still fit
+        self._connect().execute('DELETE FROM results WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER '
+                                '(ORDER BY last_used DESC) AS total FROM results) WHERE total > ?)',
+                                (self.max_size * 1024 * 1024,))
+
+
+CACHE = ResultCache()
@@ -0,0 +1,102 @@
+#! /usr/bin/env python
+
+"""
+Structured result records of solver runs.
+
+Besides the human-readable output, the solvers can write their result to a file (--result-file). Every record is a
+single line of JSON, so several runs can be appended to the same file and read back one by one:
+
+    {"total_cost": 79.0, "solved": true, "solve_time": 0.31, "assignment": [3, 0, 1, ...]}
+
+The assignment holds the index of the assigned timeslot for every student, in the order of the students of the
+instance (-1 if a student is not assigned), instead of the list of (student, timeslot) pairs.
+"""
+
+import json
+import math
+
+
+def encode_assignment(instance, assignment):
+    """
+    Converts a list of (student, timeslot) pairs into timeslot indices.
+
+    Args:
+        instance (Instance): The instance that was solved.
+        assignment (list): The (student identifier, timeslot identifier) pairs of the solution.
+
+    Returns:
+        list: The index of the assigned timeslot of every student, or -1 for unassigned students.
+    """
+    slots = [-1] * instance.num_students
+    for student, slot in assignment:
+        slots[instance.student_index[student]] = instance.timeslot_index[slot]
+    return slots
+
+
+def decode_assignment(instance, slots):
+    """
+    Converts timeslot indices back into (student, timeslot) pairs.
+
+    Args:
+        instance (Instance): The instance that was solved.
+        slots (list): The timeslot index of every student, as stored in a result record.
+
+    Returns:
+        list: The (student identifier, timeslot identifier) pairs of the assigned students.
+    """
+    return [(instance.student_ids[student], instance.timeslot_ids[slot]) for student, slot in enumerate(slots)
+            if slot >= 0]
+
+
+def make_result(instance, total_cost, assignment, solve_time, **properties):
+    """
+    Creates the result record of a run.
+
+    Args:
+        instance (Instance): The instance that was solved.
+        total_cost (float): The cost of the best assignment, or infinity if none was found.
+        assignment (list): The (student identifier, timeslot identifier) pairs of the best assignment.
+        solve_time (float): The run time in seconds.
+        **properties: Further values to store in the record, e.g. search statistics.
+
+    Returns:
+        dict: The record.
+    """
+    total_cost = float(total_cost)
+    record = {
+        'total_cost': total_cost if math.isfinite(total_cost) else None,
+        'solved': bool(assignment),
+        'solve_time': solve_time,
+        'assignment': encode_assignment(instance, assignment),
+    }
+    record.update(properties)
+    return record
+
+
+def write_result(file_path, record, append=False):
+    """
+    Writes a result record as one line of JSON.
+
+    Args:
+        file_path (str): The path of the result file.
+        record (dict): The record returned by make_result.
+        append (bool): Append the record to the file instead of replacing its content.
+    """
+    with open(file_path, 'a' if append else 'w') as f:
+        f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def read_results(file_path):
+    """
+    Reads the result records of a result file.
+
+    Args:
+        file_path (str): The path of the result file.
+
+    Returns:
+        iterator: The records in the order they were written.
+    """
+    with open(file_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
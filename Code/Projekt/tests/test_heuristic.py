@@ -0,0 +1,49 @@
+#! /usr/bin/env python
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_DIR, 'SmartAlloc'))
+sys.path.append(PROJECT_DIR)
+from heuristic import heuristic_assignment  # noqa: E402
+from main_smartalloc import solve_by_heuristic  # noqa: E402
+from feasibility import FeasibilityOracle  # noqa: E402
+from instance import load_instance  # noqa: E402
+from milp_solver import compute_capacities, compute_penalty_tensor, combination_penalties  # noqa: E402
+
+BENCHMARKS_DIR = os.path.join(PROJECT_DIR, 'benchmarks supervisor')
+# Instances on which the greedy placement gets stuck for some language combination
+STUCK_INSTANCES = ['n80-p1-8', 'n100-p1-3', 'n100-p1-9', 'n125-p1-5', 'n150-p1-1', 'n300-p2-6']
+
+
+@pytest.mark.parametrize('name', STUCK_INSTANCES)
+def test_heuristic_finds_feasible_assignment(name):
+    instance = load_instance(os.path.join(BENCHMARKS_DIR, name))
+    languages = ['E', 'G']
+    penalty_tensor = compute_penalty_tensor(instance.availability, instance.language_columns(languages))
+    capacities = compute_capacities(instance.num_timeslots, instance.num_students)
+    feasibility_oracle = FeasibilityOracle(instance.availability, instance.language_columns(languages), capacities,
+                                           languages)
+
+    cost, combination, slots = solve_by_heuristic(instance, languages, penalty_tensor, capacities,
+                                                  instance.group_units(), feasibility_oracle=feasibility_oracle)
+
+    assert slots is not None
+    penalties = combination_penalties(penalty_tensor, combination, languages)
+    student_penalties = penalties[np.arange(instance.num_students), slots]
+    assert np.isfinite(student_penalties).all()
+    assert cost == student_penalties.sum()
+    assert (np.bincount(slots, minlength=instance.num_timeslots) <= capacities).all()
+    for student in range(instance.num_students):
+        members = instance.group_indices[instance.group_indptr[student]:instance.group_indptr[student + 1]]
+        assert (slots[members] == slots[student]).all()
+
+
+def test_heuristic_reports_packing_failure():
+    cost, slots = heuristic_assignment(np.array([2, 2]), np.array([3, 1]), np.zeros((2, 2)))
+    assert cost == float('inf')
+    assert slots is None